@@ -6,5 +6,6 @@ class ApiConfig(AppConfig):
     name = 'api'
     
     def ready(self):
-        # Import signal handlers or other startup code
-        pass
\ No newline at end of file
+        from django.core import checks
+        from core.cache_versions import check_shared_cache
+        checks.register(check_shared_cache, checks.Tags.caches)
\ No newline at end of file
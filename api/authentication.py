@@ -0,0 +1,88 @@
+"""
+Token authentication that costs one cache round trip on a warm cache.
+
+DRF's TokenAuthentication loads the token and its user from the database
+on every request. CachedTokenAuthentication keeps both (with the user's
+judge profile, so role checks need no further queries) in the cache for
+API_TOKEN_CACHE_SECONDS, keyed by a digest of the token. Each time an
+entry is rebuilt the token's last_used and sliding expiry are written
+back, so expiry is exact to within that many seconds. Deleting a token
+drops its entry, and any save of the user bumps a version counter per
+token that invalidates the entries of all their tokens. The entry and its
+version are both keyed by the token, so they are fetched together.
+
+That round trip is no SQL at all with a cache server (redis://,
+pymemcache://); with the default database cache it is one query against
+cache_entries instead of the token and user lookups.
+
+Revocation is only immediate everywhere because the cache is shared by
+every worker (CACHES, enforced by core.cache_versions.check_shared_cache);
+with a per-process cache other workers would accept a revoked token
+until their entry expired.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.cache_versions import KEY as VERSION_KEY, get_version
+from .models import AuthToken
+
+CACHE_KEY = 'api:token:{digest}'
+
+
+def _digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _cache_key(key):
+    return CACHE_KEY.format(digest=_digest(key))
+
+
+def token_version_name(key):
+    """Version counter of a token's cached entry; bumped whenever its user changes"""
+    return f'api:token:{_digest(key)}'
+
+
+def forget_token(key):
+    cache.delete(_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        now = timezone.now()
+        version_key = VERSION_KEY.format(name=token_version_name(key))
+        found = cache.get_many([_cache_key(key), version_key])
+        entry = found.get(_cache_key(key))
+        if entry is None or entry['version'] != found.get(version_key):
+            entry = self._load(key, now)
+
+        token = entry['token']
+        if token.expires <= now:
+            forget_token(key)
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        return token.user, token
+
+    def _load(self, key, now):
+        # Read the version before the user so a concurrent change to the user wins
+        version = get_version(token_version_name(key))
+        try:
+            token = AuthToken.objects.select_related('user__judge_profile').get(key=key)
+        except AuthToken.DoesNotExist:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        if token.expires <= now:
+            raise exceptions.AuthenticationFailed('Token has expired.')
+
+        token.last_used, token.expires = now, token.sliding_expiry(now)
+        AuthToken.objects.filter(pk=token.pk, expires__gt=now).update(last_used=token.last_used, expires=token.expires)
+        entry = {'token': token, 'version': version}
+        timeout = min(getattr(settings, 'API_TOKEN_CACHE_SECONDS', 300), (token.expires - now).total_seconds())
+        cache.set(_cache_key(key), entry, max(int(timeout), 1))
+        return entry
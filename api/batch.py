@@ -0,0 +1,183 @@
+"""
+Several API calls in one round trip.
+
+    POST /api/batch/
+    {"requests": [
+        {"id": "me", "method": "GET", "path": "/api/auth/user/"},
+        {"id": "today", "method": "GET", "path": "/api/appointments/today/",
+         "headers": {"If-None-Match": "\"...\""}},
+        {"id": "read", "method": "POST", "path": "/api/notifications/7/mark_read/", "body": {}}
+    ]}
+
+Each sub-request is resolved and run in process as the batch's user: the
+user object is handed over rather than authenticated again, so all
+sub-requests share one request identity (core/identity.py) and what it
+memoises, such as permissions and row scoping conditions. Responses come
+back in order as {"id", "status", "headers", "body"}.
+
+Runs of consecutive GET and HEAD sub-requests are independent, so they
+run concurrently on up to API_BATCH_WORKERS threads; any other method
+waits for everything before it and runs alone, so writes apply in the
+order given. Each thread uses its own database connection, so inside a
+transaction (ATOMIC_REQUESTS) everything runs in turn.
+"""
+import gzip
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connection, connections
+from django.http import Http404
+from django.urls import Resolver404, resolve, reverse
+from rest_framework import serializers
+
+from core.identity import identity_for
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD')
+METHODS = SAFE_METHODS + ('POST', 'PUT', 'PATCH', 'DELETE')
+EXCLUDED_ENVIRON = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'SCRIPT_URL', 'REDIRECT_URL', 'HTTP_ACCEPT_ENCODING')
+
+
+def max_requests():
+    return getattr(settings, 'API_BATCH_MAX_REQUESTS', 20)
+
+
+class SubRequestSerializer(serializers.Serializer):
+    id = serializers.CharField(required=False, max_length=100)
+    method = serializers.ChoiceField(choices=METHODS, default='GET')
+    path = serializers.CharField(max_length=2000)
+    headers = serializers.DictField(child=serializers.CharField(), required=False, default=dict)
+    body = serializers.JSONField(required=False, default=None)
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith('/api/') or path == reverse('api_batch'):
+            raise serializers.ValidationError('Only other /api/ endpoints can be batched.')
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > max_requests():
+            raise serializers.ValidationError(f'At most {max_requests()} requests can be batched.')
+        return value
+
+
+def _sub_request(request, spec):
+    """A WSGI request for spec carrying the batch request's environment and user"""
+    url = urlsplit(spec['path'])
+    payload = b'' if spec['body'] is None else json.dumps(spec['body']).encode()
+    # The batch response is what gets encoded for the client; sub-responses stay plain
+    environ = {
+        key: value for key, value in request.META.items()
+        if not key.startswith('HTTP_IF_') and key not in EXCLUDED_ENVIRON
+    }
+    environ.update({
+        'REQUEST_METHOD': spec['method'],
+        'PATH_INFO': url.path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': url.query,
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+        'wsgi.url_scheme': request.scheme,
+    })
+    if payload:
+        environ['CONTENT_TYPE'] = 'application/json'
+    for name, value in spec['headers'].items():
+        key = 'HTTP_' + name.upper().replace('-', '_')
+        if key not in EXCLUDED_ENVIRON:
+            environ[key] = value
+
+    sub = WSGIRequest(environ)
+    sub.user = request.user
+    sub.identity = identity_for(request.user)
+    if hasattr(request, 'session'):
+        sub.session = request.session
+    # Already authenticated (and CSRF-checked) as the batch request
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return sub
+
+
+def _run(request, spec):
+    result = {'status': 404, 'headers': {}, 'body': None}
+    if 'id' in spec:
+        result['id'] = spec['id']
+    sub = _sub_request(request, spec)
+    try:
+        match = resolve(sub.path_info)
+        response = match.func(sub, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        body = _decode(response)
+    except (Resolver404, Http404):
+        result['body'] = {'detail': 'Not found.'}
+        return result
+    except Exception:
+        # One failing sub-request must not take the rest of the batch with it
+        logger.exception('Batched %s %s failed', spec['method'], spec['path'])
+        result.update(status=500, body={'detail': 'Server error.'})
+        return result
+
+    result['status'] = response.status_code
+    result['headers'] = {
+        name: value for name, value in response.items() if name not in ('Content-Length', 'Content-Encoding')
+    }
+    result['body'] = body
+    return result
+
+
+def _decode(response):
+    content = getattr(response, 'content', b'')
+    if not content:
+        return None
+    if response.get('Content-Encoding') == 'gzip':
+        content = gzip.decompress(content)
+    elif response.get('Content-Encoding'):
+        raise ValueError(f"Cannot decode {response['Content-Encoding']} content")
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(content)
+    return content.decode(response.charset or 'utf-8', errors='replace')
+
+
+def _run_in_thread(request, spec):
+    try:
+        return _run(request, spec)
+    finally:
+        # Threads get their own connections; close them before the thread is reused or dropped
+        connections.close_all()
+
+
+def run_batch(request, specs):
+    """Run the sub-requests and return their results in order"""
+    workers = getattr(settings, 'API_BATCH_WORKERS', 4)
+    # Other connections cannot see writes made inside an open transaction
+    if connection.in_atomic_block:
+        workers = 1
+    results = []
+    group = []
+
+    def flush():
+        if len(group) > 1 and workers > 1:
+            with ThreadPoolExecutor(max_workers=min(workers, len(group))) as pool:
+                results.extend(pool.map(lambda spec: _run_in_thread(request, spec), group))
+        else:
+            results.extend(_run(request, spec) for spec in group)
+        group.clear()
+
+    for spec in specs:
+        if spec['method'] in SAFE_METHODS:
+            group.append(spec)
+            continue
+        flush()
+        results.append(_run(request, spec))
+    flush()
+    return results
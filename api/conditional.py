@@ -0,0 +1,59 @@
+"""
+Conditional GET for API endpoints that clients poll.
+
+An endpoint declares the models its payload is built from. Its ETag is a
+digest of the request (host, path, query, format, the user and their role) and
+of the change versions of those models (core.cache_versions), so working
+it out takes one cache round trip (one query with the database cache) and
+no model queries. A client whose copy is current gets 304 Not Modified
+before any model query or serialisation runs.
+The models' signals bump their versions (see api.models); set-based writes
+call core.cache_versions.mark_changed. The versions live in the shared
+cache, so a change made by any worker or command moves every worker's tags.
+"""
+import functools
+import hashlib
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from core.cache_versions import get_versions, model_version_name
+
+
+def etag_for(request, models, daily=False):
+    versions = get_versions([model_version_name(model) for model in models])
+    user = request.user
+    parts = [
+        request.get_host(),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        str(user.pk),
+        getattr(user, 'user_type', ''),
+        *(str(versions[name]) for name in sorted(versions)),
+    ]
+    if daily:
+        # "Today" and "upcoming" move on at midnight even when nothing changed
+        parts.append(timezone.localdate().isoformat())
+    return '"%s"' % hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:32]
+
+
+def conditional(*models, daily=False, **cache_control):
+    """
+    Decorate a DRF handler method with ETag support and the given
+    Cache-Control directives, e.g. @conditional(Judge, User, private=True, max_age=300).
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            etag = etag_for(request, models, daily)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            patch_cache_control(response, **cache_control)
+            patch_vary_headers(response, ['Authorization', 'Cookie'])
+            return response
+        return wrapper
+    return decorator
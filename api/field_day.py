@@ -0,0 +1,108 @@
+"""
+An officer's field day in one response.
+
+The bundle holds the officer's appointments for the day, each with the
+client's name, risk level, primary address, active court orders and next
+hearing. It takes four queries however many appointments there are: the
+appointments with their clients, then the addresses, orders and hearings
+of all those clients at once.
+
+Bundles are cached as gzipped JSON under the change versions of the
+models they read (core.cache_versions), so any change to those models
+leads to a rebuild on the next request. The ETag is a digest of the
+content, so a rebuild that changes nothing still answers 304.
+build_officer_days warms every active officer's bundle at the start of
+the day; the versions and bundles are in the shared cache, so the web
+workers serve what it built.
+"""
+import gzip
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.utils import timezone
+
+from appointments.models import Appointment
+from cases.models import Case
+from clients.models import Address, Client
+from core.cache_versions import get_versions, model_version_name
+from courts.models import CourtCase, CourtOrder, Hearing
+
+MODELS = (Appointment, Client, Address, Case, CourtCase, CourtOrder, Hearing)
+CACHE_KEY = 'api:field-day:{officer_id}:{day}:{versions}'
+CACHE_SECONDS = 24 * 60 * 60
+
+
+def _bundle(officer, day):
+    appointments = list(
+        Appointment.objects.filter(officer=officer, scheduled_date__date=day).exclude(status='cancelled')
+        .select_related('client').order_by('scheduled_date')
+        .only('scheduled_date', 'duration_minutes', 'appointment_type', 'status', 'location', 'client__first_name',
+              'client__last_name', 'client__case_number', 'client__risk_level', 'client__status')
+    )
+    client_ids = {appointment.client_id for appointment in appointments}
+    addresses, orders, hearings = {}, {}, {}
+    if client_ids:
+        for address in Address.objects.filter(client_id__in=client_ids, is_primary=True).order_by('pk').values(
+            'client_id', 'address_type', 'street', 'city', 'state', 'zip_code',
+        ):
+            addresses.setdefault(address.pop('client_id'), address)
+        for order in CourtOrder.objects.filter(
+            court_case__case__client_id__in=client_ids, is_active=True,
+        ).order_by('-effective_date').values(
+            'id', 'order_type', 'order_date', 'effective_date', 'order_text',
+            court_case_number=F('court_case__case_number'), client_id=F('court_case__case__client_id'),
+        ):
+            orders.setdefault(order.pop('client_id'), []).append(order)
+        for hearing in Hearing.objects.filter(
+            court_case__case__client_id__in=client_ids, is_completed=False, hearing_date__date__gte=day,
+        ).order_by('hearing_date').values(
+            'id', 'hearing_type', 'hearing_date', 'location',
+            court_case_number=F('court_case__case_number'), client_id=F('court_case__case__client_id'),
+        ):
+            hearings.setdefault(hearing.pop('client_id'), hearing)
+
+    return {
+        'date': day,
+        'officer': officer.pk,
+        'appointments': [
+            {
+                'id': appointment.pk,
+                'scheduled_date': appointment.scheduled_date,
+                'duration_minutes': appointment.duration_minutes,
+                'appointment_type': appointment.appointment_type,
+                'status': appointment.status,
+                'location': appointment.location,
+                'client': {
+                    'id': appointment.client_id,
+                    'full_name': appointment.client.full_name,
+                    'case_number': appointment.client.case_number,
+                    'status': appointment.client.status,
+                    'risk_level': appointment.client.risk_level,
+                    'primary_address': addresses.get(appointment.client_id),
+                    'active_orders': orders.get(appointment.client_id, []),
+                    'next_hearing': hearings.get(appointment.client_id),
+                },
+            }
+            for appointment in appointments
+        ],
+    }
+
+
+def field_day(officer, day=None):
+    """The officer's bundle for day (default today) as {'etag', 'gzip'}, built at most once per data version"""
+    day = day or timezone.localdate()
+    versions = get_versions([model_version_name(model) for model in MODELS])
+    digest = hashlib.sha256(repr(sorted(versions.items())).encode()).hexdigest()[:16]
+    key = CACHE_KEY.format(officer_id=officer.pk, day=day.isoformat(), versions=digest)
+    entry = cache.get(key)
+    if entry is None:
+        content = json.dumps(_bundle(officer, day), cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+        entry = {
+            'etag': '"%s"' % hashlib.sha256(content).hexdigest()[:32],
+            'gzip': gzip.compress(content),
+        }
+        cache.set(key, entry, CACHE_SECONDS)
+    return entry
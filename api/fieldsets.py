@@ -0,0 +1,131 @@
+"""
+Sparse fieldsets and expansion for list and detail endpoints.
+
+    GET /api/cases/?fields=id,case_number,client_name,status
+    GET /api/cases/?expand=client,officer
+
+?fields= keeps only the named fields; method fields left out are never
+called. ?expand= replaces a foreign key's id with the nested object the
+serializer declares for it in Meta.expandable. The queryset is then cut
+to match: .only() the columns the remaining fields read, select_related
+the relations they cross and prefetch_related the to-many ones they
+nest. Fields computed in Python declare what they read in
+Meta.field_sources, e.g. {'client_name': ('client__first_name',
+'client__last_name')}; a serializer with an undeclared one loads every
+column, as before.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.fields import SerializerMethodField
+
+
+def _names(value):
+    return [name.strip() for name in value.split(',') if name.strip()] if value else []
+
+
+class SparseFieldsetSerializerMixin:
+    """ModelSerializer mixin taking fields= and expand= lists of field names"""
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, 'expandable', {})
+        expand = set(expand or ())
+        unknown = expand - set(expandable)
+        if unknown:
+            raise serializers.ValidationError({'expand': [f"Cannot expand: {', '.join(sorted(unknown))}"]})
+        if fields:
+            unknown = set(fields) - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError({'fields': [f"Unknown fields: {', '.join(sorted(unknown))}"]})
+            for name in set(self.fields) - set(fields) - expand:
+                self.fields.pop(name)
+        for name in expand:
+            self.fields[name] = expandable[name](read_only=True)
+
+    def optimize_queryset(self, queryset):
+        """Narrow queryset to the columns and relations these fields read"""
+        plan = _Plan()
+        if not self._plan(plan, queryset.model, ''):
+            plan.columns = None
+        return plan.apply(queryset)
+
+    def _plan(self, plan, model, prefix):
+        """Add what each field reads to plan; False when some field's columns are unknown"""
+        complete = True
+        plan.columns.add(prefix + model._meta.pk.name)
+        field_sources = getattr(self.Meta, 'field_sources', {})
+        for name, field in self.fields.items():
+            if name in field_sources:
+                for path in field_sources[name]:
+                    plan.add_path(prefix + path)
+                continue
+            source = field.source
+            if isinstance(field, SerializerMethodField) or source == '*' or '.' in source:
+                complete = False
+                continue
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                complete = False
+                continue
+            if model_field.many_to_many or model_field.one_to_many or (model_field.one_to_one and not model_field.concrete):
+                plan.prefetch.add(prefix + source)
+            elif isinstance(field, SparseFieldsetSerializerMixin):
+                plan.columns.add(prefix + source)
+                plan.select.add(prefix + source)
+                complete = field._plan(plan, model_field.related_model, f'{prefix}{source}__') and complete
+            elif isinstance(field, serializers.BaseSerializer):
+                plan.select.add(prefix + source)
+                complete = False
+            else:
+                plan.columns.add(prefix + source)
+        return complete
+
+
+class _Plan:
+    def __init__(self):
+        self.columns = set()
+        self.select = set()
+        self.prefetch = set()
+
+    def add_path(self, path):
+        """A column reached through forward relations: each relation is joined and kept"""
+        parts = path.split('__')
+        for depth in range(1, len(parts)):
+            relation = '__'.join(parts[:depth])
+            self.columns.add(relation)
+            self.select.add(relation)
+        self.columns.add(path)
+
+    def apply(self, queryset):
+        if self.select:
+            queryset = queryset.select_related(*sorted(self.select))
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*sorted(self.prefetch))
+        if self.columns is not None:
+            queryset = queryset.only(*sorted(self.columns))
+        return queryset
+
+
+class SparseFieldsetViewMixin:
+    """
+    Reads ?fields= and ?expand= for the listed actions and narrows the
+    queryset to what the serializer will read. Other actions, writes
+    included, see every field.
+    """
+    sparse_fieldset_actions = ('list', 'retrieve')
+
+    def _sparse_fieldsets(self):
+        return getattr(self, 'action', None) in self.sparse_fieldset_actions
+
+    def get_serializer(self, *args, **kwargs):
+        if self._sparse_fieldsets():
+            kwargs.setdefault('fields', _names(self.request.query_params.get('fields')))
+            kwargs.setdefault('expand', _names(self.request.query_params.get('expand')))
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self._sparse_fieldsets():
+            queryset = self.get_serializer().optimize_queryset(queryset)
+        return queryset
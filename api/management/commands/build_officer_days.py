@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.field_day import field_day
+from core.cache_versions import cache_is_shared
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Build and cache every active officer's field-day bundle, e.g. from cron at the start of the day"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, default=None,
+                            help='Day to build, YYYY-MM-DD (default: today)')
+
+    def handle(self, *args, **options):
+        if not cache_is_shared():
+            raise CommandError('The default cache is local to this process, so no web worker would see the bundles')
+        officers = User.objects.filter(user_type='officer', is_active=True, is_active_officer=True)
+        built = 0
+        for officer in officers.iterator():
+            field_day(officer, options['date'])
+            built += 1
+        self.stdout.write(self.style.SUCCESS(f'Built {built} field-day bundles'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import AuthToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired API tokens'
+
+    def handle(self, *args, **options):
+        deleted, _ = AuthToken.objects.filter(expires__lte=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired tokens'))
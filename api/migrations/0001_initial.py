@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:58
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_existing_tokens(apps, schema_editor):
+    """Carry over tokens issued by rest_framework.authtoken; they start a fresh lifetime"""
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('api', 'AuthToken')
+    now = timezone.now()
+    expires = now + timedelta(hours=getattr(settings, 'API_TOKEN_IDLE_HOURS', 72))
+    AuthToken.objects.bulk_create(
+        (AuthToken(key=token.key, user_id=token.user_id, created=now, last_used=now, expires=expires)
+         for token in Token.objects.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('authtoken', '0004_alter_tokenproxy_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('last_used', models.DateTimeField()),
+                ('expires', models.DateTimeField()),
+                ('rotated_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='api_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires'], name='api_authtok_expires_91025e_idx')],
+            },
+        ),
+        migrations.RunPython(copy_existing_tokens, migrations.RunPython.noop),
+    ]
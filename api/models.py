@@ -0,0 +1,118 @@
+import binascii
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+def idle_timeout():
+    return timedelta(hours=getattr(settings, 'API_TOKEN_IDLE_HOURS', 72))
+
+
+def max_age():
+    return timedelta(days=getattr(settings, 'API_TOKEN_MAX_AGE_DAYS', 30))
+
+
+class AuthToken(models.Model):
+    """
+    An API token. It expires after API_TOKEN_IDLE_HOURS without use and
+    API_TOKEN_MAX_AGE_DAYS after it was issued, whichever comes first;
+    clients rotate it for a new one before then.
+    """
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='api_tokens')
+    created = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField()
+    expires = models.DateTimeField()
+    rotated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires']),
+        ]
+
+    def __str__(self):
+        return f"Token for {self.user_id} (expires {self.expires:%Y-%m-%d %H:%M})"
+
+    @classmethod
+    def issue(cls, user):
+        now = timezone.now()
+        return cls.objects.create(
+            key=binascii.hexlify(os.urandom(20)).decode(), user=user, last_used=now, expires=now + idle_timeout(),
+        )
+
+    def sliding_expiry(self, now):
+        """When the token expires if it is used now; a rotated token only runs out its grace period"""
+        if self.rotated_at:
+            return self.expires
+        return min(now + idle_timeout(), self.created + max_age())
+
+    def rotate(self, grace_seconds=None):
+        """Issue a replacement; this token stays valid for a short grace period so in-flight requests finish"""
+        if grace_seconds is None:
+            grace_seconds = getattr(settings, 'API_TOKEN_ROTATION_GRACE_SECONDS', 60)
+        replacement = AuthToken.issue(self.user)
+        self.rotated_at = timezone.now()
+        self.expires = min(self.expires, self.rotated_at + timedelta(seconds=grace_seconds))
+        self.save(update_fields=['rotated_at', 'expires'])
+        return replacement
+
+
+# Signals to drop cached credentials when a token or its user changes
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender=AuthToken)
+@receiver(post_delete, sender=AuthToken)
+def forget_token(sender, instance, **kwargs):
+    from .authentication import forget_token
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_user_tokens(sender, instance, update_fields=None, **kwargs):
+    from core.cache_versions import bump
+    from .authentication import token_version_name
+    # A web login only stamps last_login; keep the user's cached tokens
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    # Deactivation, a new role or a password change must reach cached requests
+    keys = AuthToken.objects.filter(user_id=instance.pk).values_list('key', flat=True)
+    names = [token_version_name(key) for key in keys]
+    if names:
+        bump(*names)
+
+
+# Change versions behind the ETags of polled endpoints (api/conditional.py)
+from core.cache_versions import mark_changed
+
+
+@receiver(post_save, sender='appointments.Appointment')
+@receiver(post_save, sender='clients.Client')
+@receiver(post_save, sender='clients.Address')
+@receiver(post_save, sender='cases.Case')
+@receiver(post_save, sender='judges.Judge')
+@receiver(post_save, sender='courts.Court')
+@receiver(post_save, sender='courts.CourtCase')
+@receiver(post_save, sender='courts.Hearing')
+@receiver(post_save, sender='courts.CourtOrder')
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender='appointments.Appointment')
+@receiver(post_delete, sender='clients.Client')
+@receiver(post_delete, sender='clients.Address')
+@receiver(post_delete, sender='cases.Case')
+@receiver(post_delete, sender='judges.Judge')
+@receiver(post_delete, sender='courts.Court')
+@receiver(post_delete, sender='courts.CourtCase')
+@receiver(post_delete, sender='courts.Hearing')
+@receiver(post_delete, sender='courts.CourtOrder')
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def record_change(sender, update_fields=None, **kwargs):
+    # Logging in only stamps last_login, which no payload shows
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    mark_changed(sender)
@@ -1,11 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from clients.models import Client, Address, Offense
-from cases.models import Case, RehabilitationPlan, PlanItem
+from cases.models import Case, RehabilitationPlan, PlanItem, PlanTemplate, PlanTemplateItem
 from appointments.models import Appointment
 from comms.models import Message, Notification
-from courts.models import CourtCase, Hearing
+from courts.models import Court, CourtCase, Hearing
 from judges.models import Judge
+from .fieldsets import SparseFieldsetSerializerMixin
 
 User = get_user_model()
 
@@ -13,18 +14,42 @@ User = get_user_model()
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for User model"""
     full_name = serializers.SerializerMethodField()
+    profile_picture_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = User
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name',
             'full_name', 'user_type', 'phone', 'department',
-            'badge_number', 'is_active_officer'
+            'badge_number', 'is_active_officer', 'profile_picture_variants'
         ]
         read_only_fields = ['id', 'username']
     
     def get_full_name(self, obj):
         return obj.get_full_name()
+    
+    def get_profile_picture_variants(self, obj):
+        variants = obj.profile_picture_variants()
+        request = self.context.get('request')
+        if variants is None or request is None:
+            return variants
+        return {
+            size: {ext: request.build_absolute_uri(url) for ext, url in urls.items()}
+            for size, urls in variants.items()
+        }
+
+
+class UserSummarySerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """Serializer for a User nested in another record"""
+    full_name = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'full_name', 'user_type']
+        field_sources = {'full_name': ('first_name', 'last_name')}
+    
+    def get_full_name(self, obj):
+        return obj.get_full_name()
 
 
 class AddressSerializer(serializers.ModelSerializer):
@@ -41,7 +66,20 @@ class OffenseSerializer(serializers.ModelSerializer):
         fields = ['id', 'offense_type', 'description', 'date_committed', 'sentence', 'court']
 
 
-class ClientSerializer(serializers.ModelSerializer):
+class ClientSummarySerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """Serializer for a Client nested in another record"""
+    full_name = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Client
+        fields = ['id', 'case_number', 'first_name', 'last_name', 'full_name', 'status', 'risk_level']
+        field_sources = {'full_name': ('first_name', 'last_name')}
+    
+    def get_full_name(self, obj):
+        return obj.full_name
+
+
+class ClientSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for Client model"""
     full_name = serializers.SerializerMethodField()
     addresses = AddressSerializer(many=True, read_only=True)
@@ -57,6 +95,11 @@ class ClientSerializer(serializers.ModelSerializer):
             'addresses', 'offenses', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
+        expandable = {'assigned_officer': UserSummarySerializer}
+        field_sources = {
+            'full_name': ('first_name', 'last_name'),
+            'assigned_officer_name': ('assigned_officer__first_name', 'assigned_officer__last_name'),
+        }
     
     def get_full_name(self, obj):
         return obj.full_name
@@ -65,7 +108,7 @@ class ClientSerializer(serializers.ModelSerializer):
         return obj.assigned_officer.get_full_name() if obj.assigned_officer else None
 
 
-class CaseSerializer(serializers.ModelSerializer):
+class CaseSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for Case model"""
     client_name = serializers.SerializerMethodField()
     officer_name = serializers.SerializerMethodField()
@@ -81,6 +124,17 @@ class CaseSerializer(serializers.ModelSerializer):
             'next_court_date', 'days_until_court', 'objectives',
             'special_conditions', 'court_notes', 'is_high_profile'
         ]
+        expandable = {
+            'client': ClientSummarySerializer,
+            'officer': UserSummarySerializer,
+            'presiding_judge': UserSummarySerializer,
+        }
+        field_sources = {
+            'client_name': ('client__first_name', 'client__last_name'),
+            'officer_name': ('officer__first_name', 'officer__last_name'),
+            'judge_name': ('presiding_judge__first_name', 'presiding_judge__last_name'),
+            'days_until_court': ('next_court_date',),
+        }
     
     def get_client_name(self, obj):
         return obj.client.full_name if obj.client else None
@@ -95,6 +149,59 @@ class CaseSerializer(serializers.ModelSerializer):
         return obj.days_until_court
 
 
+class PlanTemplateItemSerializer(serializers.ModelSerializer):
+    """Serializer for PlanTemplateItem model"""
+    class Meta:
+        model = PlanTemplateItem
+        fields = ['id', 'description', 'offset_days', 'notes', 'requires_judicial_review']
+
+
+class PlanTemplateSerializer(serializers.ModelSerializer):
+    """Serializer for PlanTemplate model, items included"""
+    items = PlanTemplateItemSerializer(many=True)
+    
+    class Meta:
+        model = PlanTemplate
+        fields = [
+            'id', 'name', 'title', 'description', 'duration_days',
+            'judicial_review_required', 'is_active', 'items', 'created_by', 'created_at'
+        ]
+        read_only_fields = ['created_by', 'created_at']
+    
+    def create(self, validated_data):
+        items = validated_data.pop('items')
+        template = PlanTemplate.objects.create(**validated_data)
+        PlanTemplateItem.objects.bulk_create(PlanTemplateItem(template=template, **item) for item in items)
+        return template
+    
+    def update(self, instance, validated_data):
+        items = validated_data.pop('items', None)
+        instance = super().update(instance, validated_data)
+        if items is not None:
+            instance.items.all().delete()
+            PlanTemplateItem.objects.bulk_create(PlanTemplateItem(template=instance, **item) for item in items)
+        return instance
+
+
+class PlanTemplateInstantiateSerializer(serializers.Serializer):
+    """The cases to create a template's plan on, and when the plans start"""
+    case_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    start_date = serializers.DateField(required=False, allow_null=True, default=None)
+
+
+class PlanItemBulkCompleteSerializer(serializers.Serializer):
+    """Which plan items to complete or re-open, by item and/or by plan"""
+    item_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    plan_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    completed = serializers.BooleanField(default=True)
+    completed_date = serializers.DateField(required=False, allow_null=True, default=None)
+    
+    def validate(self, attrs):
+        if not (attrs['item_ids'] or attrs['plan_ids']):
+            raise serializers.ValidationError('item_ids or plan_ids is required')
+        return attrs
+
+
 class AppointmentSerializer(serializers.ModelSerializer):
     """Serializer for Appointment model"""
     client_name = serializers.SerializerMethodField()
@@ -152,7 +259,7 @@ class NotificationSerializer(serializers.ModelSerializer):
 
 
 # Additional serializers for court system
-class JudgeSerializer(serializers.ModelSerializer):
+class JudgeSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for Judge model"""
     full_name = serializers.SerializerMethodField()
     
@@ -163,16 +270,25 @@ class JudgeSerializer(serializers.ModelSerializer):
             'appointment_date', 'full_name', 'phone', 'office_location',
             'is_active'
         ]
+        field_sources = {'full_name': ('user__first_name', 'user__last_name')}
     
     def get_full_name(self, obj):
         return obj.get_full_name()
 
 
-class CourtCaseSerializer(serializers.ModelSerializer):
+class CourtSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """Serializer for Court model"""
+    class Meta:
+        model = Court
+        fields = ['id', 'name', 'court_type', 'phone', 'email', 'is_active']
+
+
+class CourtCaseSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for CourtCase model"""
     class Meta:
         model = CourtCase
         fields = '__all__'
+        expandable = {'court': CourtSerializer, 'judge': JudgeSerializer}
 
 
 class HearingSerializer(serializers.ModelSerializer):
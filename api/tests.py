@@ -0,0 +1,406 @@
+import gzip
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from appointments.models import Appointment
+from cases.models import Case, PlanItem, PlanTemplate, PlanTemplateItem, RehabilitationPlan
+from core.cache_versions import mark_changed
+from clients.tests import make_client
+from users.models import User
+from .models import AuthToken
+from .views import CurrentUserView
+
+
+def api_client(user):
+    api = APIClient()
+    api.force_authenticate(user)
+    return api
+
+
+class PlanTemplateApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin')
+        cls.officer = User.objects.create_user('officer', user_type='officer')
+        cls.other_officer = User.objects.create_user('other-officer', user_type='officer')
+        cls.judge = User.objects.create_user('judge', user_type='judge')
+        client = make_client('C-1', cls.officer, cls.admin)
+        cls.cases = [
+            Case.objects.create(client=client, officer=cls.officer, case_number=f'K-{n}', objectives='-')
+            for n in range(2)
+        ]
+        cls.others_case = Case.objects.create(client=client, officer=cls.other_officer, case_number='K-9',
+                                              objectives='-')
+        cls.template = PlanTemplate.objects.create(name='Weekly', title='Weekly sessions', description='-',
+                                                   duration_days=84, created_by=cls.officer)
+        PlanTemplateItem.objects.bulk_create([
+            PlanTemplateItem(template=cls.template, description=f'Session {week}', offset_days=7 * week)
+            for week in range(1, 4)
+        ])
+
+    def instantiate(self, user, body):
+        return api_client(user).post(f'/api/plan-templates/{self.template.pk}/instantiate/', body, format='json')
+
+    def test_instantiate_creates_a_plan_per_case(self):
+        response = self.instantiate(self.officer, {
+            'case_ids': [case.pk for case in self.cases], 'start_date': '2025-01-06',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['plans_created'], 2)
+        plans = RehabilitationPlan.objects.filter(case__in=self.cases)
+        self.assertEqual({plan.end_date for plan in plans}, {date(2025, 3, 31)})
+        self.assertEqual(
+            sorted(PlanItem.objects.filter(rehabilitation_plan__in=plans).values_list('due_date', flat=True))[:2],
+            [date(2025, 1, 13), date(2025, 1, 13)],
+        )
+
+    def test_instantiate_rejects_malformed_input(self):
+        for body in ({}, {'case_ids': 'abc'}, {'case_ids': ['x']}, {'case_ids': 5}, {'case_ids': []},
+                     {'case_ids': [self.cases[0].pk], 'start_date': '06/01/2025'}):
+            with self.subTest(body=body):
+                self.assertEqual(self.instantiate(self.officer, body).status_code, 400)
+        self.assertFalse(RehabilitationPlan.objects.exists())
+
+    def test_instantiate_only_onto_visible_cases(self):
+        response = self.instantiate(self.officer, {'case_ids': [self.cases[0].pk, self.others_case.pk]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['case_ids'], [self.others_case.pk])
+        self.assertFalse(RehabilitationPlan.objects.exists())
+
+    def test_only_creator_or_admin_changes_a_template(self):
+        url = f'/api/plan-templates/{self.template.pk}/'
+        self.assertEqual(api_client(self.other_officer).get(url).status_code, 200)
+        self.assertEqual(api_client(self.other_officer).patch(url, {'title': 'x'}, format='json').status_code, 403)
+        self.assertEqual(api_client(self.officer).patch(url, {'title': 'Mine'}, format='json').status_code, 200)
+        self.assertEqual(api_client(self.admin).delete(url).status_code, 204)
+
+    def test_judges_cannot_create_templates(self):
+        body = {'name': 'New', 'title': 't', 'description': '-', 'duration_days': 7, 'items': []}
+        self.assertEqual(api_client(self.judge).post('/api/plan-templates/', body, format='json').status_code, 403)
+        self.assertEqual(api_client(self.officer).post('/api/plan-templates/', body, format='json').status_code, 201)
+
+
+class PlanItemBulkCompleteTests(TestCase):
+    url = '/api/plan-items/bulk-complete/'
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user('admin', user_type='admin')
+        cls.officer = User.objects.create_user('officer', user_type='officer')
+        other_officer = User.objects.create_user('other-officer', user_type='officer')
+        client = make_client('C-1', cls.officer, admin)
+
+        def plan(officer, case_number):
+            case = Case.objects.create(client=client, officer=officer, case_number=case_number, objectives='-')
+            plan = RehabilitationPlan.objects.create(case=case, title='Plan', description='-',
+                                                     start_date=date(2025, 1, 1), end_date=date(2025, 6, 1))
+            for n in range(3):
+                PlanItem.objects.create(rehabilitation_plan=plan, description=f'Item {n}', due_date=date(2025, 2, 1))
+            return plan
+
+        cls.plan = plan(cls.officer, 'K-1')
+        cls.others_plan = plan(other_officer, 'K-2')
+
+    def post(self, body):
+        return api_client(self.officer).post(self.url, body, format='json')
+
+    def test_completes_items_by_plan_and_by_id(self):
+        item = self.plan.plan_items.first()
+        response = self.post({'item_ids': [item.pk], 'completed_date': '2025-02-03'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['item_ids'], [item.pk])
+        item.refresh_from_db()
+        self.assertEqual((item.is_completed, item.completed_date), (True, date(2025, 2, 3)))
+
+        response = self.post({'plan_ids': [self.plan.pk]})
+        self.assertEqual(response.data['updated'], 2)
+        self.assertFalse(self.plan.plan_items.filter(is_completed=False).exists())
+
+        response = self.post({'plan_ids': [self.plan.pk], 'completed': False})
+        self.assertEqual(response.data['updated'], 3)
+        self.assertFalse(self.plan.plan_items.filter(is_completed=True).exists())
+
+    def test_leaves_items_the_user_cannot_see(self):
+        response = self.post({'plan_ids': [self.others_plan.pk]})
+        self.assertEqual(response.data['updated'], 0)
+        self.assertFalse(self.others_plan.plan_items.filter(is_completed=True).exists())
+
+    def test_rejects_malformed_input(self):
+        for body in ({}, {'item_ids': 'abc'}, {'item_ids': ['x']}, {'plan_ids': 5},
+                     {'item_ids': [1], 'completed': 'maybe'}, {'item_ids': [1], 'completed_date': 'soon'}):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
+
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class TokenAuthenticationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('officer', password='secret', user_type='officer')
+
+    def setUp(self):
+        cache.clear()
+        self.token = AuthToken.issue(self.user)
+
+    def get(self, key, path='/api/auth/user/'):
+        return APIClient().get(path, HTTP_AUTHORIZATION=f'Token {key}')
+
+    def post(self, key, path):
+        return APIClient().post(path, HTTP_AUTHORIZATION=f'Token {key}')
+
+    def test_login_issues_a_working_token(self):
+        response = APIClient().post('/api/auth/login/', {'username': 'officer', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(response.data['token']).data['username'], 'officer')
+
+    def test_warm_cache_takes_one_round_trip(self):
+        self.assertEqual(self.get(self.token.key).status_code, 200)
+        # The database cache answers the token entry and its version in one query
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get(self.token.key).status_code, 200)
+
+    @override_settings(CACHES=LOCAL_CACHE, ALLOW_PROCESS_LOCAL_CACHE=True)
+    def test_warm_cache_runs_no_queries_with_a_cache_server(self):
+        self.assertEqual(self.get(self.token.key).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(self.token.key).status_code, 200)
+
+    def test_use_slides_expiry_and_stamps_last_used(self):
+        AuthToken.objects.filter(pk=self.token.pk).update(expires=timezone.now() + timedelta(minutes=5))
+        self.get(self.token.key)
+        self.token.refresh_from_db()
+        self.assertGreater(self.token.expires, timezone.now() + timedelta(hours=1))
+
+    def test_expired_token_is_refused(self):
+        self.get(self.token.key)
+        self.token.expires = timezone.now() - timedelta(seconds=1)
+        self.token.save()
+        response = self.get(self.token.key)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(str(response.data['detail']), 'Token has expired.')
+
+    def test_rotation_keeps_the_old_token_for_its_grace_period(self):
+        self.get(self.token.key)
+        response = self.post(self.token.key, '/api/auth/rotate/')
+        replacement = response.data['token']
+        self.assertNotEqual(replacement, self.token.key)
+        self.assertEqual(self.get(replacement).status_code, 200)
+        self.assertEqual(self.get(self.token.key).status_code, 200)
+        self.token.refresh_from_db()
+        self.assertLessEqual(self.token.expires, timezone.now() + timedelta(seconds=60))
+        # Using the old token within the grace period does not extend it
+        self.get(self.token.key)
+        self.assertEqual(AuthToken.objects.get(pk=self.token.pk).expires, self.token.expires)
+
+    def test_logout_revokes_a_cached_token(self):
+        self.get(self.token.key)
+        self.assertEqual(self.post(self.token.key, '/api/auth/logout/').status_code, 204)
+        self.assertEqual(self.get(self.token.key).status_code, 401)
+
+    def test_deactivating_the_user_revokes_every_cached_token(self):
+        other = AuthToken.issue(self.user)
+        self.get(self.token.key)
+        self.get(other.key)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get(self.token.key).status_code, 401)
+        self.assertEqual(self.get(other.key).status_code, 401)
+
+    def test_web_login_keeps_cached_tokens(self):
+        self.get(self.token.key)
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get(self.token.key).status_code, 200)
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user('admin', user_type='admin')
+        cls.officer = User.objects.create_user('officer', user_type='officer')
+        cls.other_officer = User.objects.create_user('other-officer', user_type='officer')
+        cls.appointment = Appointment.objects.create(
+            client=make_client('C-1', cls.officer, admin), officer=cls.officer, appointment_type='checkin',
+            scheduled_date=timezone.now() + timedelta(days=1), location='Office',
+        )
+
+    def get(self, etag=None, user=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return api_client(user or self.officer).get('/api/appointments/', **headers)
+
+    def test_unchanged_data_answers_304_without_model_queries(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        # Only the cache lookup of the versions, a query with the database cache
+        with self.assertNumQueries(1):
+            response = self.get(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_saved_and_bulk_changes_move_the_etag(self):
+        etag = self.get()['ETag']
+        self.appointment.location = 'Home'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.appointment.save()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        Appointment.objects.update(status='completed')
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_changed(Appointment)
+        self.assertEqual(self.get(etag).status_code, 200)
+
+    def test_etags_are_per_user(self):
+        etag = self.get()['ETag']
+        response = self.get(etag, user=self.other_officer)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'] if isinstance(response.data, dict) else response.data, [])
+
+
+class SparseFieldsetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin', first_name='Ada', last_name='Admin')
+        cls.officer = User.objects.create_user('officer', user_type='officer', first_name='Olly', last_name='Officer')
+        cls.client_record = make_client('C-1', cls.officer, cls.admin)
+        cls.case = Case.objects.create(client=cls.client_record, officer=cls.officer, case_number='K-1',
+                                       objectives='-')
+
+    def get(self, path, **params):
+        return api_client(self.admin).get(path, params)
+
+    def rows(self, response):
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'] if isinstance(response.data, dict) else response.data
+
+    def test_fields_keep_only_the_named_fields(self):
+        [row] = self.rows(self.get('/api/cases/', fields='id,case_number,client_name'))
+        self.assertEqual(row, {'id': self.case.pk, 'case_number': 'K-1', 'client_name': 'Test C-1'})
+        detail = self.get(f'/api/cases/{self.case.pk}/', fields='status')
+        self.assertEqual(detail.data, {'status': self.case.status})
+
+    def test_expand_nests_related_records(self):
+        [row] = self.rows(self.get('/api/cases/', fields='id,client', expand='client,officer'))
+        self.assertEqual(row['client']['case_number'], 'C-1')
+        self.assertEqual(row['officer']['full_name'], 'Olly Officer')
+        self.assertEqual(set(row), {'id', 'client', 'officer'})
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                self.rows(self.get('/api/cases/', fields='id,client_name,officer_name', expand='client'))
+            return len(captured)
+
+        one = queries()
+        for n in range(2, 5):
+            Case.objects.create(client=make_client(f'C-{n}', self.officer, self.admin), officer=self.officer,
+                                case_number=f'K-{n}', objectives='-')
+        self.assertEqual(queries(), one)
+
+    def test_unknown_names_are_rejected(self):
+        self.assertEqual(self.get('/api/cases/', fields='id,secret').status_code, 400)
+        self.assertEqual(self.get('/api/cases/', expand='objectives').status_code, 400)
+
+    def test_writes_return_every_field(self):
+        response = api_client(self.admin).patch(f'/api/cases/{self.case.pk}/?fields=id', {'objectives': 'New'},
+                                                format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('client_name', response.data)
+
+
+class BatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin')
+        cls.officer = User.objects.create_user('officer', user_type='officer')
+        cls.case = Case.objects.create(client=make_client('C-1', cls.officer, cls.admin), officer=cls.officer,
+                                       case_number='K-1', objectives='-')
+        Appointment.objects.create(client=cls.case.client, officer=cls.officer, appointment_type='checkin',
+                                   scheduled_date=timezone.now() + timedelta(days=1), location='Office')
+
+    def batch(self, *requests, user=None, **headers):
+        return api_client(user or self.officer).post('/api/batch/', {'requests': list(requests)}, format='json',
+                                                     **headers)
+
+    def results(self, *requests, **kwargs):
+        response = self.batch(*requests, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response.data['responses']
+
+    def test_answers_in_order_as_the_batch_user(self):
+        me, missing, unnamed = self.results(
+            {'id': 'me', 'path': '/api/auth/user/'},
+            {'id': 'missing', 'path': '/api/nowhere/'},
+            {'path': f'/api/cases/{self.case.pk}/'},
+        )
+        self.assertEqual((me['id'], me['status'], me['body']['username']), ('me', 200, 'officer'))
+        self.assertEqual((missing['id'], missing['status']), ('missing', 404))
+        self.assertNotIn('id', unnamed)
+        self.assertEqual(unnamed['body']['case_number'], 'K-1')
+
+    def test_writes_apply_in_order(self):
+        path = f'/api/cases/{self.case.pk}/'
+        before, write, after = self.results(
+            {'path': path},
+            {'method': 'PATCH', 'path': path, 'body': {'objectives': 'Find work'}},
+            {'path': path},
+        )
+        self.assertEqual((before['body']['objectives'], write['status']), ('-', 200))
+        self.assertEqual(after['body']['objectives'], 'Find work')
+
+    def test_a_failing_request_does_not_fail_the_rest(self):
+        with mock.patch.object(CurrentUserView, 'get', side_effect=RuntimeError('bug')), \
+                self.assertLogs('api.batch', 'ERROR'):
+            failed, case = self.results({'path': '/api/auth/user/'}, {'path': f'/api/cases/{self.case.pk}/'})
+        self.assertEqual((failed['status'], failed['body']), (500, {'detail': 'Server error.'}))
+        self.assertEqual(case['status'], 200)
+
+    def test_conditional_headers_come_from_the_sub_request(self):
+        [first] = self.results({'path': '/api/appointments/'})
+        etag = first['headers']['ETag']
+        # The batch's own If-None-Match is about the batch response, not its parts
+        [again, revalidated] = self.results(
+            {'path': '/api/appointments/'},
+            {'path': '/api/appointments/', 'headers': {'If-None-Match': etag}},
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(again['status'], 200)
+        self.assertEqual((revalidated['status'], revalidated['body']), (304, None))
+
+    def test_encoded_sub_responses_are_returned_plain(self):
+        def gzipped(view, request):
+            response = HttpResponse(gzip.compress(b'{"ok": true}'), content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+            return response
+
+        with mock.patch.object(CurrentUserView, 'get', gzipped):
+            [result] = self.results({'path': '/api/auth/user/'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(result['body'], {'ok': True})
+        self.assertNotIn('Content-Encoding', result['headers'])
+
+    def test_rejects_what_cannot_be_batched(self):
+        too_many = [{'path': '/api/auth/user/'}] * 21
+        for requests in ([], too_many, [{'path': '/admin/'}], [{'path': '/api/batch/'}],
+                         [{'method': 'OPTIONS', 'path': '/api/auth/user/'}]):
+            with self.subTest(requests=len(requests)):
+                self.assertEqual(self.batch(*requests).status_code, 400)
@@ -6,12 +6,16 @@ router = DefaultRouter()
 router.register(r'clients', views.ClientViewSet, basename='client')
 router.register(r'appointments', views.AppointmentViewSet, basename='appointment')
 router.register(r'cases', views.CaseViewSet, basename='case')
+router.register(r'court-cases', views.CourtCaseViewSet, basename='court-case')
+router.register(r'plan-templates', views.PlanTemplateViewSet, basename='plan-template')
 router.register(r'messages', views.MessageViewSet, basename='message')
 router.register(r'notifications', views.NotificationViewSet, basename='notification')
 
 urlpatterns = [
     # Authentication
     path('auth/login/', views.CustomAuthToken.as_view(), name='api_login'),
+    path('auth/rotate/', views.RotateTokenView.as_view(), name='api_rotate_token'),
+    path('auth/logout/', views.LogoutView.as_view(), name='api_logout'),
     path('auth/user/', views.CurrentUserView.as_view(), name='current_user'),
     
     # Dashboard
@@ -20,13 +24,21 @@ urlpatterns = [
     # Reports
     path('reports/', views.ReportAPIView.as_view(), name='api_reports'),
     
+    # Rehabilitation plans
+    path('plans/behind-schedule/', views.BehindSchedulePlansView.as_view(), name='api_plans_behind_schedule'),
+    path('plan-items/bulk-complete/', views.PlanItemBulkCompleteView.as_view(), name='api_plan_items_bulk_complete'),
+    
     # Sync
     path('sync/', views.SyncView.as_view(), name='api_sync'),
+    path('batch/', views.BatchView.as_view(), name='api_batch'),
     
     # Include router URLs
     path('', include(router.urls)),
     
     # Additional endpoints
     path('officers/', views.OfficerListView.as_view(), name='api_officers'),
+    path('officers/workload/', views.OfficerWorkloadView.as_view(), name='api_officer_workload'),
+    path('officer/day/', views.OfficerDayView.as_view(), name='api_officer_day'),
+    path('officer/route/', views.OfficerRouteView.as_view(), name='api_officer_route'),
     path('judges/', views.JudgeListView.as_view(), name='api_judges'),
 ]
\ No newline at end of file
@@ -2,27 +2,38 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from django.contrib.auth import get_user_model
+from django.http import HttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 from django.db.models import Q
-from datetime import timedelta
+import gzip
+from datetime import datetime, timedelta
 
 # Import models from your modules
 from clients.models import Client
-from cases.models import Case, RehabilitationPlan, PlanItem
+from cases.models import Case, RehabilitationPlan, PlanItem, PlanTemplate
 from appointments.models import Appointment
+from appointments.routes import plan_route
 from comms.models import Message, Notification
 from courts.models import CourtCase, Hearing
 from judges.models import Judge
 from reporting.utils import generate_client_pdf_report
+from reporting.workload import workload_for
 
 # Serializers (we'll create these next)
+from core.scoping import scope, visible
+from .batch import BatchSerializer, run_batch
+from .conditional import conditional
+from .field_day import field_day
+from .fieldsets import SparseFieldsetViewMixin
+from .models import AuthToken
 from .serializers import (
     UserSerializer, ClientSerializer, CaseSerializer,
     AppointmentSerializer, MessageSerializer, NotificationSerializer,
-    CourtCaseSerializer, HearingSerializer, JudgeSerializer
+    CourtCaseSerializer, HearingSerializer, JudgeSerializer, PlanTemplateSerializer,
+    PlanItemBulkCompleteSerializer, PlanTemplateInstantiateSerializer
 )
 
 User = get_user_model()
@@ -35,10 +46,12 @@ class CustomAuthToken(ObtainAuthToken):
                                            context={'request': request})
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)
+        # One token per login, so each device expires and signs out on its own
+        token = AuthToken.issue(user)
         
         return Response({
             'token': token.key,
+            'expires': token.expires,
             'user_id': user.pk,
             'email': user.email,
             'username': user.username,
@@ -47,6 +60,38 @@ class CustomAuthToken(ObtainAuthToken):
         })
 
 
+class RotateTokenView(APIView):
+    """Swap the token used for this request for a fresh one"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        if not isinstance(request.auth, AuthToken):
+            return Response({'detail': 'Only token-authenticated requests can rotate a token.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        token = request.auth.rotate()
+        return Response({'token': token.key, 'expires': token.expires})
+
+
+class LogoutView(APIView):
+    """Revoke the token used for this request"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        if isinstance(request.auth, AuthToken):
+            request.auth.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class BatchView(APIView):
+    """Run several API requests in one round trip (see api/batch.py)"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'responses': run_batch(request, serializer.validated_data['requests'])})
+
+
 class CurrentUserView(APIView):
     """Get current authenticated user details"""
     permission_classes = [permissions.IsAuthenticated]
@@ -56,22 +101,14 @@ class CurrentUserView(APIView):
         return Response(serializer.data)
 
 
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """CRUD API for clients with role-based permissions"""
     serializer_class = ClientSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        
-        if user.is_officer():
-            return Client.objects.filter(assigned_officer=user)
-        elif user.is_judge():
-            # Judges see clients from their cases
-            return Client.objects.filter(cases__presiding_judge=user).distinct()
-        else:
-            # Admins see all
-            return Client.objects.all()
+        # Officers see their clients, judges those of their cases, admins all
+        return visible(Client, self.request.user)
     
     @action(detail=True, methods=['get'])
     def ai_analysis(self, request, pk=None):
@@ -100,16 +137,11 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        
         # Date filtering
         date_filter = self.request.query_params.get('date', None)
         status_filter = self.request.query_params.get('status', None)
         
-        queryset = Appointment.objects.all()
-        
-        if user.is_officer():
-            queryset = queryset.filter(officer=user)
+        queryset = visible(Appointment, self.request.user)
         
         if date_filter:
             queryset = queryset.filter(scheduled_date__date=date_filter)
@@ -117,9 +149,19 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         
-        return queryset.order_by('scheduled_date')
+        return queryset.select_related('client', 'officer').order_by('scheduled_date')
+    
+    # Payloads carry client and officer names; visibility follows cases for judges
+    @conditional(Appointment, Client, Case, User, private=True, no_cache=True)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @conditional(Appointment, Client, Case, User, private=True, no_cache=True)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
     
     @action(detail=False, methods=['get'])
+    @conditional(Appointment, Client, Case, User, daily=True, private=True, no_cache=True)
     def today(self, request):
         """Get today's appointments"""
         today = timezone.now().date()
@@ -128,6 +170,7 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @conditional(Appointment, Client, Case, User, daily=True, private=True, no_cache=True)
     def upcoming(self, request):
         """Get upcoming appointments (next 7 days)"""
         today = timezone.now().date()
@@ -139,31 +182,150 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class CaseViewSet(viewsets.ModelViewSet):
+class CaseViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """CRUD API for cases"""
     serializer_class = CaseSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        
-        if user.is_officer():
-            return Case.objects.filter(officer=user)
-        elif user.is_judge():
-            return Case.objects.filter(presiding_judge=user)
-        else:
-            return Case.objects.all()
+        return visible(Case, self.request.user)
     
     @action(detail=True, methods=['get'])
     def rehabilitation_plans(self, request, pk=None):
         """Get rehabilitation plans for a case"""
         case = self.get_object()
-        plans = case.rehabilitation_plans.all()
+        plans = list(case.rehabilitation_plans.with_progress())
         # You would create a RehabilitationPlanSerializer for this
         return Response({
             'case_id': case.id,
-            'plans_count': plans.count(),
-            'plans': [{'id': p.id, 'title': p.title} for p in plans]
+            'plans_count': len(plans),
+            'plans': [
+                {'id': p.id, 'title': p.title, 'progress_percentage': p.progress_percentage}
+                for p in plans
+            ]
+        })
+
+
+class CourtCaseViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
+    """Read-only API for court cases"""
+    serializer_class = CourtCaseSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return visible(CourtCase, self.request.user).order_by('-filing_date')
+
+
+class BehindSchedulePlansView(APIView):
+    """Open rehabilitation plans with overdue items, across all cases the user can see"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        plans = scope(RehabilitationPlan.objects.behind_schedule().with_progress(), request.user)
+        
+        rows = plans.order_by('end_date').values(
+            'id', 'title', 'end_date', 'case_id', 'case__case_number',
+            'case__client__first_name', 'case__client__last_name',
+            'overdue_items', 'total_items', 'completed_items',
+        )
+        return Response([
+            {
+                'id': row['id'],
+                'title': row['title'],
+                'end_date': row['end_date'],
+                'case_id': row['case_id'],
+                'case_number': row['case__case_number'],
+                'client_name': f"{row['case__client__first_name']} {row['case__client__last_name']}",
+                'overdue_items': row['overdue_items'],
+                'progress_percentage': (
+                    row['completed_items'] / row['total_items'] * 100 if row['total_items'] else 0
+                ),
+            }
+            for row in rows
+        ])
+
+
+def _date_param(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return False
+
+
+class PlanTemplatePermission(permissions.BasePermission):
+    """
+    Everyone signed in may read templates and instantiate them onto the
+    cases they can see; officers and administrators create them, and only
+    a template's creator or an administrator may change or delete it.
+    """
+    def has_permission(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return False
+        if view.action == 'create':
+            return request.user.user_type in ('officer', 'admin') or request.user.is_staff
+        return True
+    
+    def has_object_permission(self, request, view, obj):
+        if request.method in permissions.SAFE_METHODS or view.action == 'instantiate':
+            return True
+        return (
+            request.user.user_type == 'admin' or request.user.is_staff
+            or obj.created_by_id == request.user.pk
+        )
+
+
+class PlanTemplateViewSet(viewsets.ModelViewSet):
+    """CRUD API for plan templates, plus instantiating one onto many cases"""
+    serializer_class = PlanTemplateSerializer
+    permission_classes = [PlanTemplatePermission]
+    
+    def get_queryset(self):
+        return PlanTemplate.objects.prefetch_related('items')
+    
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+    
+    @action(detail=True, methods=['post'])
+    def instantiate(self, request, pk=None):
+        """Create this template's plan on every case in case_ids"""
+        template = self.get_object()
+        serializer = PlanTemplateInstantiateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        case_ids = set(serializer.validated_data['case_ids'])
+        
+        cases = list(visible(Case, request.user).filter(pk__in=case_ids))
+        missing = case_ids - {case.pk for case in cases}
+        if missing:
+            return Response(
+                {'error': 'Unknown cases', 'case_ids': sorted(missing)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        
+        plans = template.instantiate(cases, serializer.validated_data['start_date'])
+        return Response({
+            'template_id': template.id,
+            'plans_created': len(plans),
+            'plans': [{'id': plan.id, 'case_id': plan.case_id} for plan in plans],
+        }, status=status.HTTP_201_CREATED)
+
+
+class PlanItemBulkCompleteView(APIView):
+    """Complete or re-open many plan items in one statement"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        serializer = PlanItemBulkCompleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        
+        items = visible(PlanItem, request.user)
+        items = items.filter(Q(pk__in=params['item_ids']) | Q(rehabilitation_plan_id__in=params['plan_ids']))
+        changed = items.set_completed(params['completed'], on=params['completed_date'])
+        return Response({
+            'completed': params['completed'],
+            'updated': len(changed),
+            'item_ids': changed,
         })
 
 
@@ -226,7 +388,8 @@ class DashboardView(APIView):
             'stats': {}
         }
         
-        if user.is_officer():
+        identity = request.identity
+        if identity.is_officer:
             # Officer dashboard stats
             total_clients = Client.objects.filter(assigned_officer=user).count()
             active_cases = Case.objects.filter(officer=user, status='open').count()
@@ -241,26 +404,22 @@ class DashboardView(APIView):
                 'todays_appointments': todays_appointments,
             }
             
-        elif user.is_judge():
+        elif identity.judge is not None:
             # Judge dashboard stats
-            try:
-                judge_profile = Judge.objects.get(user=user)
-                active_court_cases = CourtCase.objects.filter(
-                    judge=judge_profile, 
-                    status='ACTIVE'
-                ).count()
-                upcoming_hearings = Hearing.objects.filter(
-                    judge=judge_profile,
-                    hearing_date__gte=timezone.now(),
-                    is_completed=False
-                ).count()
-                
-                response_data['stats'] = {
-                    'active_court_cases': active_court_cases,
-                    'upcoming_hearings': upcoming_hearings,
-                }
-            except Judge.DoesNotExist:
-                pass
+            active_court_cases = CourtCase.objects.filter(
+                judge=identity.judge, 
+                status='ACTIVE'
+            ).count()
+            upcoming_hearings = Hearing.objects.filter(
+                judge=identity.judge,
+                hearing_date__gte=timezone.now(),
+                is_completed=False
+            ).count()
+            
+            response_data['stats'] = {
+                'active_court_cases': active_court_cases,
+                'upcoming_hearings': upcoming_hearings,
+            }
         
         return Response(response_data)
 
@@ -274,13 +433,13 @@ class ReportAPIView(APIView):
         format_type = request.query_params.get('format', 'json')
         
         if report_type == 'clients':
+            clients = visible(Client, request.user)
             if format_type == 'pdf':
                 # Generate PDF report
                 from reporting.utils import generate_client_pdf_report
-                return generate_client_pdf_report()
+                return generate_client_pdf_report(clients.select_related('assigned_officer'))
             else:
                 # JSON client report
-                clients = Client.objects.all()
                 serializer = ClientSerializer(clients, many=True)
                 return Response({
                     'report_type': 'clients',
@@ -288,6 +447,39 @@ class ReportAPIView(APIView):
                     'data': serializer.data
                 })
         
+        if report_type in ('appointments', 'hearings'):
+            # Trend lines read from the daily rollup tables, limited to what the user may see
+            from reporting.rollups import appointment_trend, hearing_trend, GRANULARITIES
+            try:
+                end = datetime.strptime(request.query_params['end'], '%Y-%m-%d').date() \
+                    if 'end' in request.query_params else timezone.localdate()
+                start = datetime.strptime(request.query_params['start'], '%Y-%m-%d').date() \
+                    if 'start' in request.query_params else end - timedelta(days=30)
+            except ValueError:
+                return Response({'error': 'Dates must be in YYYY-MM-DD format'}, status=400)
+            granularity = request.query_params.get('granularity', 'day')
+            if granularity not in GRANULARITIES:
+                return Response({'error': 'Invalid granularity'}, status=400)
+            
+            filter_name = 'officer' if report_type == 'appointments' else 'court'
+            filter_id = request.query_params.get(filter_name) or None
+            if filter_id is not None:
+                try:
+                    filter_id = int(filter_id)
+                except ValueError:
+                    return Response({'error': f'Invalid {filter_name}'}, status=400)
+            if report_type == 'appointments':
+                data = appointment_trend(start, end, granularity, officer_id=filter_id, user=request.user)
+            else:
+                data = hearing_trend(start, end, granularity, court_id=filter_id, user=request.user)
+            return Response({
+                'report_type': report_type,
+                'start': start,
+                'end': end,
+                'granularity': granularity,
+                'data': data,
+            })
+        
         return Response({'error': 'Invalid report type'}, status=400)
 
 
@@ -318,22 +510,84 @@ class OfficerListView(APIView):
     """Get list of active probation officers"""
     permission_classes = [permissions.IsAuthenticated]
     
+    @conditional(User, private=True, max_age=300)
     def get(self, request):
         officers = User.objects.filter(
             user_type='officer', 
             is_active_officer=True
         ).order_by('first_name', 'last_name')
         
-        serializer = UserSerializer(officers, many=True)
+        serializer = UserSerializer(officers, many=True, context={'request': request})
         return Response(serializer.data)
 
 
+class OfficerDayView(APIView):
+    """Today's appointments of the requesting officer with what they need on the road (see api/field_day.py)"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        if not request.identity.is_officer:
+            return Response({'detail': 'Only officers have a field day.'}, status=status.HTTP_403_FORBIDDEN)
+        bundle = field_day(request.user)
+        compressed = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        # Each encoding is its own representation, so gets its own tag
+        etag = bundle['etag'][:-1] + '-gzip"' if compressed else bundle['etag']
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            if compressed:
+                response = HttpResponse(bundle['gzip'], content_type='application/json')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(gzip.decompress(bundle['gzip']), content_type='application/json')
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization', 'Cookie', 'Accept-Encoding'])
+        return response
+
+
+class OfficerRouteView(APIView):
+    """The requesting officer's home visits in visiting order (see appointments/routes.py)"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        if not request.identity.is_officer:
+            return Response({'detail': 'Only officers have home visits.'}, status=status.HTTP_403_FORBIDDEN)
+        day = _date_param(request.query_params.get('date'))
+        if day is False:
+            return Response({'date': ['Use YYYY-MM-DD.']}, status=status.HTTP_400_BAD_REQUEST)
+        start = None
+        if request.query_params.get('start'):
+            try:
+                start = tuple(float(part) for part in request.query_params['start'].split(','))
+            except ValueError:
+                start = ()
+            if len(start) != 2 or not (-90 <= start[0] <= 90 and -180 <= start[1] <= 180):
+                return Response({'start': ['Use latitude,longitude.']}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(plan_route(request.user, day, start))
+
+
+class OfficerWorkloadView(APIView):
+    """Per-officer caseload, open cases, appointments by status and no-show rate (officers get their own)"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            window_days = int(request.query_params.get('window_days', 30))
+        except ValueError:
+            return Response({'error': 'window_days must be an integer'}, status=400)
+        window_days = min(max(window_days, 1), 365)
+        
+        rows = workload_for(request.user, window_days)
+        return Response({'window_days': window_days, 'officers': rows})
+
+
 class JudgeListView(APIView):
     """Get list of judges"""
     permission_classes = [permissions.IsAuthenticated]
     
+    @conditional(Judge, User, private=True, max_age=300)
     def get(self, request):
-        judges = Judge.objects.filter(is_active=True)
+        judges = Judge.objects.filter(is_active=True).select_related('user')
         serializer = JudgeSerializer(judges, many=True)
         return Response(serializer.data)
 
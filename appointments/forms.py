@@ -1,4 +1,5 @@
 from django import forms
+from core.autocomplete import AutocompleteSelect
 from .models import Appointment
 
 class AppointmentForm(forms.ModelForm):
@@ -6,6 +7,7 @@ class AppointmentForm(forms.ModelForm):
         model = Appointment
         fields = ['client', 'appointment_type', 'scheduled_date', 'duration_minutes', 'location', 'status','notes']
         widgets = {
+            'client': AutocompleteSelect('clients'),
             'scheduled_date': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
             'notes': forms.Textarea(attrs={'rows': 3}),
         }
\ No newline at end of file
@@ -0,0 +1,33 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from appointments.sweeper import get_grace_period, sweep_no_shows
+
+
+class Command(BaseCommand):
+    help = 'Mark scheduled appointments that are past due as no-shows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=int, default=None,
+                            help='Minutes past the scheduled time before an appointment counts as missed '
+                                 '(default: NO_SHOW_GRACE_MINUTES)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running as a worker instead of exiting after one pass')
+        parser.add_argument('--interval', type=int, default=300,
+                            help='Seconds between passes when running with --loop')
+
+    def handle(self, *args, **options):
+        if options['grace_minutes'] is not None:
+            grace = timedelta(minutes=options['grace_minutes'])
+        else:
+            grace = get_grace_period()
+
+        while True:
+            swept = sweep_no_shows(grace=grace, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Marked {swept} appointments as no-show'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -30,5 +30,18 @@ class Appointment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'scheduled_date']),
+            models.Index(fields=['updated_at']),
+        ]
+    
     def __str__(self):
-        return f"{self.get_appointment_type_display()} - {self.client.full_name} - {self.scheduled_date.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"{self.get_appointment_type_display()} - {self.client.full_name} - {self.scheduled_date.strftime('%Y-%m-%d %H:%M')}"
+
+
+# Who may see which appointments (see core/scoping.py): officers their own, judges those of their clients
+from django.db.models import Q
+from core import scoping
+
+scoping.register(Appointment, officer=lambda user: Q(officer=user), judge='client')
@@ -0,0 +1,236 @@
+"""
+Ordering an officer's home visits for the day.
+
+Each visit is placed at its client's primary address (clients.geocoding)
+and may start up to ROUTE_TIME_WINDOW_MINUTES either side of its
+scheduled time. The planner looks for the shortest route that keeps
+every visit inside its window: nearest neighbour among the visits still
+reachable in time, then 2-opt (reversing a stretch of the route while
+that shortens it without making any visit later). It also improves the
+order as booked the same way and keeps whichever is better, so a plan is
+never worse than the schedule. Travel time assumes straight-line
+distance at ROUTE_SPEED_KMH.
+
+Three queries once the addresses are cached, and about a fifth of a
+second at MAX_TWO_OPT_STOPS. A 2-opt pass tries every reversal, walking
+each candidate from the reversed stretch on only until it can no longer
+beat the best so far; once no visit is late, a reversal's change in
+distance is read off its two ends without walking it at all. Passes are
+capped at MAX_TWO_OPT_PASSES, and days with more than MAX_TWO_OPT_STOPS
+visits keep the better of the two starting orders. Visits whose address
+cannot be placed are listed separately at their booked times.
+"""
+import math
+from itertools import chain
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from clients.geocoding import Query, geocode
+from clients.models import Address
+from .models import Appointment
+
+EARTH_RADIUS_KM = 6371.0
+MAX_TWO_OPT_STOPS = 30
+MAX_TWO_OPT_PASSES = 20
+
+
+@dataclass
+class Stop:
+    appointment: Appointment
+    address: Address
+    point: tuple
+    earliest: float  # Seconds since the epoch
+    latest: float
+    duration: float
+
+
+def distance_km(a, b):
+    """Great-circle distance between two (latitude, longitude) points"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+class _Planner:
+    def __init__(self, stops, start, speed_kmh):
+        self.stops = stops
+        points = [stop.point for stop in stops]
+        self.distances = [[distance_km(a, b) for b in points] for a in points]
+        self.from_start = [distance_km(start, point) for point in points] if start else None
+        self.seconds_per_km = 3600 / speed_kmh
+
+    def leg(self, previous, index):
+        if previous is None:
+            return self.from_start[index] if self.from_start else 0.0
+        return self.distances[previous][index]
+
+    def walk(self, order):
+        """(arrival, departure, leg km) per stop of order, leaving the start in time for the first visit"""
+        legs, clock, previous = [], None, None
+        for index in order:
+            stop = self.stops[index]
+            km = self.leg(previous, index)
+            arrival = stop.earliest if clock is None else max(clock + km * self.seconds_per_km, stop.earliest)
+            clock = arrival + stop.duration
+            legs.append((arrival, clock, km))
+            previous = index
+        return legs
+
+    def cost(self, order):
+        """Minutes late in total, then kilometres: lateness always counts for more"""
+        legs = self.walk(order)
+        late = sum(max(0.0, arrival - self.stops[index].latest) for index, (arrival, _, _) in zip(order, legs))
+        return round(late / 60, 3), sum(km for _, _, km in legs)
+
+    def _step(self, state, index):
+        """The (previous, clock, seconds late, km) walking state after also visiting index"""
+        previous, clock, late, km = state
+        stop = self.stops[index]
+        leg = self.leg(previous, index)
+        arrival = stop.earliest if clock is None else max(clock + leg * self.seconds_per_km, stop.earliest)
+        return index, arrival + stop.duration, late + max(0.0, arrival - stop.latest), km + leg
+
+    def _reversal_cost(self, order, i, j, state, bound):
+        """
+        cost() of order with order[i:j + 1] reversed, given the walking state
+        before order[i], or None as soon as it can no longer come in under
+        bound: lateness and distance only grow along the route.
+        """
+        for position in chain(range(j, i - 1, -1), range(j + 1, len(order))):
+            state = self._step(state, order[position])
+            if (round(state[2] / 60, 3), state[3]) >= bound:
+                return None
+        return round(state[2] / 60, 3), state[3]
+
+    def _reversal_km(self, order, i, j):
+        """Change in distance from reversing order[i:j + 1]; distances are symmetric, so only the ends change"""
+        previous = order[i - 1] if i else None
+        delta = self.leg(previous, order[j]) - self.leg(previous, order[i])
+        if j + 1 < len(order):
+            following = order[j + 1]
+            delta += self.distances[order[i]][following] - self.distances[order[j]][following]
+        return delta
+
+    def nearest_neighbour(self):
+        remaining = set(range(len(self.stops)))
+        order, clock, previous = [], None, None
+        while remaining:
+            def arrival(index):
+                if clock is None:
+                    return self.stops[index].earliest
+                return max(clock + self.leg(previous, index) * self.seconds_per_km, self.stops[index].earliest)
+            in_time = [index for index in remaining if arrival(index) <= self.stops[index].latest]
+            if in_time:
+                if previous is None and not self.from_start:
+                    # An open route simply starts with the first visit due
+                    index = min(in_time, key=lambda i: self.stops[i].earliest)
+                else:
+                    index = min(in_time, key=lambda i: self.leg(previous, i))
+            else:
+                index = min(remaining, key=lambda i: self.stops[i].latest)
+            clock = arrival(index) + self.stops[index].duration
+            order.append(index)
+            remaining.remove(index)
+            previous = index
+        return order
+
+    def two_opt(self, order):
+        if len(order) > MAX_TWO_OPT_STOPS:
+            return order
+        best = self.cost(order)
+        for _ in range(MAX_TWO_OPT_PASSES):
+            improved = False
+            state = (None, None, 0.0, 0.0)
+            for i in range(len(order) - 1):
+                # Reversals from i on leave order[:i], and so the walk up to it, as they are
+                for j in range(i + 1, len(order)):
+                    # Once nothing is late only a shorter route can be better, which the ends alone tell
+                    if best[0] == 0 and self._reversal_km(order, i, j) >= 0:
+                        continue
+                    cost = self._reversal_cost(order, i, j, state, best)
+                    if cost is not None:
+                        order, best, improved = order[:i] + order[i:j + 1][::-1] + order[j + 1:], cost, True
+                state = self._step(state, order[i])
+            if not improved:
+                break
+        return order
+
+    def plan(self):
+        booked = sorted(range(len(self.stops)), key=lambda i: self.stops[i].earliest)
+        return min((self.two_opt(self.nearest_neighbour()), self.two_opt(booked)), key=self.cost)
+
+
+def _primary_addresses(client_ids):
+    """Each client's primary address, else their home address, else any"""
+    addresses = {}
+    for address in Address.objects.filter(client_id__in=client_ids).order_by('pk'):
+        rank = (not address.is_primary, address.address_type != 'home')
+        if address.client_id not in addresses or rank < addresses[address.client_id][0]:
+            addresses[address.client_id] = (rank, address)
+    return {client_id: address for client_id, (_, address) in addresses.items()}
+
+
+def plan_route(officer, day=None, start=None):
+    """
+    The officer's scheduled home visits on day (default today) in visiting
+    order, with arrival times; start is an optional (latitude, longitude)
+    the officer sets out from.
+    """
+    day = day or timezone.localdate()
+    window = timedelta(minutes=getattr(settings, 'ROUTE_TIME_WINDOW_MINUTES', 60)).total_seconds()
+    speed_kmh = getattr(settings, 'ROUTE_SPEED_KMH', 40)
+
+    visits = list(Appointment.objects.filter(
+        officer=officer, appointment_type='home_visit', status='scheduled', scheduled_date__date=day,
+    ).select_related('client').order_by('scheduled_date'))
+    addresses = _primary_addresses({visit.client_id for visit in visits})
+    queries = {client_id: Query.for_address(address) for client_id, address in addresses.items()}
+    points = geocode(queries.values())
+
+    stops, unplaced = [], []
+    for visit in visits:
+        address = addresses.get(visit.client_id)
+        point = points[queries[visit.client_id]] if address else None
+        if point is None:
+            unplaced.append({
+                'appointment': visit.pk,
+                'client': visit.client.full_name,
+                'scheduled_date': visit.scheduled_date,
+                'reason': 'no address' if address is None else 'address could not be located',
+            })
+            continue
+        scheduled = visit.scheduled_date.timestamp()
+        stops.append(Stop(visit, address, point, scheduled - window, scheduled + window, visit.duration_minutes * 60))
+
+    planner = _Planner(stops, start, speed_kmh)
+    order = planner.plan() if stops else []
+    legs = planner.walk(order)
+
+    def at(seconds):
+        return datetime.fromtimestamp(seconds, tz=timezone.get_current_timezone())
+
+    return {
+        'date': day,
+        'start': start,
+        'distance_km': round(sum(km for _, _, km in legs), 2),
+        'booked_order_km': round(planner.cost(sorted(range(len(stops)), key=lambda i: stops[i].earliest))[1], 2),
+        'stops': [
+            {
+                'appointment': stops[index].appointment.pk,
+                'client': stops[index].appointment.client.full_name,
+                'address': queries[stops[index].appointment.client_id].text(),
+                'latitude': stops[index].point[0],
+                'longitude': stops[index].point[1],
+                'scheduled_date': stops[index].appointment.scheduled_date,
+                'arrival': at(arrival),
+                'departure': at(departure),
+                'minutes_late': round(max(0.0, arrival - stops[index].latest) / 60),
+                'leg_km': round(km, 2),
+            }
+            for index, (arrival, departure, km) in zip(order, legs)
+        ],
+        'unplaced': unplaced,
+    }
@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+# Sent after a sweep flips overdue appointments to 'no_show' with a set-based
+# UPDATE (which bypasses post_save). Receivers get:
+#   appointments: list of dicts with id, client_id, officer_id,
+#                 appointment_type and scheduled_date of the swept rows
+#   client_ids:   set of affected client ids
+appointments_marked_no_show = Signal()
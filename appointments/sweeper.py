@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from comms.models import Notification, invalidate_inbox
+from core.cache_versions import mark_changed
+from .models import Appointment
+from .signals import appointments_marked_no_show
+
+APPOINTMENT_TYPES = dict(Appointment.TYPE_CHOICES)
+
+
+def get_grace_period():
+    """How long a scheduled appointment may stay un-updated before it counts as a no-show"""
+    return timedelta(minutes=getattr(settings, 'NO_SHOW_GRACE_MINUTES', 120))
+
+
+def _overdue_batch(cutoff, batch_size):
+    queryset = Appointment.objects.filter(
+        status='scheduled',
+        scheduled_date__lt=cutoff,
+    ).order_by('scheduled_date', 'id')
+    if connection.features.has_select_for_update_skip_locked:
+        # Lets several sweepers run side by side without touching the same rows
+        queryset = queryset.select_for_update(skip_locked=True, of=('self',))
+    return list(queryset.values(
+        'id', 'client_id', 'officer_id', 'appointment_type', 'scheduled_date',
+        'client__first_name', 'client__last_name',
+    )[:batch_size])
+
+
+def _no_show_notifications(rows):
+    for row in rows:
+        label = APPOINTMENT_TYPES.get(row['appointment_type'], row['appointment_type'])
+        local_date = timezone.localtime(row['scheduled_date'])
+        yield Notification(
+            user_id=row['officer_id'],
+            notification_type='appointment',
+            title=f"Marked as no-show: {label}",
+            message=(
+                f"{label} with {row['client__first_name']} {row['client__last_name']} on "
+                f"{local_date.strftime('%Y-%m-%d %H:%M')} was never updated and has been marked as a no-show."
+            ),
+            related_object_id=row['id'],
+            related_content_type='appointments.appointment',
+            dedupe_key=f"no_show:{row['id']}",
+        )
+
+
+def sweep_no_shows(now=None, grace=None, batch_size=500):
+    """
+    Flip scheduled appointments that are past due by more than the grace
+    period to 'no_show', one UPDATE per batch. Returns the number of
+    appointments swept.
+    """
+    now = now or timezone.now()
+    cutoff = now - (grace if grace is not None else get_grace_period())
+    swept = 0
+
+    while True:
+        with transaction.atomic():
+            rows = _overdue_batch(cutoff, batch_size)
+            if not rows:
+                break
+
+            ids = [row['id'] for row in rows]
+            Appointment.objects.filter(pk__in=ids, status='scheduled').update(
+                status='no_show',
+                updated_at=now,
+            )
+            notifications = list(_no_show_notifications(rows))
+            Notification.objects.bulk_create(notifications, ignore_conflicts=True)
+            invalidate_inbox(*(notification.user_id for notification in notifications))
+            mark_changed(Appointment)
+
+            appointments_marked_no_show.send(
+                sender=Appointment,
+                appointments=rows,
+                client_ids={row['client_id'] for row in rows},
+            )
+        swept += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    return swept
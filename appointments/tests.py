@@ -0,0 +1,152 @@
+import math
+import random
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from cases.models import Case
+from clients.models import Address, ZipCentroid
+from clients.tests import make_client
+from core.scoping import visible
+from users.models import User
+from .models import Appointment
+from .routes import MAX_TWO_OPT_STOPS, Stop, _Planner, plan_route
+
+
+class AppointmentVisibilityTests(TestCase):
+    """Officers see the appointments they hold, judges those of their cases' clients, admins all"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin')
+        cls.officer = User.objects.create_user('officer', user_type='officer')
+        cls.other_officer = User.objects.create_user('other-officer', user_type='officer')
+        cls.judge = User.objects.create_user('judge', user_type='judge')
+
+        client = make_client('C-1', cls.officer, cls.admin)
+        other_client = make_client('C-2', cls.other_officer, cls.admin)
+        Case.objects.create(client=client, officer=cls.officer, presiding_judge=cls.judge, objectives='-')
+        when = timezone.make_aware(datetime(2025, 3, 1, 10))
+
+        def appointment(client, officer):
+            return Appointment.objects.create(client=client, officer=officer, appointment_type='checkin',
+                                              scheduled_date=when, location='Office')
+
+        cls.own = appointment(client, cls.officer)
+        # Covering for a colleague: the officer holding the appointment sees it, not the client's officer
+        cls.covered = appointment(client, cls.other_officer)
+        cls.others = appointment(other_client, cls.other_officer)
+
+    def test_officer_sees_appointments_they_hold(self):
+        self.assertEqual(set(visible(Appointment, self.officer)), {self.own})
+        self.assertEqual(set(visible(Appointment, self.other_officer)), {self.covered, self.others})
+
+    def test_judge_sees_appointments_of_their_clients(self):
+        self.assertEqual(set(visible(Appointment, self.judge)), {self.own, self.covered})
+
+    def test_admin_sees_every_appointment(self):
+        self.assertEqual(set(visible(Appointment, self.admin)), {self.own, self.covered, self.others})
+
+
+def make_stops(points, window=3600, duration=0, interval=600):
+    """Stops at (latitude, longitude) points booked interval seconds apart in the order given"""
+    return [
+        Stop(None, None, point, index * interval - window, index * interval + window, duration)
+        for index, point in enumerate(points)
+    ]
+
+
+class RoutePlannerTests(SimpleTestCase):
+    # 0.1 degrees of longitude on the equator is about 11 km, a quarter of an hour at 40 km/h
+
+    def booked(self, planner):
+        return sorted(range(len(planner.stops)), key=lambda i: planner.stops[i].earliest)
+
+    def test_reorders_visits_along_the_way(self):
+        planner = _Planner(make_stops([(0, 0), (0, 0.3), (0, 0.1), (0, 0.2)]), None, 40)
+        order = planner.plan()
+        self.assertEqual(order, [0, 2, 3, 1])
+        late, km = planner.cost(order)
+        self.assertEqual(late, 0)
+        self.assertAlmostEqual(km, 33.4, delta=0.1)
+        self.assertLess(km, planner.cost(self.booked(planner))[1])
+
+    def test_keeps_booked_order_when_windows_allow_nothing_else(self):
+        planner = _Planner(make_stops([(0, 0), (0, 0.3), (0, 0.1), (0, 0.2)], window=0, interval=3600), None, 40)
+        order = planner.plan()
+        self.assertEqual(order, [0, 1, 2, 3])
+        self.assertEqual(planner.cost(order)[0], 0)
+
+    def test_starts_nearest_the_start_point(self):
+        planner = _Planner(make_stops([(0, 0), (0, 0.1), (0, 0.2)]), (0, 0.25), 40)
+        self.assertEqual(planner.plan(), [2, 1, 0])
+
+    def test_reversals_are_costed_as_a_full_walk_would(self):
+        rng = random.Random(7)
+        planner = _Planner(make_stops([(rng.uniform(0, 0.3), rng.uniform(0, 0.3)) for _ in range(12)],
+                                      window=1200), (0, 0), 40)
+        order = planner.nearest_neighbour()
+        state = (None, None, 0.0, 0.0)
+        unbounded = (math.inf, math.inf)
+        for i in range(len(order) - 1):
+            for j in range(i + 1, len(order)):
+                reversed_order = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                cost = planner.cost(reversed_order)
+                self.assertEqual(planner._reversal_cost(order, i, j, state, unbounded), cost)
+                self.assertAlmostEqual(planner._reversal_km(order, i, j), cost[1] - planner.cost(order)[1])
+                self.assertIsNone(planner._reversal_cost(order, i, j, state, cost))
+            state = planner._step(state, order[i])
+
+    def test_long_days_are_bounded_and_never_worse_than_booked(self):
+        rng = random.Random(4)
+        points = [(rng.uniform(0, 0.5), rng.uniform(0, 0.5)) for _ in range(MAX_TWO_OPT_STOPS * 2)]
+        for stops in (points[:MAX_TWO_OPT_STOPS], points):
+            planner = _Planner(make_stops(stops, window=4 * 3600), None, 40)
+            order = planner.plan()
+            self.assertEqual(sorted(order), list(range(len(stops))))
+            self.assertLessEqual(planner.cost(order), planner.cost(self.booked(planner)))
+
+
+class PlanRouteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.officer = User.objects.create_user('officer', user_type='officer')
+        admin = User.objects.create_user('admin', user_type='admin')
+        ZipCentroid.objects.bulk_create([
+            ZipCentroid(zip_code='10000', latitude=0, longitude=0),
+            ZipCentroid(zip_code='10001', latitude=0, longitude=0.1),
+            ZipCentroid(zip_code='10002', latitude=0, longitude=0.2),
+        ])
+        cls.day = timezone.localdate() + timedelta(days=1)
+        start = timezone.make_aware(datetime.combine(cls.day, datetime.min.time()) + timedelta(hours=9))
+        # Booked one end, the other end, then the middle; the visit without an address cannot be placed
+        for index, zip_code in enumerate(['10002', '10000', '10001', None]):
+            client = make_client(f'C-{index}', cls.officer, admin)
+            if zip_code:
+                Address.objects.create(client=client, address_type='home', street=f'{index} Main St', city='Town',
+                                       state='ST', zip_code=zip_code, is_primary=True)
+            Appointment.objects.create(client=client, officer=cls.officer, appointment_type='home_visit',
+                                       scheduled_date=start + timedelta(minutes=10 * index), location='Home')
+
+    def test_plans_the_day_and_lists_unplaced_visits(self):
+        route = plan_route(self.officer, self.day)
+        self.assertEqual([stop['client'] for stop in route['stops']], ['Test C-0', 'Test C-2', 'Test C-1'])
+        self.assertTrue(all(stop['minutes_late'] == 0 for stop in route['stops']))
+        self.assertLess(route['distance_km'], route['booked_order_km'])
+        self.assertEqual([(visit['client'], visit['reason']) for visit in route['unplaced']],
+                         [('Test C-3', 'no address')])
+
+    def test_reloading_centroids_forgets_old_answers(self):
+        plan_route(self.officer, self.day)
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / 'zips.csv'
+            path.write_text('zip,lat,lng\n10002,0,0.05\n')
+            call_command('load_zip_centroids', str(path), stdout=StringIO())
+        stops = {stop['client']: stop for stop in plan_route(self.officer, self.day)['stops']}
+        self.assertEqual(stops['Test C-0']['longitude'], 0.05)
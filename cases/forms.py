@@ -1,5 +1,7 @@
 from django import forms
-from .models import Case, RehabilitationPlan, PlanItem
+from django.utils import timezone
+from core.autocomplete import AutocompleteSelect
+from .models import Case, RehabilitationPlan, PlanItem, PlanTemplate
 
 class CaseForm(forms.ModelForm):
     class Meta:
@@ -16,6 +18,9 @@ class CaseForm(forms.ModelForm):
             'objectives': forms.Textarea(attrs={'rows': 4}),
             'special_conditions': forms.Textarea(attrs={'rows': 3}),
             'court_notes': forms.Textarea(attrs={'rows': 3}),
+            'client': AutocompleteSelect('clients'),
+            'officer': AutocompleteSelect('officers'),
+            'presiding_judge': AutocompleteSelect('judge-users'),
         }
     
     def __init__(self, *args, **kwargs):
@@ -48,4 +53,8 @@ class PlanItemForm(forms.ModelForm):
         widgets = {
             'due_date': forms.DateInput(attrs={'type': 'date'}),
             'notes': forms.Textarea(attrs={'rows': 3}),
-        }
\ No newline at end of file
+        }
+
+class PlanFromTemplateForm(forms.Form):
+    template = forms.ModelChoiceField(queryset=PlanTemplate.objects.filter(is_active=True))
+    start_date = forms.DateField(initial=timezone.now, widget=forms.DateInput(attrs={'type': 'date'}))
@@ -1,4 +1,7 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import connection, models, transaction
+from django.db.models import Count, Exists, OuterRef, Q
 from clients.models import Client
 from users.models import User
 from django.utils import timezone
@@ -83,6 +86,31 @@ class Case(models.Model):
     class Meta:
         ordering = ['-opening_date']
 
+class RehabilitationPlanQuerySet(models.QuerySet):
+    def with_progress(self):
+        """Annotate item counts so progress_percentage needs no extra queries"""
+        return self.annotate(
+            total_items=Count('plan_items'),
+            completed_items=Count('plan_items', filter=Q(plan_items__is_completed=True)),
+        )
+    
+    def behind_schedule(self, as_of=None):
+        """Open plans with at least one item past its due date and still not completed"""
+        as_of = as_of or timezone.now().date()
+        overdue = PlanItem.objects.filter(
+            rehabilitation_plan=OuterRef('pk'),
+            completed_date__isnull=True,
+            is_completed=False,
+            due_date__lt=as_of,
+        )
+        return self.filter(Exists(overdue), is_completed=False).annotate(
+            overdue_items=Count('plan_items', filter=Q(
+                plan_items__completed_date__isnull=True,
+                plan_items__is_completed=False,
+                plan_items__due_date__lt=as_of,
+            )),
+        )
+
 class RehabilitationPlan(models.Model):
     case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name='rehabilitation_plans')
     title = models.CharField(max_length=255)
@@ -92,17 +120,47 @@ class RehabilitationPlan(models.Model):
     is_completed = models.BooleanField(default=False)
     judicial_review_required = models.BooleanField(default=False)
     
+    objects = RehabilitationPlanQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.title} - {self.case.client.full_name}"
     
     @property
     def progress_percentage(self):
-        total_items = self.plan_items.count()
+        if hasattr(self, 'total_items'):
+            # Annotated by RehabilitationPlanQuerySet.with_progress()
+            total_items, completed_items = self.total_items, self.completed_items
+        elif 'plan_items' in getattr(self, '_prefetched_objects_cache', {}):
+            items = self.plan_items.all()
+            total_items = len(items)
+            completed_items = sum(1 for item in items if item.is_completed)
+        else:
+            total_items = self.plan_items.count()
+            completed_items = self.plan_items.filter(is_completed=True).count() if total_items else 0
         if total_items == 0:
             return 0
-        completed_items = self.plan_items.filter(is_completed=True).count()
         return (completed_items / total_items) * 100
 
+class PlanItemQuerySet(models.QuerySet):
+    def set_completed(self, completed=True, on=None):
+        """
+        Complete (or re-open) every item in the queryset with one UPDATE,
+        stamping completed_date. Items already in that state are left as they
+        are. Returns the ids that changed.
+        """
+        on = on or timezone.now().date()
+        with transaction.atomic():
+            changed = list(self.filter(is_completed=not completed).values_list('pk', flat=True))
+            if changed:
+                PlanItem.objects.filter(pk__in=changed).update(
+                    is_completed=completed,
+                    completed_date=on if completed else None,
+                )
+                # update() skips post_save, so bring the review queue along by hand
+                from judges.models import JudicialReviewItem
+                JudicialReviewItem.sync_plan_items(changed)
+        return changed
+
 class PlanItem(models.Model):
     rehabilitation_plan = models.ForeignKey(RehabilitationPlan, on_delete=models.CASCADE, related_name='plan_items')
     description = models.TextField()
@@ -112,5 +170,90 @@ class PlanItem(models.Model):
     notes = models.TextField(blank=True)
     requires_judicial_review = models.BooleanField(default=False)
     
+    objects = PlanItemQuerySet.as_manager()
+    
+    def __str__(self):
+        return f"{self.description[:50]}..."
+
+class PlanTemplate(models.Model):
+    """Reusable programme, e.g. 12 weekly sessions, instantiated onto cases as a plan"""
+    name = models.CharField(max_length=255, unique=True)
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    duration_days = models.PositiveIntegerField()
+    judicial_review_required = models.BooleanField(default=False)
+    is_active = models.BooleanField(default=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='plan_templates')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+    
+    def instantiate(self, cases, start_date=None):
+        """
+        Create a plan with every template item for each case, with due dates
+        relative to start_date. Uses one bulk INSERT for the plans and one
+        for the items however many cases are given. Returns the new plans.
+        """
+        start_date = start_date or timezone.now().date()
+        template_items = list(self.items.all())
+        with transaction.atomic():
+            plans = [
+                RehabilitationPlan(
+                    case=case,
+                    title=self.title,
+                    description=self.description,
+                    start_date=start_date,
+                    end_date=start_date + timedelta(days=self.duration_days),
+                    judicial_review_required=self.judicial_review_required,
+                )
+                for case in cases
+            ]
+            if connection.features.can_return_rows_from_bulk_insert:
+                RehabilitationPlan.objects.bulk_create(plans)
+            else:
+                # The items need the plans' ids
+                for plan in plans:
+                    plan.save()
+            items = PlanItem.objects.bulk_create([
+                PlanItem(
+                    rehabilitation_plan=plan,
+                    description=item.description,
+                    due_date=start_date + timedelta(days=item.offset_days),
+                    notes=item.notes,
+                    requires_judicial_review=item.requires_judicial_review,
+                )
+                for plan in plans
+                for item in template_items
+            ], batch_size=1000)
+            if any(item.requires_judicial_review for item in template_items):
+                from judges.models import JudicialReviewItem
+                JudicialReviewItem.sync_plan_items(
+                    PlanItem.objects.filter(rehabilitation_plan__in=plans, requires_judicial_review=True)
+                    .values_list('pk', flat=True)
+                )
+        return plans
+
+class PlanTemplateItem(models.Model):
+    template = models.ForeignKey(PlanTemplate, on_delete=models.CASCADE, related_name='items')
+    description = models.TextField()
+    offset_days = models.PositiveIntegerField(help_text="Days after the plan start the item is due")
+    notes = models.TextField(blank=True)
+    requires_judicial_review = models.BooleanField(default=False)
+    
+    class Meta:
+        ordering = ['offset_days', 'pk']
+    
     def __str__(self):
-        return f"{self.description[:50]}..."
\ No newline at end of file
+        return f"{self.template.name}: {self.description[:50]}"
+
+
+# Who may see which cases and plans (see core/scoping.py)
+from core import scoping
+
+scoping.register(Case, officer=lambda user: Q(officer=user), judge=lambda user: Q(presiding_judge=user))
+scoping.register(RehabilitationPlan, officer='case', judge='case')
+scoping.register(PlanItem, officer='rehabilitation_plan', judge='rehabilitation_plan')
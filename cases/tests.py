@@ -0,0 +1,52 @@
+from datetime import date
+
+from django.test import TestCase
+
+from clients.tests import make_client
+from core.scoping import visible
+from users.models import User
+from .models import Case, PlanItem, RehabilitationPlan
+
+
+class CaseVisibilityTests(TestCase):
+    """Officers see the cases they run, judges those they preside over, admins all; plans and items follow"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin')
+        cls.officer = User.objects.create_user('officer', user_type='officer')
+        cls.other_officer = User.objects.create_user('other-officer', user_type='officer')
+        cls.judge = User.objects.create_user('judge', user_type='judge')
+        cls.other_judge = User.objects.create_user('other-judge', user_type='judge')
+
+        client = make_client('C-1', cls.officer, cls.admin)
+        # The case is run by another officer than the client's, so the two rules can be told apart
+        cls.own = Case.objects.create(client=client, officer=cls.officer, presiding_judge=cls.judge,
+                                      case_number='K-1', objectives='-')
+        cls.others = Case.objects.create(client=client, officer=cls.other_officer,
+                                         presiding_judge=cls.other_judge, case_number='K-2', objectives='-')
+        cls.unassigned = Case.objects.create(client=client, officer=cls.other_officer, case_number='K-3',
+                                             objectives='-')
+        cls.plan = RehabilitationPlan.objects.create(case=cls.own, title='Plan', description='-',
+                                                     start_date=date(2025, 1, 1), end_date=date(2025, 6, 1))
+        cls.other_plan = RehabilitationPlan.objects.create(case=cls.others, title='Plan', description='-',
+                                                           start_date=date(2025, 1, 1), end_date=date(2025, 6, 1))
+        cls.item = PlanItem.objects.create(rehabilitation_plan=cls.plan, description='-', due_date=date(2025, 2, 1))
+        PlanItem.objects.create(rehabilitation_plan=cls.other_plan, description='-', due_date=date(2025, 2, 1))
+
+    def test_officer_sees_own_cases(self):
+        self.assertEqual(set(visible(Case, self.officer)), {self.own})
+        self.assertEqual(set(visible(Case, self.other_officer)), {self.others, self.unassigned})
+
+    def test_judge_sees_presided_cases(self):
+        self.assertEqual(set(visible(Case, self.judge)), {self.own})
+        self.assertEqual(set(visible(Case, self.other_judge)), {self.others})
+
+    def test_admin_sees_every_case(self):
+        self.assertEqual(set(visible(Case, self.admin)), {self.own, self.others, self.unassigned})
+
+    def test_plans_and_items_follow_their_case(self):
+        for user in (self.officer, self.judge):
+            self.assertEqual(set(visible(RehabilitationPlan, user)), {self.plan})
+            self.assertEqual(set(visible(PlanItem, user)), {self.item})
+        self.assertEqual(visible(PlanItem, self.admin).count(), 2)
@@ -2,7 +2,7 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Case, RehabilitationPlan, PlanItem
-from .forms import CaseForm, RehabilitationPlanForm, PlanItemForm
+from .forms import CaseForm, RehabilitationPlanForm, PlanItemForm, PlanFromTemplateForm
 
 @login_required
 def case_list(request):
@@ -12,7 +12,7 @@ def case_list(request):
 @login_required
 def case_detail(request, pk):
     case = get_object_or_404(Case, pk=pk)
-    rehabilitation_plans = case.rehabilitation_plans.all()
+    rehabilitation_plans = case.rehabilitation_plans.with_progress()
     
     context = {
         'case': case,
@@ -37,7 +37,16 @@ def case_create(request):
 def rehabilitation_plan_create(request, case_pk):
     case = get_object_or_404(Case, pk=case_pk)
     
-    if request.method == 'POST':
+    form = RehabilitationPlanForm()
+    template_form = PlanFromTemplateForm()
+    if request.method == 'POST' and 'template' in request.POST:
+        template_form = PlanFromTemplateForm(request.POST)
+        if template_form.is_valid():
+            template = template_form.cleaned_data['template']
+            template.instantiate([case], template_form.cleaned_data['start_date'])
+            messages.success(request, f'Rehabilitation plan created from "{template.name}"!')
+            return redirect('case_detail', pk=case_pk)
+    elif request.method == 'POST':
         form = RehabilitationPlanForm(request.POST)
         if form.is_valid():
             rehabilitation_plan = form.save(commit=False)
@@ -45,11 +54,10 @@ def rehabilitation_plan_create(request, case_pk):
             rehabilitation_plan.save()
             messages.success(request, 'Rehabilitation plan created successfully!')
             return redirect('case_detail', pk=case_pk)
-    else:
-        form = RehabilitationPlanForm()
     
     return render(request, 'cases/rehabilitation_plan_form.html', {
         'form': form,
+        'template_form': template_form,
         'case': case,
         'title': 'Add Rehabilitation Plan'
     })
\ No newline at end of file
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from core.admin import AutocompleteFilter, LargeTableAdmin
 from .models import Client, Address, Offense
 
 class AddressInline(admin.TabularInline):
@@ -10,11 +11,20 @@ class OffenseInline(admin.TabularInline):
     extra = 1
 
 @admin.register(Client)
-class ClientAdmin(admin.ModelAdmin):
+class ClientAdmin(LargeTableAdmin, admin.ModelAdmin):
     list_display = ('case_number', 'first_name', 'last_name', 'assigned_officer', 'status', 'risk_level')
-    list_filter = ('status', 'risk_level', 'assigned_officer')
+    list_filter = ('status', 'risk_level', ('assigned_officer', AutocompleteFilter))
+    list_select_related = ('assigned_officer',)
     search_fields = ('case_number', 'first_name', 'last_name')
+    autocomplete_fields = ('assigned_officer',)
     inlines = [AddressInline, OffenseInline]
 
-admin.site.register(Address)
-admin.site.register(Offense)
\ No newline at end of file
+@admin.register(Address)
+class AddressAdmin(LargeTableAdmin, admin.ModelAdmin):
+    list_select_related = ('client',)
+    autocomplete_fields = ('client',)
+
+@admin.register(Offense)
+class OffenseAdmin(LargeTableAdmin, admin.ModelAdmin):
+    list_select_related = ('client',)
+    autocomplete_fields = ('client',)
@@ -0,0 +1,183 @@
+import heapq
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from appointments.models import Appointment
+from cases.models import Case
+from core.cache_versions import mark_changed
+from users.models import User
+from .models import Client
+
+RISK_WEIGHTS = {'low': 1, 'medium': 2, 'high': 3}
+UPDATE_CHUNK_SIZE = 900  # Stays under SQLite's bound parameter limit
+
+
+def _weight(risk_level):
+    return RISK_WEIGHTS.get(risk_level, 2)
+
+
+def _group_key(officer, by_department):
+    return officer['department'] if by_department else None
+
+
+def plan_reassignment(leaving_officer=None, by_department=False):
+    """
+    Propose client moves that minimise the spread of risk-weighted caseloads
+    across active officers. With leaving_officer every client of that officer
+    is handed out, heaviest first, to the least loaded officer; otherwise
+    active clients are moved from the most to the least loaded officer while
+    that narrows the gap. With by_department clients only move between
+    officers of the same department.
+
+    Returns a dict with 'moves' as (client_id, case_number, from_id, to_id)
+    tuples, 'loads_before' and 'loads_after' by officer id, 'officers' by id
+    and 'unassigned' case numbers that had no eligible officer.
+    """
+    officers = {
+        officer['id']: officer
+        for officer in User.objects.filter(user_type='officer', is_active_officer=True).values(
+            'id', 'username', 'first_name', 'last_name', 'department',
+        )
+    }
+    leaving_id = leaving_officer.pk if leaving_officer is not None else None
+    if leaving_officer is not None:
+        officers[leaving_id] = {
+            'id': leaving_id, 'username': leaving_officer.username,
+            'first_name': leaving_officer.first_name, 'last_name': leaving_officer.last_name,
+            'department': leaving_officer.department,
+        }
+
+    loads = defaultdict(int)
+    # Clients per officer bucketed by weight, so picking one to move is O(1)
+    buckets = defaultdict(lambda: defaultdict(list))
+    leaving_clients = []
+    rows = Client.objects.filter(assigned_officer__in=list(officers)).values_list(
+        'id', 'case_number', 'assigned_officer_id', 'risk_level', 'status',
+    )
+    for client_id, case_number, officer_id, risk_level, status in rows.iterator(chunk_size=5000):
+        weight = _weight(risk_level)
+        if officer_id == leaving_id:
+            # A departing officer hands over every client, not just active ones
+            leaving_clients.append((weight, client_id, case_number))
+        elif status == 'active':
+            loads[officer_id] += weight
+            buckets[officer_id][weight].append((client_id, case_number))
+
+    groups = defaultdict(list)
+    for officer_id, officer in officers.items():
+        if officer_id != leaving_id:
+            groups[_group_key(officer, by_department)].append(officer_id)
+
+    loads_before = {officer_id: loads[officer_id] for officer_id in officers}
+    moves = []
+    unassigned = set()
+
+    if leaving_officer is not None:
+        group = groups.get(_group_key(officers[leaving_id], by_department), [])
+        heap = [(loads[officer_id], officer_id) for officer_id in group]
+        heapq.heapify(heap)
+        for weight, client_id, case_number in sorted(leaving_clients, reverse=True):
+            if not heap:
+                unassigned.add(case_number)
+                continue
+            load, officer_id = heapq.heappop(heap)
+            moves.append((client_id, case_number, leaving_id, officer_id))
+            loads[officer_id] = load + weight
+            heapq.heappush(heap, (loads[officer_id], officer_id))
+        loads_before[leaving_id] = sum(weight for weight, _, _ in leaving_clients)
+    else:
+        for group in groups.values():
+            moves.extend(_even_out(group, loads, buckets))
+
+    loads_after = {officer_id: loads[officer_id] for officer_id in officers}
+    if leaving_officer is not None:
+        loads_after[leaving_id] = sum(
+            weight for weight, _, case_number in leaving_clients if case_number in unassigned
+        )
+
+    return {
+        'moves': moves,
+        'loads_before': loads_before,
+        'loads_after': loads_after,
+        'officers': officers,
+        'unassigned': sorted(unassigned),
+    }
+
+
+def _even_out(officer_ids, loads, buckets):
+    """
+    Move clients from the heaviest to the lightest officer while it narrows
+    the gap. A client that has been moved is not moved again, so each client
+    appears in at most one move.
+    """
+    if len(officer_ids) < 2:
+        return []
+    max_heap = [(-loads[officer_id], officer_id) for officer_id in officer_ids]
+    min_heap = [(loads[officer_id], officer_id) for officer_id in officer_ids]
+    heapq.heapify(max_heap)
+    heapq.heapify(min_heap)
+    moves = []
+
+    def pop_current(heap, sign):
+        # Both heaps hold stale entries after a move; skip until one matches
+        while True:
+            load, officer_id = heapq.heappop(heap)
+            if sign * load == loads[officer_id]:
+                return officer_id
+
+    while True:
+        heaviest = pop_current(max_heap, -1)
+        lightest = pop_current(min_heap, 1)
+        gap = loads[heaviest] - loads[lightest]
+        # Only a client lighter than the gap makes the two officers more even
+        weight = next(
+            (w for w in sorted(buckets[heaviest], reverse=True) if w < gap and buckets[heaviest][w]),
+            None,
+        )
+        if heaviest == lightest or weight is None:
+            break
+        client_id, case_number = buckets[heaviest][weight].pop()
+        loads[heaviest] -= weight
+        loads[lightest] += weight
+        moves.append((client_id, case_number, heaviest, lightest))
+        for officer_id in (heaviest, lightest):
+            heapq.heappush(max_heap, (-loads[officer_id], officer_id))
+            heapq.heappush(min_heap, (loads[officer_id], officer_id))
+    return moves
+
+
+def apply_reassignment(moves):
+    """
+    Apply planned moves in one transaction: the clients, their cases that are
+    not closed and their future scheduled appointments follow the new officer.
+    Issues one UPDATE per target officer and table (chunked for large moves).
+    """
+    from reporting.rollups import refresh_appointment_rollups
+    from reporting.workload import invalidate_officer_workload
+
+    # A client's last move is where it ends up, whatever order the UPDATEs run in
+    targets = {client_id: to_id for client_id, _, _, to_id in moves}
+    by_target = defaultdict(list)
+    for client_id, to_id in targets.items():
+        by_target[to_id].append(client_id)
+
+    now = timezone.now()
+    with transaction.atomic():
+        for officer_id, client_ids in by_target.items():
+            for start in range(0, len(client_ids), UPDATE_CHUNK_SIZE):
+                chunk = client_ids[start:start + UPDATE_CHUNK_SIZE]
+                Client.objects.filter(pk__in=chunk).update(assigned_officer_id=officer_id, updated_at=now)
+                Case.objects.filter(client_id__in=chunk).exclude(status='closed').update(officer_id=officer_id)
+                Appointment.objects.filter(
+                    client_id__in=chunk,
+                    status='scheduled',
+                    scheduled_date__gte=now,
+                ).update(officer_id=officer_id, updated_at=now)
+        if moves:
+            # Only future appointments changed officer, so only those days need rebuilding
+            refresh_appointment_rollups(start_day=timezone.localtime(now).date())
+        transaction.on_commit(invalidate_officer_workload)
+        mark_changed(Client, Case, Appointment)
+    return len(moves)
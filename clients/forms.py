@@ -40,4 +40,16 @@ class OffenseForm(forms.ModelForm):
         widgets = {
             'date_committed': forms.DateInput(attrs={'type': 'date'}),
             'description': forms.Textarea(attrs={'rows': 3}),
-        }
\ No newline at end of file
+        }
+class ClientImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV, JSON array or JSON Lines (.csv, .json, .jsonl)")
+    dry_run = forms.BooleanField(required=False, label="Validate only, don't save")
+    
+    def clean_file(self):
+        from .importers import detect_format
+        upload = self.cleaned_data['file']
+        try:
+            self.file_format = detect_format(upload.name)
+        except ValueError as exc:
+            raise forms.ValidationError(str(exc))
+        return upload
@@ -0,0 +1,88 @@
+"""
+Coordinates for client addresses.
+
+The geocoder is pluggable: GEOCODER names a class whose geocode(queries)
+takes {key: Query} and returns {key: (latitude, longitude)} for the ones
+it could place. The default, ZipCentroidGeocoder, looks ZIP codes up in
+the local ZipCentroid table (load_zip_centroids fills it), which is
+close enough to order a day's visits. A geocoding service can be slotted
+in the same way.
+
+Every answer, including "not found", is kept in GeocodedAddress, so each
+distinct address goes to the geocoder once. Loading new centroids clears
+the misses and the answers placed at the old centroids, so they are
+looked up again.
+"""
+import hashlib
+import re
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import GeocodedAddress, ZipCentroid
+
+
+@dataclass(frozen=True)
+class Query:
+    street: str
+    city: str
+    state: str
+    zip_code: str
+
+    @classmethod
+    def for_address(cls, address):
+        return cls(address.street, address.city, address.state, address.zip_code)
+
+    def text(self):
+        return re.sub(r'\s+', ' ', f'{self.street}, {self.city}, {self.state} {self.zip_code}'.strip().lower())
+
+    def key(self):
+        return hashlib.sha256(self.text().encode()).hexdigest()
+
+
+class ZipCentroidGeocoder:
+    """Places each address at the centre of its ZIP code"""
+
+    def geocode(self, queries):
+        zips = {key: query.zip_code.strip()[:5] for key, query in queries.items()}
+        centroids = {
+            zip_code: (latitude, longitude)
+            for zip_code, latitude, longitude in ZipCentroid.objects.filter(
+                zip_code__in=set(zips.values())
+            ).values_list('zip_code', 'latitude', 'longitude')
+        }
+        return {key: centroids[zip_code] for key, zip_code in zips.items() if zip_code in centroids}
+
+
+def get_geocoder():
+    return import_string(getattr(settings, 'GEOCODER', 'clients.geocoding.ZipCentroidGeocoder'))()
+
+
+def geocode(queries):
+    """
+    Coordinates of each Query in queries (an iterable), as
+    {query: (latitude, longitude) or None}, using the cache first.
+    """
+    by_key = {query.key(): query for query in queries}
+    cached = {
+        key: (latitude, longitude) if latitude is not None else None
+        for key, latitude, longitude in GeocodedAddress.objects.filter(
+            key__in=by_key
+        ).values_list('key', 'latitude', 'longitude')
+    }
+    missing = {key: query for key, query in by_key.items() if key not in cached}
+    if missing:
+        geocoder = get_geocoder()
+        found = geocoder.geocode(missing)
+        source = type(geocoder).__name__
+        GeocodedAddress.objects.bulk_create([
+            GeocodedAddress(
+                key=key, query=query.text()[:500], source=source,
+                latitude=found[key][0] if key in found else None,
+                longitude=found[key][1] if key in found else None,
+            )
+            for key, query in missing.items()
+        ], ignore_conflicts=True)
+        cached.update({key: found.get(key) for key in missing})
+    return {query: cached[key] for key, query in by_key.items()}
@@ -0,0 +1,396 @@
+"""
+Bulk client intake from court spreadsheets.
+
+Rows are read one at a time from CSV, JSON Lines or a JSON array, checked
+in Python and written in batches: clients (and their cases) are upserted on
+case_number with a single INSERT ... ON CONFLICT per batch, addresses and
+offenses supplied for a client replace the ones on file. A bad row is
+reported with its line number and skipped; the rest of its batch is still
+written.
+
+CSV rows are flat. Address, offense and case columns carry a prefix:
+address_street, offense_type, case_objectives and so on; the case number
+defaults to the client's unless case_court_number is given. JSON rows may
+use the same flat keys or nest them as "addresses", "offenses" and "case".
+"""
+import csv
+import io
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from cases.models import Case
+from core.cache_versions import mark_changed
+from search.index import enqueue
+from users.models import User
+from .models import Address, Client, Offense
+
+BATCH_SIZE = 1000
+JSON_CHUNK_SIZE = 64 * 1024
+# A JSON row not decoded within this many characters is reported and skipped
+MAX_JSON_ROW_SIZE = 1024 * 1024
+MAX_REPORTED_ERRORS = 1000
+# Whitespace and array punctuation between JSON rows
+SEPARATORS = re.compile(r'[\s,\[\]]*')
+
+CLIENT_UPDATE_FIELDS = [
+    'first_name', 'last_name', 'date_of_birth', 'gender', 'assigned_officer',
+    'status', 'start_date', 'end_date', 'risk_level', 'notes', 'updated_at',
+]
+CASE_UPDATE_FIELDS = [
+    'officer', 'status', 'court_type', 'opening_date', 'objectives',
+    'special_conditions', 'is_high_profile',
+]
+
+GENDERS = {value for value, _ in Client.GENDER_CHOICES}
+CLIENT_STATUSES = {value for value, _ in Client.STATUS_CHOICES}
+RISK_LEVELS = {value for value, _ in Client._meta.get_field('risk_level').choices}
+ADDRESS_TYPES = {value for value, _ in Address._meta.get_field('address_type').choices}
+CASE_STATUSES = {value for value, _ in Case.STATUS_CHOICES}
+COURT_TYPES = {value for value, _ in Case.COURT_CHOICES}
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    imported: int = 0
+    errors: list = field(default_factory=list)
+    error_count: int = 0
+
+    def add_error(self, line, case_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, case_number, message))
+
+
+# Readers: each yields (line_number, row dict)
+
+def iter_csv(fp):
+    reader = csv.DictReader(fp)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_json(fp):
+    """
+    Rows from a JSON array or JSON Lines, decoded incrementally. A row that
+    is still undecoded after MAX_JSON_ROW_SIZE characters comes back as a
+    RowError, and reading resumes on the next line.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, line, eof = '', 0, 1, False
+    while True:
+        end = SEPARATORS.match(buffer, pos).end()
+        line += buffer.count('\n', pos, end)
+        pos = end
+        if pos < len(buffer):
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield line, obj
+                line += buffer.count('\n', pos, end)
+                pos = end
+                continue
+        elif eof:
+            return
+        if len(buffer) - pos > MAX_JSON_ROW_SIZE:
+            yield line, RowError(f'row is malformed or longer than {MAX_JSON_ROW_SIZE} characters')
+            line += buffer.count('\n', pos)
+            buffer, pos = '', 0
+            while not eof:
+                chunk = fp.read(JSON_CHUNK_SIZE)
+                eof = not chunk
+                newline = chunk.find('\n')
+                if newline >= 0:
+                    line += 1
+                    buffer = chunk[newline + 1:]
+                    break
+            continue
+        # Need more input to finish the current row
+        chunk = fp.read(JSON_CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+READERS = {
+    'csv': iter_csv,
+    'json': iter_json,
+    'jsonl': iter_json,
+    'ndjson': iter_json,
+}
+
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower()
+    if extension not in READERS:
+        raise ValueError(f'Unsupported file type ".{extension}", expected CSV or JSON')
+    return extension
+
+
+# Validation
+
+def _text(row, key, required=True, max_length=None):
+    value = row.get(key)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f'{key} is required')
+    if max_length and len(value) > max_length:
+        raise RowError(f'{key} is longer than {max_length} characters')
+    return value
+
+
+def _date(row, key, required=True):
+    value = row.get(key)
+    if value in (None, ''):
+        if required:
+            raise RowError(f'{key} is required')
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise RowError(f'{key} must be a YYYY-MM-DD date, got "{value}"')
+
+
+def _choice(row, key, choices, default=None):
+    value = _text(row, key, required=default is None).lower() or default
+    if value not in choices:
+        raise RowError(f'{key} must be one of {", ".join(sorted(choices))}, got "{value}"')
+    return value
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def _prefixed(row, prefix):
+    return {key[len(prefix):]: value for key, value in row.items() if key and key.startswith(prefix)}
+
+
+def _nested(row, key, prefix):
+    """Nested JSON list under key, or the single flat group of prefixed columns"""
+    if isinstance(row.get(key), list):
+        return row[key]
+    group = _prefixed(row, prefix)
+    return [group] if any(str(value or '').strip() for value in group.values()) else []
+
+
+class Importer:
+    """
+    Validates and writes rows. Officers are resolved by badge number from a
+    map loaded once, so validation runs no queries per row.
+    """
+
+    def __init__(self, created_by, batch_size=BATCH_SIZE, dry_run=False):
+        self.created_by = created_by
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.officers = dict(
+            User.objects.filter(user_type='officer').exclude(badge_number__isnull=True)
+            .exclude(badge_number='').values_list('badge_number', 'id')
+        )
+        self.result = ImportResult()
+
+    def run(self, rows):
+        batch = {}
+        try:
+            for line, row in rows:
+                self.result.rows += 1
+                try:
+                    if isinstance(row, RowError):
+                        raise row
+                    record = self.validate(row)
+                except RowError as exc:
+                    case_number = row.get('case_number') if isinstance(row, dict) else ''
+                    self.result.add_error(line, str(case_number or '').strip(), str(exc))
+                    continue
+                case_number = record['client'].case_number
+                if case_number in batch:
+                    # The later row wins, as it would across batches
+                    self.result.add_error(batch[case_number][0], case_number, f'superseded by line {line}')
+                batch[case_number] = (line, record)
+                if len(batch) >= self.batch_size:
+                    self.flush(list(batch.values()))
+                    batch = {}
+        except (csv.Error, json.JSONDecodeError, UnicodeDecodeError) as exc:
+            # Keep what was read before the file went bad
+            self.result.add_error(None, '', f'could not parse file: {exc}')
+        if batch:
+            self.flush(list(batch.values()))
+        if self.result.imported and not self.dry_run:
+            self.refresh_derived()
+        return self.result
+
+    def _officer(self, row, key, required=True):
+        badge = _text(row, key, required=required)
+        if not badge:
+            return None
+        try:
+            return self.officers[badge]
+        except KeyError:
+            raise RowError(f'no officer with badge number "{badge}"')
+
+    def validate(self, row):
+        if not isinstance(row, dict):
+            raise RowError('row is not an object')
+        officer_id = self._officer(row, 'officer_badge')
+        client = Client(
+            case_number=_text(row, 'case_number', max_length=50),
+            first_name=_text(row, 'first_name', max_length=100),
+            last_name=_text(row, 'last_name', max_length=100),
+            date_of_birth=_date(row, 'date_of_birth'),
+            gender=_text(row, 'gender').upper(),
+            assigned_officer_id=officer_id,
+            status=_choice(row, 'status', CLIENT_STATUSES, default='active'),
+            start_date=_date(row, 'start_date'),
+            end_date=_date(row, 'end_date'),
+            risk_level=_choice(row, 'risk_level', RISK_LEVELS),
+            notes=_text(row, 'notes', required=False),
+            created_by=self.created_by,
+        )
+        if client.gender not in GENDERS:
+            raise RowError(f'gender must be one of {", ".join(sorted(GENDERS))}, got "{client.gender}"')
+        if client.end_date < client.start_date:
+            raise RowError('end_date is before start_date')
+
+        addresses = [
+            Address(
+                address_type=_choice(address, 'type', ADDRESS_TYPES, default='home'),
+                street=_text(address, 'street', max_length=255),
+                city=_text(address, 'city', max_length=100),
+                state=_text(address, 'state', max_length=100),
+                zip_code=_text(address, 'zip', max_length=20),
+                is_primary=_bool(address.get('is_primary', index == 0)),
+            )
+            for index, address in enumerate(_nested(row, 'addresses', 'address_'))
+        ]
+        offenses = [
+            Offense(
+                offense_type=_text(offense, 'type', max_length=255),
+                description=_text(offense, 'description', required=False),
+                date_committed=_date(offense, 'date'),
+                sentence=_text(offense, 'sentence', required=False, max_length=255),
+                court=_text(offense, 'court', required=False, max_length=255),
+            )
+            for offense in _nested(row, 'offenses', 'offense_')
+        ]
+
+        case = None
+        if isinstance(row.get('case'), dict):
+            case_row = row['case']
+        else:
+            case_row = _prefixed(row, 'case_')
+            case_row.pop('number', None)  # case_number is the client's own column
+        if any(str(value or '').strip() for value in case_row.values()):
+            case = Case(
+                case_number=_text(case_row, 'court_number', required=False, max_length=50) or client.case_number,
+                officer_id=self._officer(case_row, 'officer_badge', required=False) or officer_id,
+                status=_choice(case_row, 'status', CASE_STATUSES, default='open'),
+                court_type=_choice(case_row, 'court_type', COURT_TYPES, default='circuit'),
+                opening_date=_date(case_row, 'opening_date', required=False) or client.start_date,
+                objectives=_text(case_row, 'objectives'),
+                special_conditions=_text(case_row, 'special_conditions', required=False),
+                is_high_profile=_bool(case_row.get('is_high_profile')),
+            )
+        return {'client': client, 'addresses': addresses, 'offenses': offenses, 'case': case}
+
+    def flush(self, batch):
+        if self.dry_run:
+            self.result.imported += len(batch)
+            return
+        try:
+            self.write(batch)
+        except DatabaseError:
+            if len(batch) == 1:
+                line, record = batch[0]
+                self.result.add_error(line, record['client'].case_number, 'rejected by the database')
+                return
+            # Write row by row to find the offending rows
+            for item in batch:
+                self.flush([item])
+            return
+        self.result.imported += len(batch)
+
+    @transaction.atomic
+    def write(self, batch):
+        now = timezone.now()
+        records = [record for _, record in batch]
+        clients = [record['client'] for record in records]
+        for client in clients:
+            client.updated_at = now
+        Client.objects.bulk_create(
+            clients,
+            update_conflicts=True,
+            unique_fields=['case_number'],
+            update_fields=CLIENT_UPDATE_FIELDS,
+        )
+        # Not every backend returns ids for upserted rows
+        client_ids = dict(Client.objects.filter(
+            case_number__in=[client.case_number for client in clients]
+        ).values_list('case_number', 'id'))
+
+        for related, model in (('addresses', Address), ('offenses', Offense)):
+            replaced = [client_ids[record['client'].case_number] for record in records if record[related]]
+            if not replaced:
+                continue
+            model.objects.filter(client_id__in=replaced).delete()
+            rows = []
+            for record in records:
+                for obj in record[related]:
+                    obj.client_id = client_ids[record['client'].case_number]
+                    rows.append(obj)
+            model.objects.bulk_create(rows)
+
+        cases = []
+        for record in records:
+            if record['case'] is not None:
+                record['case'].client_id = client_ids[record['client'].case_number]
+                cases.append(record['case'])
+        if cases:
+            Case.objects.bulk_create(
+                cases,
+                update_conflicts=True,
+                unique_fields=['case_number'],
+                update_fields=CASE_UPDATE_FIELDS,
+            )
+
+        # Bulk writes skip the signals that queue records for search and version API payloads
+        mark_changed(Client, Address, Case)
+        enqueue(Client, client_ids.values())
+        if cases:
+            enqueue(Case, Case.objects.filter(
+                case_number__in=[case.case_number for case in cases]
+            ).values_list('pk', flat=True))
+
+    def refresh_derived(self):
+        """Bulk writes skip the signals that keep rollups and cached workload current"""
+        from reporting.rollups import refresh_client_rollup
+        from reporting.workload import invalidate_officer_workload
+        refresh_client_rollup()
+        invalidate_officer_workload()
+
+
+def import_clients(fp, file_format, created_by, batch_size=BATCH_SIZE, dry_run=False):
+    """Import clients from an open text file; returns an ImportResult"""
+    importer = Importer(created_by, batch_size=batch_size, dry_run=dry_run)
+    return importer.run(READERS[file_format](fp))
+
+
+def open_upload(uploaded_file):
+    """Text stream over an uploaded file, read chunk by chunk rather than into memory"""
+    return io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline='')
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from clients.importers import BATCH_SIZE, detect_format, import_clients
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Import or update clients, addresses, offenses and cases from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV, JSON array or JSON Lines file')
+        parser.add_argument('--format', choices=['csv', 'json', 'jsonl'],
+                            help='File format, taken from the extension by default')
+        parser.add_argument('--created-by', help='Username recorded as creator of new clients')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate every row without writing anything')
+
+    def handle(self, *args, **options):
+        try:
+            file_format = options['format'] or detect_format(options['path'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options['created_by']:
+            created_by = User.objects.filter(username=options['created_by']).first()
+        else:
+            created_by = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if created_by is None:
+            raise CommandError('No user to record as creator; pass --created-by')
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as fp:
+                result = import_clients(
+                    fp, file_format, created_by,
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for line, case_number, message in result.errors:
+            where = f'line {line}' if line else 'file'
+            self.stdout.write(self.style.WARNING(f'  {where} {case_number}: {message}'))
+        if result.error_count > len(result.errors):
+            self.stdout.write(self.style.WARNING(f'  ... {result.error_count - len(result.errors)} more errors'))
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.imported} of {result.rows} rows, {result.error_count} errors'
+        ))
@@ -0,0 +1,59 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django.db.models import Q
+
+from clients.geocoding import ZipCentroidGeocoder
+from clients.models import GeocodedAddress, ZipCentroid
+
+ZIP_COLUMNS = ('zip_code', 'zip', 'zcta5', 'geoid')
+LATITUDE_COLUMNS = ('latitude', 'lat', 'intptlat')
+LONGITUDE_COLUMNS = ('longitude', 'lng', 'lon', 'intptlong')
+BATCH_SIZE = 5000
+
+
+def _column(header, names):
+    for index, name in enumerate(header):
+        if name.strip().lower() in names:
+            return index
+    raise CommandError(f"No column named any of: {', '.join(names)}")
+
+
+class Command(BaseCommand):
+    help = 'Load ZIP code centre points (CSV, or the tab-separated Census ZCTA gazetteer) for geocoding'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+
+    def handle(self, *args, **options):
+        with open(options['path'], newline='', encoding='utf-8-sig') as fp:
+            delimiter = '\t' if '\t' in fp.readline() else ','
+            fp.seek(0)
+            rows = csv.reader(fp, delimiter=delimiter)
+            header = next(rows)
+            zip_at, lat_at, lng_at = (_column(header, names) for names in (ZIP_COLUMNS, LATITUDE_COLUMNS, LONGITUDE_COLUMNS))
+
+            loaded, batch = 0, []
+            for row in rows:
+                try:
+                    batch.append(ZipCentroid(
+                        zip_code=row[zip_at].strip().zfill(5), latitude=float(row[lat_at]), longitude=float(row[lng_at]),
+                    ))
+                except (IndexError, ValueError):
+                    continue
+                if len(batch) >= BATCH_SIZE:
+                    loaded += self._save(batch)
+            loaded += self._save(batch)
+
+        # Addresses the geocoder could not place before may be placeable now, and centres may have moved
+        GeocodedAddress.objects.filter(Q(latitude__isnull=True) | Q(source=ZipCentroidGeocoder.__name__)).delete()
+        self.stdout.write(self.style.SUCCESS(f'Loaded {loaded} ZIP centroids'))
+
+    def _save(self, batch):
+        ZipCentroid.objects.bulk_create(
+            batch, update_conflicts=True, unique_fields=['zip_code'], update_fields=['latitude', 'longitude'],
+        )
+        count = len(batch)
+        batch.clear()
+        return count
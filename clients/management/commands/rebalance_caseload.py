@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from clients.balancing import apply_reassignment, plan_reassignment
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Redistribute clients across active probation officers by risk-weighted caseload'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-officer',
+                            help='Username or badge number of an officer whose clients should all be handed over')
+        parser.add_argument('--same-department', action='store_true',
+                            help='Only move clients between officers of the same department')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Show the proposed moves without changing anything')
+
+    def handle(self, *args, **options):
+        leaving = None
+        if options['from_officer']:
+            identifier = options['from_officer']
+            leaving = User.objects.filter(user_type='officer', username=identifier).first() or \
+                User.objects.filter(user_type='officer', badge_number=identifier).first()
+            if leaving is None:
+                raise CommandError(f'No officer with username or badge number "{identifier}"')
+
+        plan = plan_reassignment(leaving_officer=leaving, by_department=options['same_department'])
+        officers = plan['officers']
+
+        def name(officer_id):
+            officer = officers[officer_id]
+            return f"{officer['first_name']} {officer['last_name']}".strip() or officer['username']
+
+        for _, case_number, from_id, to_id in plan['moves']:
+            self.stdout.write(f'  {case_number}: {name(from_id)} -> {name(to_id)}')
+
+        self.stdout.write('Weighted caseload (before -> after):')
+        for officer_id in sorted(officers, key=name):
+            self.stdout.write(
+                f"  {name(officer_id)}: {plan['loads_before'][officer_id]} -> {plan['loads_after'][officer_id]}"
+            )
+
+        if plan['unassigned']:
+            self.stdout.write(self.style.WARNING(
+                f"No eligible officer for {len(plan['unassigned'])} clients: {', '.join(plan['unassigned'])}"
+            ))
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"Dry run: {len(plan['moves'])} clients would be reassigned"))
+            return
+
+        moved = apply_reassignment(plan['moves'])
+        self.stdout.write(self.style.SUCCESS(f'Reassigned {moved} clients'))
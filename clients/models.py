@@ -33,6 +33,13 @@ class Client(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Name lookups for autocomplete (core/autocomplete.py)
+            models.Index(fields=['last_name', 'first_name']),
+            models.Index(fields=['first_name']),
+        ]
+    
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.case_number})"
     
@@ -61,4 +68,47 @@ class Offense(models.Model):
     court = models.CharField(max_length=255)
     
     def __str__(self):
-        return f"{self.client.full_name} - {self.offense_type}"
\ No newline at end of file
+        return f"{self.client.full_name} - {self.offense_type}"
+
+class ZipCentroid(models.Model):
+    """Centre point of a ZIP code, the local stand-in for geocoding (see clients/geocoding.py)"""
+    zip_code = models.CharField(max_length=5, primary_key=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    
+    def __str__(self):
+        return f"{self.zip_code} ({self.latitude:.4f}, {self.longitude:.4f})"
+
+class GeocodedAddress(models.Model):
+    """Where the geocoder placed an address; coordinates are empty when it could not"""
+    key = models.CharField(max_length=64, unique=True)  # sha256 of the normalised address
+    query = models.CharField(max_length=500)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    source = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.query
+
+# Signal to recalculate risk for clients whose appointments were swept to no-show
+from django.dispatch import receiver
+from appointments.signals import appointments_marked_no_show
+
+@receiver(appointments_marked_no_show)
+def recalculate_risk_after_no_show(sender, client_ids, **kwargs):
+    from .risk import recalculate_risk
+    recalculate_risk(client_ids)
+
+
+# Who may see which clients and their records (see core/scoping.py)
+from django.db.models import Exists, OuterRef, Q
+from core import scoping
+
+def _presiding_judge_clients(user):
+    from cases.models import Case
+    return Q(Exists(Case.objects.filter(client=OuterRef('pk'), presiding_judge=user)))
+
+scoping.register(Client, officer=lambda user: Q(assigned_officer=user), judge=_presiding_judge_clients)
+scoping.register(Address, officer='client', judge='client')
+scoping.register(Offense, officer='client', judge='client')
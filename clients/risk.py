@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from comms.models import Notification, invalidate_inbox
+from core.cache_versions import mark_changed
+from .models import Client
+
+# Same rule generate_ai_analysis flags as a high-severity risk factor
+RECENT_DAYS = 30
+RECENT_MISSED_THRESHOLD = 2
+
+
+def recalculate_risk(client_ids, now=None):
+    """
+    Re-evaluate risk for the given clients only. Active clients with more than
+    RECENT_MISSED_THRESHOLD no-shows in the last RECENT_DAYS are raised to
+    'high' and their officer is alerted. Returns the ids that were escalated.
+    """
+    if not client_ids:
+        return []
+    now = now or timezone.now()
+
+    candidates = Client.objects.filter(
+        pk__in=client_ids,
+        status='active',
+    ).exclude(risk_level='high').annotate(
+        recent_missed=Count(
+            'appointment',
+            filter=Q(
+                appointment__status='no_show',
+                appointment__scheduled_date__gte=now - timedelta(days=RECENT_DAYS),
+            ),
+        ),
+    ).filter(recent_missed__gt=RECENT_MISSED_THRESHOLD).values_list(
+        'id', 'assigned_officer_id', 'first_name', 'last_name', 'recent_missed', 'risk_level',
+    )
+    escalated = list(candidates)
+    if not escalated:
+        return []
+
+    from reporting.rollups import apply_client_changes
+    Client.objects.filter(pk__in=[row[0] for row in escalated]).update(risk_level='high', updated_at=now)
+    apply_client_changes((('active', row[5]), ('active', 'high')) for row in escalated)
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=officer_id,
+            notification_type='alert',
+            title=f"Risk level raised: {first_name} {last_name}",
+            message=f"{recent_missed} missed appointments in the last {RECENT_DAYS} days. Risk level set to high.",
+            related_object_id=client_id,
+            related_content_type='clients.client',
+        )
+        for client_id, officer_id, first_name, last_name, recent_missed, _ in escalated
+    ])
+    invalidate_inbox(*(row[1] for row in escalated))
+    mark_changed(Client)
+    return [row[0] for row in escalated]
@@ -0,0 +1,185 @@
+import json
+from datetime import date
+from io import StringIO
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from cases.models import Case
+from core.scoping import visible
+from users.models import User
+from .balancing import apply_reassignment, plan_reassignment
+from .importers import import_clients
+from .models import Address, Client
+
+
+def make_client(case_number, officer, created_by):
+    return Client.objects.create(
+        case_number=case_number, first_name='Test', last_name=case_number, date_of_birth=date(1990, 1, 1),
+        gender='M', assigned_officer=officer, start_date=date(2025, 1, 1), end_date=date(2027, 1, 1),
+        risk_level='low', created_by=created_by,
+    )
+
+
+class ClientVisibilityTests(TestCase):
+    """Officers see their own clients, judges the clients of cases they preside over, admins all"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin')
+        cls.officer = User.objects.create_user('officer', user_type='officer')
+        cls.other_officer = User.objects.create_user('other-officer', user_type='officer')
+        cls.judge = User.objects.create_user('judge', user_type='judge')
+        cls.other_judge = User.objects.create_user('other-judge', user_type='judge')
+
+        cls.own = make_client('C-1', cls.officer, cls.admin)
+        cls.own_without_case = make_client('C-2', cls.officer, cls.admin)
+        cls.others = make_client('C-3', cls.other_officer, cls.admin)
+        Case.objects.create(client=cls.own, officer=cls.officer, presiding_judge=cls.judge, objectives='-')
+        Case.objects.create(client=cls.others, officer=cls.other_officer, presiding_judge=cls.other_judge,
+                            objectives='-')
+        for client in (cls.own, cls.others):
+            Address.objects.create(client=client, address_type='home', street='1 Main St', city='Town',
+                                   state='ST', zip_code='00000')
+
+    def visible_clients(self, user):
+        return set(visible(Client, user))
+
+    def test_officer_sees_assigned_clients(self):
+        self.assertEqual(self.visible_clients(self.officer), {self.own, self.own_without_case})
+
+    def test_judge_sees_clients_of_presided_cases(self):
+        self.assertEqual(self.visible_clients(self.judge), {self.own})
+        self.assertEqual(self.visible_clients(self.other_judge), {self.others})
+
+    def test_admin_sees_every_client(self):
+        self.assertEqual(self.visible_clients(self.admin), {self.own, self.own_without_case, self.others})
+
+    def test_addresses_follow_their_client(self):
+        self.assertEqual({address.client for address in visible(Address, self.officer)}, {self.own})
+        self.assertEqual({address.client for address in visible(Address, self.other_judge)}, {self.others})
+
+    def test_api_lists_only_visible_clients(self):
+        api = APIClient()
+        api.force_authenticate(self.judge)
+        response = api.get('/api/clients/')
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([row['case_number'] for row in rows], ['C-1'])
+        self.assertEqual(api.get(f'/api/clients/{self.others.pk}/').status_code, 404)
+
+
+class RebalanceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin')
+        cls.officers = [User.objects.create_user(f'officer-{n}', user_type='officer') for n in range(4)]
+        # Evening these out hands a low-risk client to the empty officer, who then becomes the heaviest
+        caseloads = {1: ['low'] * 4, 2: ['medium'] * 2, 3: ['low']}
+        for officer, risk_levels in caseloads.items():
+            for index, risk_level in enumerate(risk_levels):
+                client = make_client(f'R-{officer}-{index}', cls.officers[officer], cls.admin)
+                Client.objects.filter(pk=client.pk).update(risk_level=risk_level)
+
+    def test_every_client_ends_with_its_planned_officer(self):
+        plan = plan_reassignment()
+        self.assertTrue(plan['moves'])
+        moved = [client_id for client_id, _, _, _ in plan['moves']]
+        self.assertEqual(len(moved), len(set(moved)))
+        apply_reassignment(plan['moves'])
+        assigned = dict(Client.objects.values_list('pk', 'assigned_officer_id'))
+        for client_id, _, _, to_id in plan['moves']:
+            self.assertEqual(assigned[client_id], to_id)
+        loads = plan['loads_after']
+        self.assertLess(max(loads.values()) - min(loads.values()), max(plan['loads_before'].values()))
+
+    def test_leaving_officer_hands_over_every_client(self):
+        leaving = self.officers[1]
+        count = Client.objects.filter(assigned_officer=leaving).count()
+        plan = plan_reassignment(leaving_officer=leaving)
+        self.assertEqual(len(plan['moves']), count)
+        self.assertEqual(plan['unassigned'], [])
+        self.assertEqual(plan['loads_after'][leaving.pk], 0)
+        apply_reassignment(plan['moves'])
+        self.assertFalse(Client.objects.filter(assigned_officer=leaving).exists())
+
+
+CSV_HEADER = ('case_number,first_name,last_name,date_of_birth,gender,officer_badge,start_date,end_date,risk_level,'
+              'address_street,address_city,address_state,address_zip,case_objectives\n')
+
+
+def csv_row(case_number, badge='B-1', street='1 Main St', risk_level='low', objectives='Stay clean'):
+    return (f'{case_number},Ann,{case_number},1990-01-01,F,{badge},2025-01-01,2026-01-01,{risk_level},'
+            f'{street},Town,ST,00000,{objectives}\n')
+
+
+class ClientImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin')
+        cls.officer = User.objects.create_user('officer', user_type='officer', badge_number='B-1')
+
+    def run_import(self, text, file_format='csv', **kwargs):
+        return import_clients(StringIO(text), file_format, self.admin, **kwargs)
+
+    def test_imports_clients_with_addresses_and_cases(self):
+        result = self.run_import(CSV_HEADER + csv_row('C-1') + csv_row('C-2'))
+        self.assertEqual((result.rows, result.imported, result.errors), (2, 2, []))
+        client = Client.objects.get(case_number='C-1')
+        self.assertEqual(client.assigned_officer, self.officer)
+        self.assertEqual([address.street for address in client.addresses.all()], ['1 Main St'])
+        self.assertEqual(Case.objects.get(case_number='C-1').client, client)
+
+    def test_reports_bad_rows_by_line_and_keeps_the_rest(self):
+        text = CSV_HEADER + csv_row('C-1', badge='B-9') + csv_row('C-2', risk_level='extreme') + csv_row('C-3')
+        result = self.run_import(text)
+        self.assertEqual(result.imported, 1)
+        self.assertEqual([(line, case_number) for line, case_number, _ in result.errors], [(2, 'C-1'), (3, 'C-2')])
+        self.assertEqual(list(Client.objects.values_list('case_number', flat=True)), ['C-3'])
+
+    def test_reimporting_updates_in_place_and_replaces_addresses(self):
+        self.run_import(CSV_HEADER + csv_row('C-1'))
+        self.run_import(CSV_HEADER + csv_row('C-1', street='2 High St', risk_level='high', objectives='Work'))
+        client = Client.objects.get()
+        self.assertEqual(client.risk_level, 'high')
+        self.assertEqual([address.street for address in client.addresses.all()], ['2 High St'])
+        self.assertEqual(Case.objects.get().objectives, 'Work')
+
+    def test_existing_cases_keep_their_client(self):
+        owner = make_client('C-0', self.officer, self.admin)
+        Case.objects.create(client=owner, officer=self.officer, case_number='C-1', objectives='-')
+        self.run_import(CSV_HEADER + csv_row('C-1'))
+        case = Case.objects.get(case_number='C-1')
+        self.assertEqual(case.client, owner)
+        self.assertEqual(case.objectives, 'Stay clean')
+
+    def test_dry_run_writes_nothing(self):
+        result = self.run_import(CSV_HEADER + csv_row('C-1'), dry_run=True)
+        self.assertEqual(result.imported, 1)
+        self.assertFalse(Client.objects.exists())
+
+    def test_oversized_json_row_is_skipped_and_reading_resumes(self):
+        def row(case_number, **extra):
+            return json.dumps({
+                'case_number': case_number, 'first_name': 'Ann', 'last_name': case_number,
+                'date_of_birth': '1990-01-01', 'gender': 'F', 'officer_badge': 'B-1',
+                'start_date': '2025-01-01', 'end_date': '2026-01-01', 'risk_level': 'low', **extra,
+            })
+        text = '\n'.join([row('C-1'), row('C-2', notes='x' * 5000), row('C-3')]) + '\n'
+        with mock.patch('clients.importers.MAX_JSON_ROW_SIZE', 1000), \
+                mock.patch('clients.importers.JSON_CHUNK_SIZE', 256):
+            result = self.run_import(text, 'jsonl')
+        self.assertEqual(result.imported, 2)
+        self.assertEqual([line for line, _, _ in result.errors], [2])
+        self.assertEqual(sorted(Client.objects.values_list('case_number', flat=True)), ['C-1', 'C-3'])
+
+    def test_truncated_json_keeps_the_rows_before_it(self):
+        text = ('[{"case_number": "C-1", "first_name": "Ann", "last_name": "A", "date_of_birth": "1990-01-01", '
+                '"gender": "F", "officer_badge": "B-1", "start_date": "2025-01-01", "end_date": "2026-01-01", '
+                '"risk_level": "low"}, {"case_number": "C-')
+        result = self.run_import(text, 'json')
+        self.assertEqual(result.imported, 1)
+        self.assertIn('could not parse file', result.errors[-1][2])
@@ -5,6 +5,7 @@ urlpatterns = [
     path('', views.client_list, name='client_list'),
     path('<int:pk>/', views.client_detail, name='client_detail'),
     path('new/', views.client_create, name='client_create'),
+    path('import/', views.client_import, name='client_import'),
     path('<int:pk>/edit/', views.client_update, name='client_update'),
     path('<int:pk>/delete/', views.client_delete, name='client_delete'),
     path('<int:pk>/ai-analysis/', views.ai_analyzer, name='ai_analyzer'),   
@@ -4,20 +4,17 @@ from django.contrib import messages
 from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
+from core.scoping import visible
 from .models import Client, Address, Offense
-from .forms import ClientForm, AddressForm, OffenseForm
+from .forms import ClientForm, AddressForm, OffenseForm, ClientImportForm
+from .importers import import_clients, open_upload
 
 @login_required
 def client_list(request):
     query = request.GET.get('q')
     
-    # Show different client lists based on user role
-    if request.user.user_type == 'officer':
-        # Officers see only their assigned clients
-        clients = Client.objects.filter(assigned_officer=request.user)
-    else:
-        # Admins and staff see all clients
-        clients = Client.objects.all()
+    # Officers see their assigned clients, judges those of their cases, admins and staff all
+    clients = visible(Client, request.user)
     
     if query:
         clients = clients.filter(
@@ -78,6 +75,31 @@ def client_create(request):
     
     return render(request, 'clients/client_form.html', {'form': form, 'title': 'Add Client'})
 
+@login_required
+def client_import(request):
+    if not request.user.can_add_clients():
+        messages.error(request, "You don't have permission to add clients.")
+        return redirect('client_list')
+    
+    result = None
+    if request.method == 'POST':
+        form = ClientImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            result = import_clients(
+                open_upload(form.cleaned_data['file']),
+                form.file_format,
+                request.user,
+                dry_run=form.cleaned_data['dry_run'],
+            )
+            if form.cleaned_data['dry_run']:
+                messages.info(request, f'{result.imported} of {result.rows} rows are valid.')
+            else:
+                messages.success(request, f'Imported {result.imported} of {result.rows} rows.')
+    else:
+        form = ClientImportForm()
+    
+    return render(request, 'clients/client_import.html', {'form': form, 'result': result})
+
 @login_required
 def client_update(request, pk):
     client = get_object_or_404(Client, pk=pk)
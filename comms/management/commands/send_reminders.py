@@ -0,0 +1,37 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from comms.reminders import get_lead_time, send_due_reminders
+
+
+class Command(BaseCommand):
+    help = 'Create reminder notifications for upcoming appointments and hearings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lead-hours', type=int, default=None,
+                            help='Remind this many hours ahead (default: REMINDER_LEAD_HOURS)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running as a worker instead of exiting after one pass')
+        parser.add_argument('--interval', type=int, default=60,
+                            help='Seconds between passes when running with --loop')
+
+    def handle(self, *args, **options):
+        if options['lead_hours'] is not None:
+            lead_time = timedelta(hours=options['lead_hours'])
+        else:
+            lead_time = get_lead_time()
+
+        while True:
+            results = send_due_reminders(lead_time=lead_time, batch_size=options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Processed {results['appointments']} appointment and "
+                    f"{results['hearings']} hearing reminders"
+                )
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
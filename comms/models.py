@@ -34,9 +34,40 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     related_object_id = models.PositiveIntegerField(null=True, blank=True)
     related_content_type = models.CharField(max_length=100, blank=True)
+    dedupe_key = models.CharField(max_length=100, unique=True, null=True, blank=True)  # Set by generated notifications (e.g. reminders)
     
     class Meta:
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"{self.title} - {self.user}"
\ No newline at end of file
+        return f"{self.title} - {self.user}"
+
+class ReminderCheckpoint(models.Model):
+    """High-water mark for the reminder scheduler, one row per event source"""
+    name = models.CharField(max_length=50, unique=True)
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.name} reminders up to {self.high_water_mark}"
+
+
+def invalidate_inbox(*user_ids):
+    """Rebuild these users' cached unread badges and notification widgets"""
+    from core.cache_versions import bump
+    bump(*(f'inbox:{user_id}' for user_id in set(user_ids) if user_id))
+
+
+# Signals to keep cached unread badges current
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def invalidate_message_inbox(sender, instance, **kwargs):
+    invalidate_inbox(instance.recipient_id)
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def invalidate_notification_inbox(sender, instance, **kwargs):
+    invalidate_inbox(instance.user_id)
@@ -0,0 +1,146 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from appointments.models import Appointment
+from courts.models import Hearing
+from .models import Notification, ReminderCheckpoint, invalidate_inbox
+
+APPOINTMENT_TYPES = dict(Appointment.TYPE_CHOICES)
+HEARING_TYPES = dict(Hearing.HEARING_TYPES)
+
+
+def get_lead_time():
+    """How far ahead of an event its reminder is sent"""
+    return timedelta(hours=getattr(settings, 'REMINDER_LEAD_HOURS', 24))
+
+
+def _dedupe_key(source, object_id, user_id, when):
+    # The event time is part of the key so a rescheduled event is reminded again
+    return f"reminder:{source}:{object_id}:{user_id}:{int(when.timestamp())}"
+
+
+def _appointment_reminders(rows):
+    for appointment_id, officer_id, scheduled_date, appointment_type, first_name, last_name in rows:
+        label = APPOINTMENT_TYPES.get(appointment_type, appointment_type)
+        local_date = timezone.localtime(scheduled_date)
+        yield Notification(
+            user_id=officer_id,
+            notification_type='appointment',
+            title=f"Upcoming {label}",
+            message=f"{label} with {first_name} {last_name} on {local_date.strftime('%Y-%m-%d %H:%M')}.",
+            related_object_id=appointment_id,
+            related_content_type='appointments.appointment',
+            dedupe_key=_dedupe_key('appointment', appointment_id, officer_id, scheduled_date),
+        )
+
+
+def _hearing_reminders(rows):
+    for hearing_id, hearing_date, hearing_type, location, case_number, judge_user_id, officer_id in rows:
+        label = HEARING_TYPES.get(hearing_type, hearing_type)
+        local_date = timezone.localtime(hearing_date)
+        message = f"{label} for case {case_number} on {local_date.strftime('%Y-%m-%d %H:%M')} at {location}."
+        # The presiding judge and the supervising officer are both reminded
+        for user_id in {judge_user_id, officer_id} - {None}:
+            yield Notification(
+                user_id=user_id,
+                notification_type='case',
+                title=f"Upcoming {label}",
+                message=message,
+                related_object_id=hearing_id,
+                related_content_type='courts.hearing',
+                dedupe_key=_dedupe_key('hearing', hearing_id, user_id, hearing_date),
+            )
+
+
+def _create_in_batches(notifications, batch_size):
+    created = 0
+    batch = []
+    for notification in notifications:
+        batch.append(notification)
+        if len(batch) >= batch_size:
+            Notification.objects.bulk_create(batch, ignore_conflicts=True)
+            invalidate_inbox(*(notification.user_id for notification in batch))
+            created += len(batch)
+            batch = []
+    if batch:
+        Notification.objects.bulk_create(batch, ignore_conflicts=True)
+        invalidate_inbox(*(notification.user_id for notification in batch))
+        created += len(batch)
+    return created
+
+
+def appointment_rows(start, end):
+    return Appointment.objects.filter(
+        status='scheduled',
+        scheduled_date__gt=start,
+        scheduled_date__lte=end,
+    ).values_list(
+        'id', 'officer_id', 'scheduled_date', 'appointment_type',
+        'client__first_name', 'client__last_name',
+    ).order_by('scheduled_date', 'id')
+
+
+def hearing_rows(start, end):
+    return Hearing.objects.filter(
+        is_completed=False,
+        hearing_date__gt=start,
+        hearing_date__lte=end,
+    ).values_list(
+        'id', 'hearing_date', 'hearing_type', 'location', 'court_case__case_number',
+        'judge__user_id', 'court_case__case__officer_id',
+    ).order_by('hearing_date', 'id')
+
+
+def _run_source(name, rows_for_window, build, now, lead_time, batch_size, catch_up=None):
+    """
+    Scan the window between the stored high-water mark and now + lead time,
+    then advance the mark. Reminders carry a dedupe key, so a run that dies
+    half way is simply repeated on the next start without creating duplicates.
+    """
+    checkpoint, _ = ReminderCheckpoint.objects.get_or_create(name=name)
+    window_start = max(checkpoint.high_water_mark or now, now)
+    window_end = now + lead_time
+
+    processed = 0
+    if window_end > window_start:
+        rows = rows_for_window(window_start, window_end).iterator(chunk_size=batch_size)
+        processed += _create_in_batches(build(rows), batch_size)
+
+    # Events created or moved into the part of the window that was already
+    # scanned by an earlier run would otherwise be missed
+    if catch_up is not None and checkpoint.last_run_at and window_start > now:
+        rows = catch_up(now, window_start, checkpoint.last_run_at).iterator(chunk_size=batch_size)
+        processed += _create_in_batches(build(rows), batch_size)
+
+    ReminderCheckpoint.objects.filter(pk=checkpoint.pk).update(
+        high_water_mark=max(window_end, window_start),
+        last_run_at=now,
+    )
+    return processed
+
+
+def _appointments_changed_since(start, end, since):
+    return appointment_rows(start, end).filter(updated_at__gte=since)
+
+
+def _hearings_changed_since(start, end, since):
+    return hearing_rows(start, end).filter(updated_at__gte=since)
+
+
+def send_due_reminders(now=None, lead_time=None, batch_size=1000):
+    """Create reminder notifications for appointments and hearings coming up within the lead time"""
+    now = now or timezone.now()
+    lead_time = lead_time if lead_time is not None else get_lead_time()
+
+    return {
+        'appointments': _run_source(
+            'appointments', appointment_rows, _appointment_reminders,
+            now, lead_time, batch_size, catch_up=_appointments_changed_since,
+        ),
+        'hearings': _run_source(
+            'hearings', hearing_rows, _hearing_reminders,
+            now, lead_time, batch_size, catch_up=_hearings_changed_since,
+        ),
+    }
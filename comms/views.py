@@ -10,7 +10,7 @@ from .forms import MessageForm
 def message_list(request):
     messages_list = Message.objects.filter(
         Q(sender=request.user) | Q(recipient=request.user)
-    ).order_by('-sent_at')
+    ).select_related('sender', 'recipient').order_by('-sent_at')
     
     unread_count = Message.objects.filter(
         recipient=request.user,
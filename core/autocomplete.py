@@ -0,0 +1,175 @@
+"""
+Autocomplete for foreign-key form fields.
+
+AutocompleteSelect renders only the selected option; static/js/autocomplete.js
+turns it into a search box that asks the autocomplete view for the top
+matches as the user types. Each lookup below is scoped to what the user
+may see, matches the start of indexed columns (case numbers, names, judge
+ids) and returns at most MAX_RESULTS rows, so a form renders and searches
+in the same time however many clients or cases there are.
+"""
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.urls import reverse
+
+from .scoping import visible
+
+MAX_RESULTS = 20
+
+
+class Lookup:
+    """A searchable set of rows: which ones a user may pick, how to match and label them"""
+    search_fields = ()
+    ordering = ()
+    select_related = ()
+
+    def queryset(self, user):
+        raise NotImplementedError
+
+    def label(self, obj):
+        return str(obj)
+
+    def forwarded(self, queryset, forward):
+        """Narrow by the values of other fields in the form, e.g. the judges of a court"""
+        return queryset
+
+    def search(self, user, query, forward=None, limit=MAX_RESULTS):
+        queryset = self.queryset(user).select_related(*self.select_related)
+        queryset = self.forwarded(queryset, forward or {})
+        # Every word has to start one of the fields: "smi jo" finds Jo Smith
+        for word in query.split():
+            condition = Q()
+            for field in self.search_fields:
+                condition |= Q(**{f'{field}__istartswith': word})
+            queryset = queryset.filter(condition)
+        return [{'id': obj.pk, 'text': self.label(obj)} for obj in queryset.order_by(*self.ordering)[:limit]]
+
+
+class ClientLookup(Lookup):
+    search_fields = ('last_name', 'first_name', 'case_number')
+    ordering = ('last_name', 'first_name', 'pk')
+
+    def queryset(self, user):
+        from clients.models import Client
+        return visible(Client, user)
+
+
+class CaseLookup(Lookup):
+    search_fields = ('case_number', 'client__last_name', 'client__first_name')
+    ordering = ('case_number', 'pk')
+    select_related = ('client',)
+
+    def queryset(self, user):
+        from cases.models import Case
+        return visible(Case, user)
+
+    def label(self, case):
+        return f"{case.case_number or 'No number'} - {case.client.full_name}"
+
+
+class CourtCaseLookup(Lookup):
+    search_fields = ('case_number', 'case__client__last_name', 'case__client__first_name')
+    ordering = ('case_number',)
+    select_related = ('court', 'case__client')
+
+    def queryset(self, user):
+        from courts.models import CourtCase
+        return visible(CourtCase, user)
+
+    def label(self, court_case):
+        return f"{court_case.case_number} - {court_case.case.client.full_name} ({court_case.court.name})"
+
+
+class JudgeLookup(Lookup):
+    search_fields = ('user__last_name', 'user__first_name', 'judge_id')
+    ordering = ('user__last_name', 'user__first_name')
+    select_related = ('user',)
+
+    def queryset(self, user):
+        from judges.models import Judge
+        return Judge.objects.filter(is_active=True)
+
+    def label(self, judge):
+        return f"Hon. {judge.user.get_full_name()} ({judge.judge_id})"
+
+    def forwarded(self, queryset, forward):
+        from courts.models import CourtCase
+        if forward.get('court'):
+            queryset = queryset.filter(court_id=forward['court'])
+        elif forward.get('court_case'):
+            queryset = queryset.filter(court_id__in=CourtCase.objects.filter(
+                pk=forward['court_case']).values('court_id'))
+        return queryset
+
+
+class UserLookup(Lookup):
+    search_fields = ('last_name', 'first_name', 'username', 'badge_number')
+    ordering = ('last_name', 'first_name')
+    user_type = None
+
+    def queryset(self, user):
+        from users.models import User
+        users = User.objects.filter(user_type=self.user_type, is_active=True)
+        if self.user_type == 'officer':
+            users = users.filter(is_active_officer=True)
+        return users
+
+    def label(self, user):
+        label = user.get_full_name() or user.username
+        return f"{label} ({user.badge_number})" if user.badge_number else label
+
+
+class OfficerLookup(UserLookup):
+    user_type = 'officer'
+
+
+class JudgeUserLookup(UserLookup):
+    user_type = 'judge'
+
+
+LOOKUPS = {
+    'clients': ClientLookup(),
+    'cases': CaseLookup(),
+    'court-cases': CourtCaseLookup(),
+    'judges': JudgeLookup(),
+    'officers': OfficerLookup(),
+    'judge-users': JudgeUserLookup(),
+}
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    A select holding just the current value, searched through a lookup.
+    forward names other fields of the form whose values narrow the search.
+    """
+
+    def __init__(self, lookup, forward=(), attrs=None):
+        self.lookup = lookup
+        self.forward = tuple(forward)
+        attrs = {'class': 'form-control', **(attrs or {})}
+        super().__init__(attrs)
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        widget_attrs = context['widget']['attrs']
+        widget_attrs['data-autocomplete-url'] = reverse('autocomplete', args=[self.lookup])
+        if self.forward:
+            widget_attrs['data-forward'] = ','.join(self.forward)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        # Render the selected rows only, rather than iterating the whole queryset
+        selected = [v for v in value if v not in ('', None)]
+        options = [self.create_option(name, '', '---------', not selected, 0)]
+        queryset = getattr(self.choices, 'queryset', None)
+        if selected and queryset is not None:
+            lookup = LOOKUPS[self.lookup]
+            try:
+                rows = list(queryset.select_related(*lookup.select_related).filter(pk__in=selected))
+            except (ValueError, ValidationError):
+                # A bound form with a malformed id; its field error says so
+                rows = []
+            for index, obj in enumerate(rows, 1):
+                options.append(self.create_option(name, obj.pk, lookup.label(obj), True, index))
+        return [(None, options, 0)]
@@ -0,0 +1,103 @@
+"""
+Version counters for cache invalidation.
+
+A cached value's key embeds the current version of what it was built from;
+bumping the version makes every such key unreachable at once, without
+knowing which pages, sizes or formats were cached. Stale entries simply
+expire.
+
+Models can also carry a change version, bumped by their signals and by
+the set-based writes that skip them (mark_changed); the API derives its
+ETags from these.
+
+A version is a random token: bumping or losing one never returns to a
+version whose entries may still be cached, and two processes bumping at
+once cannot both land on the same value (not every backend has an atomic
+incr).
+
+Versions only invalidate anything if every process reads the same cache:
+a bump made by a management command or another worker must reach this
+one. The default cache must therefore be shared (see CACHES in
+core/settings.py); check_shared_cache refuses a process-local backend
+unless ALLOW_PROCESS_LOCAL_CACHE says a single process serves everything.
+Code that avoids queries by reading the cache (token authentication,
+ETags, permission sets, cached fragments) only runs no SQL at all with a
+cache server; with the default database cache each round trip is one
+query against cache_entries.
+"""
+import secrets
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import transaction
+
+KEY = 'version:{name}'
+
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _new_version():
+    return secrets.token_hex(8)
+
+
+def get_version(name):
+    return cache.get_or_set(KEY.format(name=name), _new_version, None)
+
+
+def get_versions(names):
+    """Current version of each name, fetched in one round trip"""
+    keys = {KEY.format(name=name): name for name in names}
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # add() so a version another process just created wins over ours
+        for key in missing:
+            cache.add(key, _new_version(), None)
+        found.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in found.items()}
+
+
+def bump(*names):
+    cache.set_many({KEY.format(name=name): _new_version() for name in names}, None)
+
+
+def model_version_name(model):
+    return f'changes:{model._meta.label_lower}'
+
+
+def models_version(*models):
+    """One value that moves whenever rows of any of the models change, e.g. for {% cache %} keys"""
+    versions = get_versions([model_version_name(model) for model in models])
+    return '.'.join(versions[name] for name in sorted(versions))
+
+
+def mark_changed(*models):
+    """
+    Record that rows of these models changed, e.g. after an update() that
+    sent no signals. Deferred to commit, so no one can pair the new version
+    with the old rows.
+    """
+    names = [model_version_name(model) for model in models]
+    transaction.on_commit(lambda: bump(*names))
+
+
+def cache_is_shared():
+    """Whether other processes read the same default cache as this one"""
+    return settings.CACHES.get('default', {}).get('BACKEND', '') not in PROCESS_LOCAL_BACKENDS
+
+
+def check_shared_cache(app_configs, **kwargs):
+    if not cache_is_shared() and not getattr(settings, 'ALLOW_PROCESS_LOCAL_CACHE', False):
+        return [checks.Error(
+            f"The default cache ({settings.CACHES['default']['BACKEND']}) is local to each process, so cache "
+            'invalidation made by one worker or management command never reaches the others.',
+            hint='Use a shared backend (CACHE_URL, e.g. dbcache://cache_entries or redis://...), or set '
+                 'ALLOW_PROCESS_LOCAL_CACHE = True if a single process serves every request and runs no commands.',
+            id='core.E001',
+        )]
+    return []
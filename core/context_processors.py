@@ -1,5 +1,45 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cache_versions import get_version
+
+
 def has_group_permission(request):
     def check_group(group_name):
-        return request.user.groups.filter(name=group_name).exists()
-    
-    return {'has_group_permission': check_group}
\ No newline at end of file
+        # One cached lookup per request however many checks a page makes
+        return request.identity.has_group(group_name)
+
+    return {'has_group_permission': check_group}
+
+
+class UserCacheVersions:
+    """
+    Per-user version counters for {% cache %} keys, e.g.
+    {% cache 3600 sidebar user.pk cache_versions.inbox %}; looked up on use.
+    They must come from the cache every worker shares, or a bump made in one
+    process leaves the fragment stale in the others (core.E001 enforces it).
+    """
+    def __init__(self, user):
+        self.user = user
+
+    def __getitem__(self, name):
+        if not self.user.is_authenticated:
+            return 0
+        return get_version(f'{name}:{self.user.pk}')
+
+
+def _unread_counts(user):
+    from comms.models import Message, Notification
+    if not user.is_authenticated:
+        return {'messages': 0, 'notifications': 0, 'total': 0}
+    messages = Message.objects.filter(recipient=user, read_at__isnull=True).count()
+    notifications = Notification.objects.filter(user=user, is_read=False).count()
+    return {'messages': messages, 'notifications': notifications, 'total': messages + notifications}
+
+
+def navigation(request):
+    """The request identity, cache versions and unread counts for base.html; the counts only run when its cached sidebar is rebuilt"""
+    return {
+        'identity': request.identity,
+        'cache_versions': UserCacheVersions(request.user),
+        'unread_counts': SimpleLazyObject(lambda: _unread_counts(request.user)),
+    }
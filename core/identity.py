@@ -0,0 +1,131 @@
+"""
+Who is making the request, loaded once.
+
+IdentityBackend loads the session's user joined to their judge profile in
+the query Django runs anyway, and caches each user's permission set under
+the same version counters as their group names (User.group_names).
+IdentityMiddleware attaches request.identity, which memoises the user's
+role, judge profile, group names and permissions for the rest of the
+request; views read it from the request, serializers from
+context['request'] and templates as {{ identity }}.
+
+The permission sets and group names come from the shared cache, so a warm
+request reads them in cache round trips: no SQL with a cache server, one
+query each against cache_entries with the default database cache.
+
+With DEBUG on, responses carry X-Identity-Lookups-Saved: how many reads
+were served from the memo instead of a query.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject, empty
+
+from .cache_versions import get_versions
+
+
+class IdentityBackend(ModelBackend):
+    def get_user(self, user_id):
+        user = get_user_model()._default_manager.select_related('judge_profile').filter(pk=user_id).first()
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            versions = get_versions(['auth:groups', f'auth:groups:{user_obj.pk}'])
+            key = (f"users:permissions:{user_obj.pk}:{int(user_obj.is_superuser)}:"
+                   f"{versions['auth:groups']}:{versions[f'auth:groups:{user_obj.pk}']}")
+            permissions = cache.get(key)
+            if permissions is None:
+                permissions = super().get_all_permissions(user_obj)
+                cache.set(key, permissions, None)
+            user_obj._perm_cache = permissions
+        return user_obj._perm_cache
+
+
+class Identity:
+    """The request's user with their judge profile, group names and permissions, each loaded at most once"""
+
+    def __init__(self, user):
+        self.user = user
+        self.lookups_saved = 0
+        self._memo = {}
+
+    def _remember(self, name, load):
+        if name in self._memo:
+            self.lookups_saved += 1
+        else:
+            self._memo[name] = load()
+        return self._memo[name]
+
+    @property
+    def is_authenticated(self):
+        return self.user.is_authenticated
+
+    @property
+    def user_type(self):
+        return getattr(self.user, 'user_type', None)
+
+    @property
+    def is_officer(self):
+        return self.user_type == 'officer'
+
+    @property
+    def is_judge(self):
+        return self.user_type == 'judge'
+
+    @property
+    def judge(self):
+        """The Judge profile, None for anyone without one"""
+        def load():
+            from judges.models import Judge
+            if not self.is_judge:
+                return None
+            try:
+                return self.user.judge_profile
+            except Judge.DoesNotExist:
+                return None
+        return self._remember('judge', load)
+
+    @property
+    def group_names(self):
+        return self._remember('group_names', lambda: self.user.group_names() if self.is_authenticated else frozenset())
+
+    @property
+    def permissions(self):
+        return self._remember('permissions', self.user.get_all_permissions)
+
+    def has_group(self, name):
+        return self.is_authenticated and name in self.group_names
+
+    def has_perm(self, perm):
+        if self.user.is_active and self.user.is_superuser:
+            return True
+        return perm in self.permissions
+
+
+def identity_for(user):
+    """The Identity of a user, shared by everything holding the same user object"""
+    identity = getattr(user, '_identity', None)
+    if identity is None:
+        identity = user._identity = Identity(user)
+    return identity
+
+
+class IdentityMiddleware:
+    """
+    Sets request.identity. It resolves on first use, so in DRF views it is
+    the user their authentication classes found.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.identity = SimpleLazyObject(lambda: identity_for(request.user))
+        response = self.get_response(request)
+        if settings.DEBUG and request.identity._wrapped is not empty:
+            response.headers['X-Identity-Lookups-Saved'] = str(request.identity.lookups_saved)
+        return response
@@ -0,0 +1,72 @@
+"""
+Which rows each role may see, declared once per model.
+
+Each app registers its models' rules at the bottom of its models.py:
+
+    scoping.register(Case, officer=lambda user: Q(officer=user),
+                     judge=lambda user: Q(presiding_judge=user))
+    scoping.register(RehabilitationPlan, officer='case', judge='case')
+
+A rule is a function of the user returning a Q, the name of a foreign key
+(the row is visible when the row it points to is), or a tuple of these,
+any of which may match. Relations compile to "IN (SELECT ...)" and rules
+that look across a to-many relation should use Exists, so scoped
+querysets never need DISTINCT. Roles without a rule (administrators,
+staff) see every row. The compiled condition is memoised on the request
+identity, so a view, its serializers and templates build it once.
+"""
+from django.db.models import Q
+
+SCOPED_ROLES = ('officer', 'judge')
+
+_rules = {}
+
+
+def register(model, **rules):
+    unknown = set(rules) - set(SCOPED_ROLES)
+    if unknown:
+        raise ValueError(f"No such role to scope {model.__name__} by: {', '.join(sorted(unknown))}")
+    _rules[model] = rules
+
+
+def _compile(model, user):
+    """The condition for the user's rows of model; None when they may see all of them"""
+    rule = _rules[model].get(user.user_type)
+    if rule is None:
+        return None
+    condition = Q()
+    for part in rule if isinstance(rule, tuple) else (rule,):
+        if isinstance(part, str):
+            related = model._meta.get_field(part).related_model
+            related_condition = condition_for(related, user)
+            if related_condition is None:
+                return None
+            part = Q(**{f'{part}__in': related._default_manager.filter(related_condition).values('pk')})
+        else:
+            part = part(user)
+        condition |= part
+    return condition
+
+
+def condition_for(model, user):
+    """The Q limiting model to what the user may see (None for everything), memoised per request"""
+    if not user.is_authenticated:
+        return Q(pk__in=[])
+    if model not in _rules or user.user_type not in SCOPED_ROLES:
+        return None
+    from .identity import identity_for
+    memo = identity_for(user)._memo.setdefault('scoping', {})
+    if model not in memo:
+        memo[model] = _compile(model, user)
+    return memo[model]
+
+
+def scope(queryset, user):
+    """Narrow a queryset to the rows the user may see"""
+    condition = condition_for(queryset.model, user)
+    return queryset if condition is None else queryset.filter(condition)
+
+
+def visible(model, user):
+    """All rows of model the user may see"""
+    return scope(model._default_manager.all(), user)
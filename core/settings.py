@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'api',
     'courts',
     'judges',
+    'search',
     'rest_framework',
     'rest_framework.authtoken',
 ]
@@ -48,6 +49,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.identity.IdentityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -76,6 +78,17 @@ DATABASES = {
     'default': env.db('DATABASE_URL', default='sqlite:///db.sqlite3')
 }
 
+# Every process must share the cache: version counters (core/cache_versions.py) bumped by
+# one worker or management command have to reach the others. The default keeps it in the
+# database (table created by the api migrations); point CACHE_URL at redis:// or
+# pymemcache:// in production. A process-local cache fails the startup checks unless
+# ALLOW_PROCESS_LOCAL_CACHE is set for a single-process setup. Paths that take "no
+# queries on a warm cache" (API tokens, ETags, permission sets, cached fragments) make
+# cache round trips instead; with the database cache each of those is still one query
+CACHES = {
+    'default': env.cache('CACHE_URL', default='dbcache://cache_entries'),
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -115,9 +128,73 @@ LOGIN_URL = 'login'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # Custom permissions
 def has_group_permission(user, group_name):
-    return user.groups.filter(name=group_name).exists()
+    return group_name in user.group_names()
 
 # Add to context processors
 TEMPLATES[0]['OPTIONS']['context_processors'].append(
     'core.context_processors.has_group_permission'
 )
+TEMPLATES[0]['OPTIONS']['context_processors'].append(
+    'core.context_processors.navigation'
+)
+
+# Reminders (see comms/management/commands/send_reminders.py)
+REMINDER_LEAD_HOURS = 24
+
+# No-show sweeper (see appointments/management/commands/sweep_no_shows.py)
+NO_SHOW_GRACE_MINUTES = 120
+
+# Officer workload figures are cached for this many seconds (reporting/workload.py)
+WORKLOAD_CACHE_SECONDS = 300
+
+# Court docket exports are picked up from here (see courts/management/commands/ingest_dockets.py)
+COURT_INGEST_DIR = BASE_DIR / 'ingest' / 'dockets'
+
+# Court order documents (courts/documents.py): set to 'X-Accel-Redirect' (nginx) or
+# 'X-Sendfile' (Apache) to let the web server send files; nginx serves
+# DOCUMENT_SENDFILE_PREFIX as an internal location aliased to MEDIA_ROOT
+DOCUMENT_SENDFILE_HEADER = env('DOCUMENT_SENDFILE_HEADER', default=None)
+DOCUMENT_SENDFILE_PREFIX = '/protected/'
+
+# Dashboard widgets are cached per user for this many seconds (templates/dashboard.html); changes to
+# clients, cases and appointments rebuild them sooner, plan items only once this runs out
+DASHBOARD_CACHE_SECONDS = 60
+
+# Admin changelists of tables at least this big show the database's row estimate
+# instead of an exact COUNT(*) when unfiltered (core/admin.py)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+# REST API authentication (api/authentication.py). Tokens expire after
+# API_TOKEN_IDLE_HOURS unused and API_TOKEN_MAX_AGE_DAYS after login; a rotated
+# token keeps working for API_TOKEN_ROTATION_GRACE_SECONDS
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.authentication.CachedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+}
+API_TOKEN_IDLE_HOURS = 72
+API_TOKEN_MAX_AGE_DAYS = 30
+API_TOKEN_ROTATION_GRACE_SECONDS = 60
+API_TOKEN_CACHE_SECONDS = 300
+
+# Batched API calls (api/batch.py): at most API_BATCH_MAX_REQUESTS per batch, with
+# consecutive reads run on up to API_BATCH_WORKERS threads (1 runs them in turn)
+API_BATCH_MAX_REQUESTS = 20
+API_BATCH_WORKERS = 4
+
+# Home-visit routes (appointments/routes.py): visits may move this many minutes either
+# side of their booked time; travel is straight-line distance at ROUTE_SPEED_KMH.
+# GEOCODER places addresses (clients/geocoding.py); the default uses ZIP centroids
+# loaded with load_zip_centroids
+ROUTE_TIME_WINDOW_MINUTES = 60
+ROUTE_SPEED_KMH = 40
+GEOCODER = 'clients.geocoding.ZipCentroidGeocoder'
+
+# Sessions started under IdentityBackend load the user with their judge profile in one
+# query (core/identity.py); ModelBackend stays so sessions from before keep working
+AUTHENTICATION_BACKENDS = [
+    'core.identity.IdentityBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
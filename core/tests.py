@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from appointments.models import Appointment
+from clients.tests import make_client
+from users.models import User
+
+
+class DashboardCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin')
+        cls.officer = User.objects.create_user('officer', user_type='officer')
+
+    def setUp(self):
+        self.client.force_login(self.officer)
+
+    def test_cached_widgets_show_new_rows(self):
+        self.assertContains(self.client.get('/'), 'No upcoming appointments')
+        # Versions move when the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            client = make_client('C-1', self.officer, self.admin)
+            Appointment.objects.create(client=client, officer=self.officer, appointment_type='checkin',
+                                       scheduled_date=timezone.now() + timedelta(days=1), location='Office')
+        response = self.client.get('/')
+        self.assertContains(response, client.full_name)
+        self.assertEqual(response.context['total_clients'](), 1)
+        self.assertNotContains(response, 'No upcoming appointments')
+
+    def test_widgets_stay_cached_until_what_they_show_changes(self):
+        client = make_client('C-1', self.officer, self.admin)
+        appointment = Appointment.objects.create(client=client, officer=self.officer, appointment_type='checkin',
+                                                 scheduled_date=timezone.now() + timedelta(days=1),
+                                                 location='Office')
+        self.assertContains(self.client.get('/'), 'Office')
+        # A write that sends no signal is not seen until the fragment expires...
+        Appointment.objects.filter(pk=appointment.pk).update(location='Courthouse')
+        self.assertContains(self.client.get('/'), 'Office')
+        # ...while a saved change is seen at once
+        appointment.location = 'Home visit'
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+        self.assertContains(self.client.get('/'), 'Home visit')
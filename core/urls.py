@@ -3,10 +3,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from . import views  
+from users.views import profile_picture_variant
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.dashboard, name='dashboard'),  
+    path('autocomplete/<str:lookup>/', views.autocomplete, name='autocomplete'),
     path('users/', include('users.urls')),
     path('clients/', include('clients.urls')),
     path('cases/', include('cases.urls')),
@@ -16,6 +18,10 @@ urlpatterns = [
     path('api/', include('api.urls')),
     path('judges/', include('judges.urls')),
     path('courts/', include('courts.urls')),
+    path('search/', include('search.urls')),
+    # Same path as the stored file: the web server serves existing variants, misses render here
+    path(f"{settings.MEDIA_URL.lstrip('/')}profiles/variants/<str:prefix>/<str:name>",
+         profile_picture_variant, name='profile_picture_variant'),
 ]
 
 if settings.DEBUG:
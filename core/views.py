@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.http import Http404, JsonResponse
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
@@ -6,116 +8,98 @@ from clients.models import Client
 from cases.models import Case
 from appointments.models import Appointment
 from comms.models import Notification, Message
+from .autocomplete import LOOKUPS, MAX_RESULTS
+from .cache_versions import models_version
+from .scoping import visible
 
 @login_required
 def dashboard(request):
     # Import court models here to avoid circular imports
-    from courts.models import CourtCase, Hearing, CourtOrder
+    from courts.models import Court, CourtCase, Hearing, CourtOrder
     from judges.models import Judge
     
+    # Figures are passed as unevaluated querysets and bound count methods: the
+    # template's cached widgets only run the ones they show, and only on a miss
+    
+    # Clients and cases the user may see: officers their own, judges those they preside over
+    clients = visible(Client, request.user)
+    total_clients = clients.count
+    active_cases = visible(Case, request.user).filter(status='open').count
+    
     # Get statistics for dashboard based on user role
     if request.user.user_type == 'officer':
-        # Officers see only their assigned clients and cases
-        total_clients = Client.objects.filter(assigned_officer=request.user).count()
-        active_cases = Case.objects.filter(officer=request.user, status='open').count()
-        todays_appointments = Appointment.objects.filter(
+        todays_appointments = visible(Appointment, request.user).filter(
             scheduled_date__date=timezone.now().date(),
-            officer=request.user
-        ).count()
-        clients = Client.objects.filter(assigned_officer=request.user)
+        ).count
         
         # Court-related stats for officers
-        court_cases = CourtCase.objects.filter(case__officer=request.user)
-        active_court_cases = court_cases.filter(status='ACTIVE').count()
-        upcoming_hearings = Hearing.objects.filter(
-            court_case__case__officer=request.user,
+        active_court_cases = visible(CourtCase, request.user).filter(status='ACTIVE').count
+        upcoming_hearings = visible(Hearing, request.user).filter(
             hearing_date__gte=timezone.now(),
             is_completed=False
-        ).count()
+        ).count
         
     elif request.user.user_type == 'judge':
         # Judges see their presiding cases and court-related data
-        total_clients = Client.objects.filter(cases__presiding_judge=request.user).distinct().count()
-        active_cases = Case.objects.filter(presiding_judge=request.user, status='open').count()
         todays_appointments = 0  # Judges don't have appointments in the same way
         
-        # Get judge profile
-        try:
-            judge_profile = Judge.objects.get(user=request.user)
-            # Court-related stats for judges
-            court_cases = CourtCase.objects.filter(judge=judge_profile)
-            active_court_cases = court_cases.filter(status='ACTIVE').count()
-            upcoming_hearings = Hearing.objects.filter(
-                judge=judge_profile,
-                hearing_date__gte=timezone.now(),
-                is_completed=False
-            ).count()
-            todays_hearings = Hearing.objects.filter(
-                judge=judge_profile,
-                hearing_date__date=timezone.now().date()
-            ).count()
-            pending_orders = CourtOrder.objects.filter(
-                judge=judge_profile,
-                is_active=True
-            ).count()
-        except Judge.DoesNotExist:
-            # If no judge profile exists, set defaults
-            active_court_cases = 0
-            upcoming_hearings = 0
-            todays_hearings = 0
-            pending_orders = 0
-            
-        clients = Client.objects.filter(cases__presiding_judge=request.user).distinct()
+        # Court-related stats for judges, through their judge profile (none without one)
+        court_cases = CourtCase.objects.filter(judge__user=request.user)
+        active_court_cases = court_cases.filter(status='ACTIVE').count
+        upcoming_hearings = Hearing.objects.filter(
+            judge__user=request.user,
+            hearing_date__gte=timezone.now(),
+            is_completed=False
+        ).count
+        todays_hearings = Hearing.objects.filter(
+            judge__user=request.user,
+            hearing_date__date=timezone.now().date()
+        ).count
+        pending_orders = CourtOrder.objects.filter(
+            judge__user=request.user,
+            is_active=True
+        ).count
         
     else:
         # Admins and staff see all data
-        total_clients = Client.objects.count()
-        active_cases = Case.objects.filter(status='open').count()
         todays_appointments = Appointment.objects.filter(
             scheduled_date__date=timezone.now().date()
-        ).count()
-        clients = Client.objects.all()
+        ).count
         
         # Court system statistics for admin
-        active_court_cases = CourtCase.objects.filter(status='ACTIVE').count()
+        active_court_cases = CourtCase.objects.filter(status='ACTIVE').count
         upcoming_hearings = Hearing.objects.filter(
             hearing_date__gte=timezone.now(),
             is_completed=False
-        ).count()
-        total_courts = Court.objects.filter(is_active=True).count()
-        total_judges = Judge.objects.filter(is_active=True).count()
+        ).count
+        total_courts = Court.objects.filter(is_active=True).count
+        total_judges = Judge.objects.filter(is_active=True).count
     
     today = timezone.now().date()
     
     # Get recent appointments based on role
     if request.user.user_type == 'officer':
-        recent_appointments = Appointment.objects.filter(
+        recent_appointments = visible(Appointment, request.user).filter(
             scheduled_date__gte=timezone.now(),
-            officer=request.user
-        ).order_by('scheduled_date')[:5]
+        ).select_related('client').order_by('scheduled_date')[:5]
         
         # Recent court hearings for officer's cases
-        recent_hearings = Hearing.objects.filter(
-            court_case__case__officer=request.user,
+        recent_hearings = visible(Hearing, request.user).filter(
             hearing_date__gte=timezone.now()
         ).order_by('hearing_date')[:5]
         
     elif request.user.user_type == 'judge':
         # Judges see upcoming court dates instead of appointments
         recent_appointments = []
-        try:
-            judge_profile = Judge.objects.get(user=request.user)
-            recent_hearings = Hearing.objects.filter(
-                judge=judge_profile,
-                hearing_date__gte=timezone.now()
-            ).order_by('hearing_date')[:5]
-        except Judge.DoesNotExist:
-            recent_hearings = []
+        recent_hearings = Hearing.objects.filter(
+            judge__user=request.user,
+            hearing_date__gte=timezone.now()
+        ).order_by('hearing_date')[:5]
             
     else:
         recent_appointments = Appointment.objects.filter(
             scheduled_date__gte=timezone.now()
-        ).order_by('scheduled_date')[:5]
+        ).select_related('client').order_by('scheduled_date')[:5]
         
         # Recent hearings for admin
         recent_hearings = Hearing.objects.filter(
@@ -129,59 +113,27 @@ def dashboard(request):
     
     # Calculate pending tasks
     from cases.models import PlanItem
-    if request.user.user_type == 'officer':
-        pending_tasks = PlanItem.objects.filter(
-            rehabilitation_plan__case__officer=request.user,
-            is_completed=False,
-            due_date__lte=timezone.now() + timezone.timedelta(days=7)
-        ).count()
-        
-        # Judicial review tasks for officers
-        judicial_review_tasks = PlanItem.objects.filter(
-            rehabilitation_plan__case__officer=request.user,
-            requires_judicial_review=True,
-            is_completed=False
-        ).count()
-        
-    elif request.user.user_type == 'judge':
-        pending_tasks = PlanItem.objects.filter(
-            rehabilitation_plan__case__presiding_judge=request.user,
-            requires_judicial_review=True,
-            is_completed=False
-        ).count()
-        judicial_review_tasks = pending_tasks  # For judges, all pending tasks are judicial reviews
-        
+    plan_items = visible(PlanItem, request.user)
+    judicial_review_tasks = plan_items.filter(
+        requires_judicial_review=True,
+        is_completed=False
+    ).count
+    if request.user.user_type == 'judge':
+        pending_tasks = judicial_review_tasks  # For judges, all pending tasks are judicial reviews
     else:
-        pending_tasks = PlanItem.objects.filter(
+        pending_tasks = plan_items.filter(
             is_completed=False,
             due_date__lte=timezone.now() + timezone.timedelta(days=7)
-        ).count()
-        judicial_review_tasks = PlanItem.objects.filter(
-            requires_judicial_review=True,
-            is_completed=False
-        ).count()
+        ).count
     
     # Get unread messages count
     unread_messages = Message.objects.filter(
         recipient=request.user,
         read_at__isnull=True
-    ).count()
+    ).count
     
     # Get high-risk clients for alert
-    if request.user.user_type == 'officer':
-        high_risk_clients = Client.objects.filter(
-            risk_level='high', 
-            status='active',
-            assigned_officer=request.user
-        )[:3]
-    elif request.user.user_type == 'judge':
-        high_risk_clients = Client.objects.filter(
-            risk_level='high', 
-            status='active',
-            cases__presiding_judge=request.user
-        ).distinct()[:3]
-    else:
-        high_risk_clients = Client.objects.filter(risk_level='high', status='active')[:3]
+    high_risk_clients = clients.filter(risk_level='high', status='active')[:3]
     
     # Build context based on user role
     context = {
@@ -195,6 +147,9 @@ def dashboard(request):
         'high_risk_clients': high_risk_clients,
         'user_role': request.user.get_user_type_display(),
         'judicial_review_tasks': judicial_review_tasks,
+        'dashboard_cache_seconds': getattr(settings, 'DASHBOARD_CACHE_SECONDS', 60),
+        # Part of the widgets' cache keys, so a change to what they show rebuilds them
+        'dashboard_version': models_version(Appointment, Client, Case),
     }
     
     # Add court system statistics based on user role
@@ -221,4 +176,22 @@ def dashboard(request):
             'recent_hearings': recent_hearings,
         })
     
-    return render(request, 'dashboard.html', context)
\ No newline at end of file
+    return render(request, 'dashboard.html', context)
+
+@login_required
+def autocomplete(request, lookup):
+    """Top matches for an autocomplete field, as {"results": [{"id", "text"}]}"""
+    if lookup not in LOOKUPS:
+        raise Http404("Unknown lookup.")
+    query = request.GET.get('q', '').strip()
+    forward = {key[len('forward_'):]: value for key, value in request.GET.items() if key.startswith('forward_') and value}
+    try:
+        limit = min(max(int(request.GET.get('limit', MAX_RESULTS)), 1), MAX_RESULTS)
+    except ValueError:
+        limit = MAX_RESULTS
+    try:
+        results = LOOKUPS[lookup].search(request.user, query, forward, limit)
+    except ValueError:
+        # A forwarded field held something other than an id
+        results = []
+    return JsonResponse({'results': results})
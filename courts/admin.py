@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Court, CourtCase, Hearing, CourtOrder
+from django.db import transaction
+from django.utils import timezone
+from core.admin import AutocompleteFilter, LargeTableAdmin
+from core.cache_versions import mark_changed
+from .models import Court, CourtCase, Hearing, CourtOrder, Document, IngestCheckpoint
 
 @admin.register(Court)
 class CourtAdmin(admin.ModelAdmin):
@@ -9,22 +13,81 @@ class CourtAdmin(admin.ModelAdmin):
     list_editable = ['is_active']
 
 @admin.register(CourtCase)
-class CourtCaseAdmin(admin.ModelAdmin):
+class CourtCaseAdmin(LargeTableAdmin, admin.ModelAdmin):
     list_display = ['case_number', 'case', 'court', 'judge', 'filing_date', 'status']
-    list_filter = ['status', 'court', 'judge']
+    list_filter = ['status', 'court', ('judge', AutocompleteFilter)]
+    list_select_related = ['case__client', 'court', 'judge__user']
     search_fields = ['case_number', 'case__client__first_name', 'case__client__last_name']
     date_hierarchy = 'filing_date'
+    autocomplete_fields = ['judge']
+    raw_id_fields = ['case']
+    actions = ['close_cases']
+
+    @admin.action(description='Close selected court cases')
+    def close_cases(self, request, queryset):
+        from .fragments import invalidate_court_fragments
+        with transaction.atomic():
+            court_ids = set(queryset.values_list('court_id', flat=True))
+            updated = queryset.exclude(status='CLOSED').update(status='CLOSED')
+            mark_changed(CourtCase)
+        invalidate_court_fragments(court_ids, ['stats', 'cases'])
+        self.message_user(request, f'{updated} court case(s) closed.')
 
 @admin.register(Hearing)
-class HearingAdmin(admin.ModelAdmin):
+class HearingAdmin(LargeTableAdmin, admin.ModelAdmin):
     list_display = ['court_case', 'hearing_type', 'hearing_date', 'judge', 'is_completed']
-    list_filter = ['hearing_type', 'is_completed', 'judge']
+    list_filter = ['hearing_type', 'is_completed', ('judge', AutocompleteFilter)]
+    list_select_related = ['court_case__court', 'judge__user']
     search_fields = ['court_case__case_number']
     date_hierarchy = 'hearing_date'
+    autocomplete_fields = ['court_case', 'judge']
+    actions = ['complete_hearings']
+
+    @admin.action(description='Mark selected hearings as completed')
+    def complete_hearings(self, request, queryset):
+        from reporting.rollups import apply_hearing_completion
+        from .fragments import invalidate_court_fragments
+        with transaction.atomic():
+            # Lock the open hearings so the rollups move exactly the rows updated
+            rows = list(queryset.filter(is_completed=False).select_for_update(of=('self',)).values(
+                'pk', 'hearing_date', 'hearing_type', 'court_case__court_id',
+            ))
+            Hearing.objects.filter(pk__in=[row['pk'] for row in rows]).update(is_completed=True, updated_at=timezone.now())
+            apply_hearing_completion(rows)
+            mark_changed(Hearing)
+        invalidate_court_fragments({row['court_case__court_id'] for row in rows}, ['stats', 'hearings'])
+        self.message_user(request, f'{len(rows)} hearing(s) marked as completed.')
 
 @admin.register(CourtOrder)
-class CourtOrderAdmin(admin.ModelAdmin):
+class CourtOrderAdmin(LargeTableAdmin, admin.ModelAdmin):
     list_display = ['court_case', 'order_type', 'order_date', 'judge', 'is_active']
-    list_filter = ['order_type', 'is_active', 'judge']
+    list_filter = ['order_type', 'is_active', ('judge', AutocompleteFilter)]
+    list_select_related = ['court_case__court', 'judge__user']
     search_fields = ['court_case__case_number']
-    date_hierarchy = 'order_date'
\ No newline at end of file
+    date_hierarchy = 'order_date'
+    autocomplete_fields = ['court_case', 'judge']
+    raw_id_fields = ['document']
+    actions = ['deactivate_orders']
+
+    @admin.action(description='Deactivate selected court orders')
+    def deactivate_orders(self, request, queryset):
+        from .fragments import invalidate_court_fragments
+        with transaction.atomic():
+            court_ids = set(queryset.values_list('court_case__court_id', flat=True))
+            updated = queryset.filter(is_active=True).update(is_active=False)
+            mark_changed(CourtOrder)
+        invalidate_court_fragments(court_ids, ['stats', 'orders'])
+        self.message_user(request, f'{updated} court order(s) deactivated.')
+
+@admin.register(Document)
+class DocumentAdmin(admin.ModelAdmin):
+    list_display = ['original_name', 'sha256', 'size', 'content_type', 'ref_count', 'created_at']
+    search_fields = ['original_name', 'sha256']
+    readonly_fields = ['sha256', 'file', 'size', 'content_type', 'ref_count', 'created_at', 'touched_at']
+
+@admin.register(IngestCheckpoint)
+class IngestCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['file_name', 'status', 'records_done', 'error_count', 'started_at', 'completed_at']
+    list_filter = ['status']
+    search_fields = ['file_name', 'fingerprint']
+    readonly_fields = ['fingerprint', 'file_name', 'records_done', 'error_count', 'started_at', 'updated_at', 'completed_at']
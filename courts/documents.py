@@ -0,0 +1,175 @@
+"""
+Content-addressed storage for court order documents.
+
+A file is stored once under its SHA-256 however many orders attach it;
+Document.ref_count tracks how many do (see the CourtOrder signals in
+courts.models) and purge() removes documents nobody references any more.
+Uploads are hashed and written chunk by chunk, and downloads stream from
+storage with Range support or are handed to the web server with
+X-Accel-Redirect / X-Sendfile, so a document is never held in memory.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+
+from .models import Document
+
+CHUNK_SIZE = 64 * 1024
+PURGE_GRACE = timedelta(hours=1)  # Unreferenced uploads may still be about to be attached
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def hash_file(file):
+    """SHA-256 and size of an uploaded or stored file, read in chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in file.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    file.seek(0)
+    return digest.hexdigest(), size
+
+
+def store(uploaded_file):
+    """
+    Return the Document holding this content, saving the file only if it is
+    new. The caller attaches it to an order, which counts the reference.
+    """
+    sha256, size = hash_file(uploaded_file)
+    document = Document.objects.filter(sha256=sha256).first()
+    if document is not None:
+        Document.objects.filter(pk=document.pk).update(touched_at=timezone.now())
+        return document
+
+    name = os.path.basename(uploaded_file.name or '')
+    document = Document(
+        sha256=sha256,
+        size=size,
+        original_name=name[:255],
+        content_type=(
+            getattr(uploaded_file, 'content_type', None)
+            or mimetypes.guess_type(name)[0]
+            or 'application/octet-stream'
+        ),
+    )
+    document.file.save(sha256, uploaded_file, save=False)
+    try:
+        with transaction.atomic():
+            document.save()
+    except IntegrityError:
+        # Someone stored the same content at the same moment; use theirs
+        stored_name = document.file.name
+        document = Document.objects.get(sha256=sha256)
+        if stored_name != document.file.name:
+            document.file.storage.delete(stored_name)
+    return document
+
+
+def purge(grace=PURGE_GRACE):
+    """Delete documents no order has referenced for a while, files included. Returns the count."""
+    cutoff = timezone.now() - grace
+    purged = 0
+    for document in Document.objects.filter(ref_count__lte=0, touched_at__lt=cutoff).iterator():
+        with transaction.atomic():
+            # Re-check under the row lock in case an order picked it up meanwhile
+            locked = Document.objects.select_for_update().filter(
+                pk=document.pk, ref_count__lte=0, touched_at__lt=cutoff,
+            ).first()
+            if locked is None:
+                continue
+            name = locked.file.name
+            storage = locked.file.storage
+            locked.delete()
+            transaction.on_commit(lambda: storage.delete(name))
+            purged += 1
+    return purged
+
+
+def _parse_range(header, size):
+    """(start, end) inclusive for a single byte range, None to send everything, False if unsatisfiable"""
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        # Malformed or multi-range requests get the whole file
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def serve(request, document, filename=None, as_attachment=False):
+    """
+    Response for a document download. With DOCUMENT_SENDFILE_HEADER set the
+    web server sends the file; otherwise it is streamed from storage,
+    honouring Range and If-Range requests. The content hash is a strong ETag.
+    """
+    filename = filename or document.original_name or document.sha256
+    etag = f'"{document.sha256}"'
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        return HttpResponseNotModified(headers={'ETag': etag})
+
+    sendfile_header = getattr(settings, 'DOCUMENT_SENDFILE_HEADER', None)
+    if sendfile_header:
+        response = HttpResponse(content_type=document.content_type)
+        if sendfile_header == 'X-Accel-Redirect':
+            prefix = getattr(settings, 'DOCUMENT_SENDFILE_PREFIX', '/protected/')
+            response[sendfile_header] = prefix.rstrip('/') + '/' + document.file.name
+        else:
+            response[sendfile_header] = document.file.path
+    else:
+        byte_range = None
+        range_header = request.headers.get('Range')
+        if range_header and request.headers.get('If-Range', etag) == etag:
+            byte_range = _parse_range(range_header, document.size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{document.size}'
+            return response
+        file = document.file.storage.open(document.file.name, 'rb')
+        if byte_range is None:
+            response = FileResponse(file, content_type=document.content_type)
+            response['Content-Length'] = document.size
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(file, start, end - start + 1),
+                status=206,
+                content_type=document.content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{document.size}'
+            response['Content-Length'] = end - start + 1
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    # The content behind a hash never changes, but the documents are not public
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return response
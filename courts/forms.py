@@ -1,4 +1,5 @@
 from django import forms
+from core.autocomplete import AutocompleteSelect
 from .models import Court, CourtCase, Hearing, CourtOrder
 
 class CourtForm(forms.ModelForm):
@@ -22,9 +23,9 @@ class CourtCaseForm(forms.ModelForm):
         model = CourtCase
         fields = ['case', 'court', 'judge', 'case_number', 'filing_date', 'next_hearing_date', 'status', 'notes']
         widgets = {
-            'case': forms.Select(attrs={'class': 'form-control'}),
+            'case': AutocompleteSelect('cases'),
             'court': forms.Select(attrs={'class': 'form-control'}),
-            'judge': forms.Select(attrs={'class': 'form-control'}),
+            'judge': AutocompleteSelect('judges', forward=['court']),
             'case_number': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Enter case number'}),
             'filing_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'next_hearing_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
@@ -37,25 +38,39 @@ class HearingForm(forms.ModelForm):
         model = Hearing
         fields = ['court_case', 'hearing_type', 'hearing_date', 'judge', 'location', 'notes']
         widgets = {
-            'court_case': forms.Select(attrs={'class': 'form-control'}),
+            'court_case': AutocompleteSelect('court-cases'),
             'hearing_type': forms.Select(attrs={'class': 'form-control'}),
             'hearing_date': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
-            'judge': forms.Select(attrs={'class': 'form-control'}),
+            'judge': AutocompleteSelect('judges', forward=['court_case']),
             'location': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Enter hearing location'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Enter hearing notes'}),
         }
 
 class CourtOrderForm(forms.ModelForm):
+    file = forms.FileField(
+        required=False,
+        label='Document',
+        widget=forms.FileInput(attrs={'class': 'form-control'}),
+        help_text='Leave empty to keep the current document',
+    )
+    
     class Meta:
         model = CourtOrder
-        fields = ['court_case', 'order_type', 'order_date', 'effective_date', 'judge', 'order_text', 'file']
+        fields = ['court_case', 'order_type', 'order_date', 'effective_date', 'judge', 'order_text']
         widgets = {
-            'court_case': forms.Select(attrs={'class': 'form-control'}),
+            'court_case': AutocompleteSelect('court-cases'),
             'order_type': forms.Select(attrs={'class': 'form-control'}),
             'order_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'effective_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
-            'judge': forms.Select(attrs={'class': 'form-control'}),
+            'judge': AutocompleteSelect('judges', forward=['court_case']),
             'order_text': forms.Textarea(attrs={'class': 'form-control', 'rows': 5, 'placeholder': 'Enter order text'}),
-            'file': forms.FileInput(attrs={'class': 'form-control'}),
         }
+    
+    def save(self, commit=True):
+        upload = self.cleaned_data.get('file')
+        if upload:
+            # Identical scans uploaded for several orders are stored once
+            from .documents import store
+            self.instance.document = store(upload)
+        return super().save(commit=commit)
         
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""
+Sections of the court detail page, loaded and cached independently.
+
+A busy court has thousands of cases, so the detail page renders only the
+court itself and fetches each section (stats, judges, cases, hearings,
+orders) a page at a time from court_detail_fragment, as HTML or JSON.
+Each section's data is cached per page under a version counter for that
+court and section; the model signals bump only the sections a change can
+affect (see invalidate_court_fragments).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Count, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cache_versions import bump, get_version
+from judges.models import Judge
+from .models import Court, CourtCase, CourtOrder, Hearing
+
+PAGE_SIZE = 25
+CACHE_KEY = 'courts:court-fragment:{court_id}:{fragment}:{version}:{page}'
+
+
+def _version_name(court_id, fragment):
+    return f'courts:court:{court_id}:{fragment}'
+
+
+def _page(queryset, page, row):
+    paginator = Paginator(queryset, PAGE_SIZE)
+    page = paginator.get_page(page)
+    return {
+        'items': [row(obj) for obj in page.object_list],
+        'page': page.number,
+        'num_pages': paginator.num_pages,
+        'count': paginator.count,
+    }
+
+
+def _stats(court_id, page):
+    now = timezone.now()
+    stats = CourtCase.objects.filter(court_id=court_id).aggregate(
+        total_cases=Count('pk'),
+        active_cases=Count('pk', filter=Q(status='ACTIVE')),
+        pending_cases=Count('pk', filter=Q(status='PENDING')),
+        closed_cases=Count('pk', filter=Q(status='CLOSED')),
+        appealed_cases=Count('pk', filter=Q(status='APPEALED')),
+    )
+    stats['active_judges'] = Judge.objects.filter(court_id=court_id, is_active=True).count()
+    stats['upcoming_hearings'] = Hearing.objects.filter(
+        court_case__court_id=court_id, hearing_date__gte=now, is_completed=False,
+    ).count()
+    stats['active_orders'] = CourtOrder.objects.filter(court_case__court_id=court_id, is_active=True).count()
+    return stats
+
+
+def _judges(court_id, page):
+    judges = Judge.objects.filter(court_id=court_id, is_active=True).select_related('user')
+    return _page(judges, page, lambda judge: {
+        'id': judge.pk,
+        'judge_id': judge.judge_id,
+        'name': judge.get_full_name(),
+        'specialization': judge.get_specialization_display(),
+        'phone': judge.phone,
+        'office_location': judge.office_location,
+    })
+
+
+def _cases(court_id, page):
+    court_cases = CourtCase.objects.filter(court_id=court_id).select_related(
+        'case__client', 'judge__user',
+    ).order_by('-filing_date', '-pk')
+    return _page(court_cases, page, lambda court_case: {
+        'id': court_case.pk,
+        'case_number': court_case.case_number,
+        'client': court_case.case.client.full_name,
+        'judge': court_case.judge.get_full_name() if court_case.judge else '',
+        'status': court_case.status,
+        'status_display': court_case.get_status_display(),
+        'filing_date': court_case.filing_date,
+        'next_hearing_date': court_case.next_hearing_date,
+        'url': reverse('courts:court_case_detail', args=[court_case.pk]),
+    })
+
+
+def _hearings(court_id, page):
+    hearings = Hearing.objects.filter(
+        court_case__court_id=court_id, hearing_date__gte=timezone.now(),
+    ).select_related('court_case', 'judge__user').order_by('hearing_date', 'pk')
+    return _page(hearings, page, lambda hearing: {
+        'id': hearing.pk,
+        'hearing_date': hearing.hearing_date,
+        'hearing_type': hearing.get_hearing_type_display(),
+        'case_number': hearing.court_case.case_number,
+        'judge': hearing.judge.get_full_name(),
+        'location': hearing.location,
+        'is_completed': hearing.is_completed,
+        'url': reverse('courts:hearing_detail', args=[hearing.pk]),
+    })
+
+
+def _orders(court_id, page):
+    orders = CourtOrder.objects.filter(court_case__court_id=court_id).select_related(
+        'court_case', 'judge__user',
+    ).order_by('-order_date', '-pk')
+    return _page(orders, page, lambda order: {
+        'id': order.pk,
+        'order_type': order.get_order_type_display(),
+        'case_number': order.court_case.case_number,
+        'judge': order.judge.get_full_name(),
+        'order_date': order.order_date,
+        'effective_date': order.effective_date,
+        'is_active': order.is_active,
+        'url': reverse('courts:court_order_detail', args=[order.pk]),
+        'document_url': reverse('courts:court_order_document', args=[order.pk]) if order.document_id else '',
+    })
+
+
+FRAGMENTS = {
+    'stats': _stats,
+    'judges': _judges,
+    'cases': _cases,
+    'hearings': _hearings,
+    'orders': _orders,
+}
+
+
+def fragment_data(court_id, fragment, page=1):
+    """
+    Cached data for one page of a section; None if the court doesn't exist.
+    Values are plain dicts, ready for a template or JsonResponse.
+    """
+    if page != 1:
+        # Pages past the end show the last one, as Paginator.get_page does, and are cached as that page
+        first = fragment_data(court_id, fragment)
+        if first is None:
+            return None
+        page = min(page, first.get('num_pages', 1))
+        if page == 1:
+            return first
+    version = get_version(_version_name(court_id, fragment))
+    key = CACHE_KEY.format(court_id=court_id, fragment=fragment, version=version, page=page)
+    data = cache.get(key)
+    if data is None:
+        if not Court.objects.filter(pk=court_id).exists():
+            return None
+        data = FRAGMENTS[fragment](court_id, page)
+        # Upcoming hearings drift as time passes, so nothing is cached forever
+        cache.set(key, data, getattr(settings, 'COURT_FRAGMENT_CACHE_SECONDS', 300))
+    return data
+
+
+def invalidate_court_fragments(court_ids, fragments=FRAGMENTS):
+    """Drop the cached sections of these courts, e.g. after a bulk write skipped the signals"""
+    bump(*(_version_name(court_id, fragment) for court_id in set(court_ids) if court_id for fragment in fragments))
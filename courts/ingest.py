@@ -0,0 +1,531 @@
+"""
+Court docket ingestion.
+
+Courts drop docket exports (CSV, XML or JSON) into a watched directory.
+Each file is read as a stream of records, one court case per record with
+any hearings and orders attached, and loaded in batches: court cases are
+upserted on case_number, hearings and orders are matched to existing rows
+on (court case, type, date) and updated or inserted. Optional fields a
+record leaves out or blank keep the values on file. Every batch is one
+transaction that also refreshes the hearing rollups for its days and
+advances the file's IngestCheckpoint, so a restarted ingest skips exactly
+the records already loaded. A file that is itself malformed is loaded up
+to the bad spot and then filed under failed/.
+
+CSV files have one row per record with a record_type column of CASE,
+HEARING or ORDER; hearing and order rows name their case by case_number.
+XML files hold <case> elements whose children are the fields, with
+<hearing> and <order> elements nested (optionally inside <hearings> and
+<orders>). JSON files are an array or JSON Lines of case objects with
+"hearings" and "orders" lists.
+"""
+import csv
+import hashlib
+import logging
+import shutil
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from cases.models import Case
+from clients.importers import iter_csv, iter_json
+from judges.models import Judge
+from .models import Court, CourtCase, CourtOrder, Hearing, IngestCheckpoint
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+SETTLE_SECONDS = 5  # Leave files alone until they stop changing
+MAX_REPORTED_ERRORS = 1000
+
+CASE_UPDATE_FIELDS = ['case', 'court', 'judge', 'filing_date', 'next_hearing_date', 'status', 'notes']
+HEARING_UPDATE_FIELDS = ['judge', 'location', 'notes', 'outcome', 'is_completed']
+ORDER_UPDATE_FIELDS = ['judge', 'effective_date', 'order_text', 'is_active']
+
+CASE_STATUSES = {value for value, _ in CourtCase.CASE_STATUS}
+HEARING_TYPES = {value for value, _ in Hearing.HEARING_TYPES}
+ORDER_TYPES = {value for value, _ in CourtOrder.ORDER_TYPES}
+
+
+class RecordError(ValueError):
+    pass
+
+
+class UnreadableFile(Exception):
+    """The file itself is malformed, so no further records can be read from it"""
+
+
+@dataclass
+class IngestResult:
+    file_name: str
+    records: int = 0
+    skipped: int = 0
+    cases: int = 0
+    hearings: int = 0
+    orders: int = 0
+    errors: list = field(default_factory=list)
+    error_count: int = 0
+    status: str = 'DONE'
+
+    def add_error(self, record_number, case_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((record_number, case_number, message))
+
+
+# Readers: each yields one case dict per record
+
+def _read_csv(fp):
+    for _, row in iter_csv(fp):
+        record_type = (row.pop('record_type', None) or 'CASE').strip().upper()
+        if record_type == 'HEARING':
+            yield {'case_number': row.get('case_number'), 'hearings': [row]}
+        elif record_type == 'ORDER':
+            yield {'case_number': row.get('case_number'), 'orders': [row]}
+        else:
+            yield row
+
+
+def _element_dict(element):
+    record = dict(element.attrib)
+    for child in element:
+        if child.tag in ('hearings', 'orders'):
+            record.setdefault(child.tag, []).extend(_element_dict(item) for item in child)
+        elif child.tag in ('hearing', 'order'):
+            record.setdefault(f'{child.tag}s', []).append(_element_dict(child))
+        else:
+            record[child.tag] = (child.text or '').strip()
+    return record
+
+
+def _read_xml(fp):
+    depth, root = 0, None
+    for event, element in ET.iterparse(fp, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            if element.tag == 'case':
+                yield _element_dict(element)
+            # Detach every finished record from the root so memory stays flat on large files
+            root.clear()
+
+
+def _read_json(fp):
+    for _, obj in iter_json(fp):
+        if isinstance(obj, dict) and isinstance(obj.get('cases'), list):
+            yield from obj['cases']
+        else:
+            yield obj
+
+
+def _records(reader, fp):
+    """The reader's records, with its parse errors raised as UnreadableFile"""
+    records = reader(fp)
+    while True:
+        try:
+            record = next(records)
+        except StopIteration:
+            return
+        except (ET.ParseError, csv.Error, ValueError, UnicodeDecodeError) as exc:
+            raise UnreadableFile(str(exc)) from exc
+        yield record
+
+
+READERS = {
+    '.csv': ('r', _read_csv),
+    '.xml': ('rb', _read_xml),
+    '.json': ('r', _read_json),
+    '.jsonl': ('r', _read_json),
+}
+
+
+# Field parsing
+
+def _text(row, key, required=False, max_length=None):
+    value = row.get(key)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RecordError(f'{key} is required')
+    if max_length and len(value) > max_length:
+        raise RecordError(f'{key} is longer than {max_length} characters')
+    return value
+
+
+def _choice(row, key, choices, default=None):
+    value = _text(row, key, required=default is None).upper() or default
+    if value not in choices:
+        raise RecordError(f'{key} must be one of {", ".join(sorted(choices))}, got "{value}"')
+    return value
+
+
+def _date(row, key, required=False):
+    value = _text(row, key, required=required)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        raise RecordError(f'{key} must be a YYYY-MM-DD date, got "{value}"')
+
+
+def _datetime(row, key):
+    value = _text(row, key, required=True)
+    try:
+        parsed = parse_datetime(value) or datetime.combine(date.fromisoformat(value), datetime.min.time())
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise RecordError(f'{key} must be an ISO 8601 date and time, got "{value}"')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _supplied(row, fields, always=()):
+    """The update fields row gives a value for, so a record leaves the fields it omits as they are"""
+    return [name for name in fields if name in always or row.get(name) not in (None, '')]
+
+
+def _bool(row, key, default):
+    value = row.get(key)
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+class Lookups:
+    """Courts and judges loaded once per pass and resolved from memory"""
+
+    def __init__(self):
+        self.courts = {}
+        for court_id, name in Court.objects.values_list('id', 'name'):
+            self.courts[str(court_id)] = court_id
+            self.courts[name.strip().lower()] = court_id
+        self.judges = dict(Judge.objects.values_list('judge_id', 'id'))
+
+    def court(self, value):
+        key = str(value or '').strip().lower()
+        if not key:
+            raise RecordError('court is required')
+        try:
+            return self.courts[key]
+        except KeyError:
+            raise RecordError(f'unknown court "{value}"')
+
+    def judge(self, value, required=True):
+        key = str(value or '').strip()
+        if not key:
+            if required:
+                raise RecordError('judge is required')
+            return None
+        try:
+            return self.judges[key]
+        except KeyError:
+            raise RecordError(f'unknown judge "{value}"')
+
+
+class DocketIngester:
+    def __init__(self, lookups=None, batch_size=BATCH_SIZE):
+        self.lookups = lookups or Lookups()
+        self.batch_size = batch_size
+
+    def parse(self, record):
+        """Validate one record into plain values; nothing touches the database"""
+        if not isinstance(record, dict):
+            raise RecordError('record is not an object')
+        case_number = _text(record, 'case_number', required=True, max_length=50)
+        judge_id = self.lookups.judge(record.get('judge'), required=False)
+        parsed = {'case_number': case_number, 'case': None, 'hearings': [], 'orders': []}
+
+        # Records that only carry hearings or orders refer to a court case already on file
+        if record.get('court') or record.get('filing_date'):
+            parsed['case'] = {
+                'court_id': self.lookups.court(record.get('court')),
+                'judge_id': judge_id,
+                'filing_date': _date(record, 'filing_date', required=True),
+                'next_hearing_date': _date(record, 'next_hearing_date'),
+                'status': _choice(record, 'status', CASE_STATUSES, default='PENDING'),
+                'notes': _text(record, 'notes'),
+                'rehabilitation_case_number': _text(record, 'rehabilitation_case_number'),
+                'update_fields': _supplied(record, CASE_UPDATE_FIELDS, always=('case', 'court', 'filing_date')),
+            }
+
+        for hearing in record.get('hearings') or []:
+            parsed['hearings'].append({
+                'hearing_type': _choice(hearing, 'hearing_type', HEARING_TYPES),
+                'hearing_date': _datetime(hearing, 'hearing_date'),
+                'judge_id': self.lookups.judge(hearing.get('judge')),
+                'location': _text(hearing, 'location', required=True, max_length=200),
+                'notes': _text(hearing, 'notes'),
+                'outcome': _text(hearing, 'outcome'),
+                'is_completed': _bool(hearing, 'is_completed', False),
+                'update_fields': _supplied(hearing, HEARING_UPDATE_FIELDS, always=('judge', 'location')),
+            })
+        for order in record.get('orders') or []:
+            parsed['orders'].append({
+                'order_type': _choice(order, 'order_type', ORDER_TYPES),
+                'order_date': _date(order, 'order_date', required=True),
+                'effective_date': _date(order, 'effective_date') or _date(order, 'order_date'),
+                'judge_id': self.lookups.judge(order.get('judge')),
+                'order_text': _text(order, 'order_text', required=True),
+                'is_active': _bool(order, 'is_active', True),
+                'update_fields': _supplied(order, ORDER_UPDATE_FIELDS, always=('judge', 'order_text')),
+            })
+        return parsed
+
+    def ingest(self, path, checkpoint):
+        """Load one file from its checkpoint onwards; returns an IngestResult"""
+        mode, reader = READERS[path.suffix.lower()]
+        result = IngestResult(file_name=path.name, skipped=checkpoint.records_done)
+        batch = []
+        number = 0
+        try:
+            with open(path, mode, **({'encoding': 'utf-8-sig', 'newline': ''} if mode == 'r' else {})) as fp:
+                for number, record in enumerate(_records(reader, fp), start=1):
+                    if number <= checkpoint.records_done:
+                        continue
+                    result.records += 1
+                    try:
+                        batch.append((number, self.parse(record)))
+                    except RecordError as exc:
+                        case_number = record.get('case_number') if isinstance(record, dict) else ''
+                        result.add_error(number, str(case_number or ''), str(exc))
+                    if number - checkpoint.records_done >= self.batch_size:
+                        self.flush(batch, number, checkpoint, result)
+                        batch = []
+        except UnreadableFile as exc:
+            # Commit what was read before the file went bad, then give up on it
+            self.flush(batch, number, checkpoint, result)
+            result.status = 'FAILED'
+            self.finish(checkpoint, result, f'could not parse record {number + 1}: {exc}')
+            return result
+        self.flush(batch, number, checkpoint, result)
+        self.finish(checkpoint, result)
+        return result
+
+    def flush(self, batch, records_done, checkpoint, result):
+        """Write a batch and move the checkpoint past it in the same transaction"""
+        try:
+            with transaction.atomic():
+                self.write(batch, result)
+                self.advance(checkpoint, records_done, result)
+        except DatabaseError:
+            if len(batch) <= 1:
+                for number, parsed in batch:
+                    result.add_error(number, parsed['case_number'], 'rejected by the database')
+                with transaction.atomic():
+                    self.advance(checkpoint, records_done, result)
+                return
+            # Retry one record at a time to find the offending ones
+            for index, (number, parsed) in enumerate(batch):
+                last = records_done if index == len(batch) - 1 else number
+                self.flush([(number, parsed)], last, checkpoint, result)
+
+    def advance(self, checkpoint, records_done, result):
+        checkpoint.records_done = max(checkpoint.records_done, records_done)
+        checkpoint.error_count = result.error_count
+        checkpoint.save(update_fields=['records_done', 'error_count', 'updated_at'])
+
+    def finish(self, checkpoint, result, error=''):
+        checkpoint.status = result.status
+        checkpoint.last_error = error
+        checkpoint.completed_at = timezone.now()
+        checkpoint.save(update_fields=['status', 'last_error', 'completed_at', 'updated_at'])
+        if error:
+            result.add_error(None, '', error)
+
+    def write(self, batch, result):
+        if not batch:
+            return
+        # Later records in a batch win, as they would across batches
+        upserts = {}
+        for number, parsed in batch:
+            if parsed['case'] is not None:
+                upserts[parsed['case_number']] = (number, parsed['case'])
+
+        # A court case keeps its rehabilitation case; a new one is linked to the
+        # case with the same number unless the record names another
+        linked = dict(CourtCase.objects.filter(case_number__in=upserts).values_list('case_number', 'case_id'))
+        wanted = {
+            case_number: case['rehabilitation_case_number'] or case_number
+            for case_number, (_, case) in upserts.items()
+            if case['rehabilitation_case_number'] or case_number not in linked
+        }
+        rehabilitation_cases = dict(Case.objects.filter(
+            case_number__in=set(wanted.values())
+        ).values_list('case_number', 'id'))
+        court_cases = {}
+        for case_number, (number, case) in upserts.items():
+            if case_number in wanted:
+                case_id = rehabilitation_cases.get(wanted[case_number])
+            else:
+                case_id = linked[case_number]
+            if case_id is None:
+                result.add_error(number, case_number,
+                                 f'no rehabilitation case with case number "{wanted[case_number]}"')
+                continue
+            court_cases.setdefault(tuple(case['update_fields']), []).append(CourtCase(
+                case_number=case_number,
+                case_id=case_id,
+                **{
+                    key: value for key, value in case.items()
+                    if key not in ('rehabilitation_case_number', 'update_fields')
+                },
+            ))
+        # One upsert per set of fields supplied, so omitted fields keep what is on file
+        for update_fields, objs in court_cases.items():
+            CourtCase.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=['case_number'],
+                update_fields=list(update_fields),
+            )
+            result.cases += len(objs)
+
+        court_case_ids = dict(CourtCase.objects.filter(
+            case_number__in={parsed['case_number'] for _, parsed in batch}
+        ).values_list('case_number', 'id'))
+
+        hearings, orders = [], []
+        for number, parsed in batch:
+            court_case_id = court_case_ids.get(parsed['case_number'])
+            if court_case_id is None:
+                if parsed['hearings'] or parsed['orders']:
+                    result.add_error(number, parsed['case_number'], 'no court case with this case number')
+                continue
+            hearings.extend(dict(hearing, court_case_id=court_case_id) for hearing in parsed['hearings'])
+            orders.extend(dict(order, court_case_id=court_case_id) for order in parsed['orders'])
+
+        result.hearings += self._merge(Hearing, hearings, ('court_case_id', 'hearing_type', 'hearing_date'),
+                                       HEARING_UPDATE_FIELDS)
+        result.orders += self._merge(CourtOrder, orders, ('court_case_id', 'order_type', 'order_date'),
+                                     ORDER_UPDATE_FIELDS)
+        if hearings or orders:
+            from search.index import enqueue
+            touched = set(court_case_ids.values())
+            # bulk writes skip the signals that queue records for search
+            enqueue(Hearing, Hearing.objects.filter(court_case_id__in=touched).values_list('pk', flat=True))
+            enqueue(CourtOrder, CourtOrder.objects.filter(court_case_id__in=touched).values_list('pk', flat=True))
+        if court_case_ids:
+            from core.cache_versions import mark_changed
+            from .fragments import invalidate_court_fragments
+            # nor do they version API payloads
+            mark_changed(CourtCase, Hearing, CourtOrder)
+            invalidate_court_fragments(
+                CourtCase.objects.filter(pk__in=court_case_ids.values()).values_list('court_id', flat=True).distinct()
+            )
+        if hearings:
+            from reporting.rollups import refresh_hearing_rollups
+            # nor keep the rollups; rebuilding the batch's days in its transaction
+            # keeps them right however the ingest stops
+            days = {timezone.localtime(hearing['hearing_date']).date() for hearing in hearings}
+            refresh_hearing_rollups(min(days), max(days))
+
+    def _merge(self, model, rows, key_fields, update_fields):
+        """
+        Update rows that match an existing one on key_fields and insert the
+        rest. A row's own update_fields, when it has them, narrow what is
+        updated to the fields its record supplied.
+        """
+        if not rows:
+            return 0
+        rows = list({tuple(row[name] for name in key_fields): row for row in rows}.values())
+        existing = {
+            tuple(values[1:]): values[0]
+            for values in model.objects.filter(
+                court_case_id__in={row['court_case_id'] for row in rows}
+            ).values_list('pk', *key_fields)
+        }
+        to_update, to_create = {}, []
+        # bulk_update() leaves auto_now fields alone; stamp them so changes show as changes
+        auto_now = [field.name for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)]
+        now = timezone.now()
+        for row in rows:
+            fields = tuple(row.pop('update_fields', update_fields))
+            pk = existing.get(tuple(row[name] for name in key_fields))
+            if pk is None:
+                to_create.append(model(**row))
+                continue
+            obj = model(pk=pk, **row)
+            for name in auto_now:
+                setattr(obj, name, now)
+            to_update.setdefault(fields, []).append(obj)
+        model.objects.bulk_create(to_create)
+        for fields, objs in to_update.items():
+            model.objects.bulk_update(objs, [*fields, *auto_now])
+        return len(rows)
+
+
+def fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_ingest_dir():
+    return Path(getattr(settings, 'COURT_INGEST_DIR', settings.BASE_DIR / 'ingest' / 'dockets'))
+
+
+def pending_files(directory, now=None):
+    """Docket files in the directory that have stopped changing, oldest first"""
+    now = (now or timezone.now()).timestamp()
+    files = [
+        path for path in directory.iterdir()
+        if path.is_file() and path.suffix.lower() in READERS and now - path.stat().st_mtime >= SETTLE_SECONDS
+    ]
+    return sorted(files, key=lambda path: path.stat().st_mtime)
+
+
+def ingest_directory(directory=None, batch_size=BATCH_SIZE):
+    """
+    Ingest every settled file in the directory, resuming any that were cut
+    short. Finished files move to processed/ and unreadable ones to failed/.
+    Returns a list of IngestResult.
+    """
+    directory = Path(directory or get_ingest_dir())
+    results = []
+    ingester = None
+    for path in pending_files(directory):
+        checkpoint, _ = IngestCheckpoint.objects.get_or_create(
+            fingerprint=fingerprint(path),
+            defaults={'file_name': path.name},
+        )
+        if checkpoint.status == 'RUNNING':
+            if ingester is None:
+                ingester = DocketIngester(batch_size=batch_size)
+            if checkpoint.records_done:
+                logger.info('Resuming %s after record %s', path.name, checkpoint.records_done)
+            results.append(ingester.ingest(path, checkpoint))
+        # Files already ingested under another name are just filed away
+        target = directory / ('failed' if checkpoint.status == 'FAILED' else 'processed')
+        target.mkdir(exist_ok=True)
+        shutil.move(str(path), str(_destination(target, path.name, checkpoint.fingerprint)))
+    return results
+
+
+def _destination(directory, name, fingerprint):
+    """Where to file name in directory without replacing an earlier file of the same name"""
+    destination = directory / name
+    if not destination.exists():
+        return destination
+    stem, suffix = Path(name).stem, Path(name).suffix
+    destination = directory / f'{stem}.{fingerprint[:12]}{suffix}'
+    count = 1
+    while destination.exists():
+        count += 1
+        destination = directory / f'{stem}.{fingerprint[:12]}-{count}{suffix}'
+    return destination
@@ -0,0 +1,39 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courts.ingest import BATCH_SIZE, get_ingest_dir, ingest_directory
+
+
+class Command(BaseCommand):
+    help = 'Load court cases, hearings and orders from docket exports dropped into the ingest directory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Directory to watch (default: COURT_INGEST_DIR)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep watching the directory instead of exiting after one pass')
+        parser.add_argument('--interval', type=int, default=30,
+                            help='Seconds between passes when running with --loop')
+
+    def handle(self, *args, **options):
+        directory = Path(options['dir']) if options['dir'] else get_ingest_dir()
+        if not directory.is_dir():
+            raise CommandError(f'{directory} is not a directory')
+
+        while True:
+            for result in ingest_directory(directory, batch_size=options['batch_size']):
+                for number, case_number, message in result.errors:
+                    where = f'record {number}' if number else 'file'
+                    self.stdout.write(self.style.WARNING(f'  {result.file_name} {where} {case_number}: {message}'))
+                summary = (
+                    f'{result.file_name}: {result.records} records '
+                    f'({result.skipped} already loaded), {result.cases} court cases, '
+                    f'{result.hearings} hearings, {result.orders} orders, {result.error_count} errors'
+                )
+                style = self.style.ERROR if result.status == 'FAILED' else self.style.SUCCESS
+                self.stdout.write(style(summary))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
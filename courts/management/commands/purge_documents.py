@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from courts.documents import PURGE_GRACE, purge
+
+
+class Command(BaseCommand):
+    help = 'Delete stored court order documents that no order references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=int, default=int(PURGE_GRACE.total_seconds() // 60),
+                            help='Keep unreferenced documents at least this long after their last use')
+
+    def handle(self, *args, **options):
+        purged = purge(grace=timedelta(minutes=options['grace_minutes']))
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} unreferenced documents'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courts', '0002_initial'),
+        ('judges', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hearing',
+            index=models.Index(fields=['is_completed', 'hearing_date'], name='hearings_is_comp_24fb7d_idx'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:41
+
+import courts.models
+import django.db.models.deletion
+import django.utils.timezone
+import hashlib
+import mimetypes
+import os
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def move_order_files_to_documents(apps, schema_editor):
+    """Copy existing order files into the content-addressed store; the originals are left in place"""
+    CourtOrder = apps.get_model('courts', 'CourtOrder')
+    Document = apps.get_model('courts', 'Document')
+    
+    for order in CourtOrder.objects.exclude(file='').exclude(file__isnull=True).iterator():
+        name = order.file.name
+        if not default_storage.exists(name):
+            continue
+        digest = hashlib.sha256()
+        size = 0
+        with default_storage.open(name, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(64 * 1024), b''):
+                digest.update(chunk)
+                size += len(chunk)
+        sha256 = digest.hexdigest()
+        
+        document = Document.objects.filter(sha256=sha256).first()
+        if document is None:
+            document = Document(
+                sha256=sha256,
+                size=size,
+                original_name=os.path.basename(name)[:255],
+                content_type=mimetypes.guess_type(name)[0] or 'application/octet-stream',
+            )
+            with default_storage.open(name, 'rb') as fp:
+                document.file.save(sha256, File(fp), save=False)
+            document.save()
+        CourtOrder.objects.filter(pk=order.pk).update(document=document)
+        Document.objects.filter(pk=document.pk).update(ref_count=models.F('ref_count') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courts', '0004_ingestcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Document',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('file', models.FileField(max_length=255, upload_to=courts.models.document_upload_to)),
+                ('size', models.BigIntegerField()),
+                ('content_type', models.CharField(default='application/octet-stream', max_length=100)),
+                ('original_name', models.CharField(blank=True, max_length=255)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('touched_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'documents',
+                'indexes': [models.Index(fields=['ref_count', 'touched_at'], name='documents_ref_cou_e402ed_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='courtorder',
+            name='document',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='court_orders', to='courts.document'),
+        ),
+        migrations.RunPython(move_order_files_to_documents, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='courtorder',
+            name='file',
+        ),
+    ]
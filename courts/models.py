@@ -67,14 +67,50 @@ class Hearing(models.Model):
     notes = models.TextField(blank=True)
     outcome = models.TextField(blank=True)
     is_completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)  # Lets reminders catch hearings moved into a scanned window
     
     class Meta:
         db_table = 'hearings'
         ordering = ['hearing_date']
+        indexes = [
+            models.Index(fields=['is_completed', 'hearing_date']),
+        ]
     
     def __str__(self):
         return f"{self.get_hearing_type_display()} - {self.hearing_date.strftime('%Y-%m-%d')}"
 
+def document_upload_to(instance, filename):
+    """Content-addressed path, e.g. documents/ab/cd/abcd...; identical files share one path"""
+    sha = instance.sha256
+    return f'documents/{sha[:2]}/{sha[2:4]}/{sha}'
+
+class Document(models.Model):
+    """A stored file, kept once per distinct content and shared by every order that attaches it"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to=document_upload_to, max_length=255)
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=100, default='application/octet-stream')
+    original_name = models.CharField(max_length=255, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    touched_at = models.DateTimeField(default=timezone.now)  # Last store or reference change, for purging
+    
+    class Meta:
+        db_table = 'documents'
+        indexes = [
+            models.Index(fields=['ref_count', 'touched_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.original_name or self.sha256[:12]} ({self.ref_count} references)"
+    
+    @classmethod
+    def adjust_references(cls, document_id, delta):
+        cls.objects.filter(pk=document_id).update(
+            ref_count=models.F('ref_count') + delta,
+            touched_at=timezone.now(),
+        )
+
 class CourtOrder(models.Model):
     ORDER_TYPES = [
         ('SENTENCE', 'Sentence'),
@@ -91,11 +127,120 @@ class CourtOrder(models.Model):
     effective_date = models.DateField()
     judge = models.ForeignKey('judges.Judge', on_delete=models.CASCADE)
     order_text = models.TextField()
-    file = models.FileField(upload_to='court_orders/', null=True, blank=True)
+    document = models.ForeignKey(Document, on_delete=models.PROTECT, null=True, blank=True, related_name='court_orders')
     is_active = models.BooleanField(default=True)
     
     class Meta:
         db_table = 'court_orders'
     
     def __str__(self):
-        return f"{self.get_order_type_display()} - {self.order_date}"
\ No newline at end of file
+        return f"{self.get_order_type_display()} - {self.order_date}"
+
+class IngestCheckpoint(models.Model):
+    """Progress through one docket export file, so a restarted ingest resumes where it stopped"""
+    STATUS_CHOICES = [
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    fingerprint = models.CharField(max_length=64, unique=True)  # sha256 of the file contents
+    file_name = models.CharField(max_length=255)
+    records_done = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='RUNNING')
+    last_error = models.TextField(blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'court_ingest_checkpoints'
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"{self.file_name} ({self.get_status_display()}, {self.records_done} records)"
+
+
+# Signals to keep document reference counts in step with the orders using them
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+_DEFERRED = object()
+
+@receiver(post_init, sender=CourtOrder)
+def remember_document(sender, instance, **kwargs):
+    instance._stored_document_id = instance.__dict__.get('document_id', _DEFERRED)
+
+@receiver(pre_save, sender=CourtOrder)
+@receiver(pre_delete, sender=CourtOrder)
+def resolve_deferred_document(sender, instance, **kwargs):
+    # Orders loaded with .only()/.defer() don't know which document they held
+    if instance._stored_document_id is _DEFERRED:
+        instance._stored_document_id = (
+            CourtOrder.objects.filter(pk=instance.pk).values_list('document_id', flat=True).first()
+            if instance.pk else None
+        )
+
+@receiver(post_save, sender=CourtOrder)
+def count_document_reference(sender, instance, created, **kwargs):
+    old_id = None if created else instance._stored_document_id
+    if old_id != instance.document_id:
+        if instance.document_id:
+            Document.adjust_references(instance.document_id, 1)
+        if old_id:
+            Document.adjust_references(old_id, -1)
+    instance._stored_document_id = instance.document_id
+
+@receiver(post_delete, sender=CourtOrder)
+def release_document_reference(sender, instance, **kwargs):
+    document_id = instance.__dict__.get('document_id', instance._stored_document_id)
+    if document_id:
+        Document.adjust_references(document_id, -1)
+
+
+# Signals to drop the cached sections of the court detail page a change affects
+@receiver(post_init, sender=CourtCase)
+def remember_court(sender, instance, **kwargs):
+    instance._loaded_court_id = instance.__dict__.get('court_id')
+
+@receiver(post_save, sender=CourtCase)
+def invalidate_court_case_fragments(sender, instance, **kwargs):
+    from .fragments import invalidate_court_fragments
+    # A case moved to another court leaves the old court's sections stale too
+    invalidate_court_fragments([instance.court_id, instance._loaded_court_id], ['stats', 'cases'])
+    instance._loaded_court_id = instance.court_id
+
+@receiver(post_delete, sender=CourtCase)
+def invalidate_deleted_court_case_fragments(sender, instance, **kwargs):
+    from .fragments import invalidate_court_fragments
+    # Its hearings and orders went with it
+    invalidate_court_fragments([instance.court_id])
+
+@receiver(post_save, sender=Hearing)
+@receiver(post_delete, sender=Hearing)
+def invalidate_hearing_fragments(sender, instance, **kwargs):
+    from .fragments import invalidate_court_fragments
+    court_ids = CourtCase.objects.filter(pk=instance.court_case_id).values_list('court_id', flat=True)
+    invalidate_court_fragments(court_ids, ['stats', 'hearings'])
+
+@receiver(post_save, sender=CourtOrder)
+@receiver(post_delete, sender=CourtOrder)
+def invalidate_order_fragments(sender, instance, **kwargs):
+    from .fragments import invalidate_court_fragments
+    court_ids = CourtCase.objects.filter(pk=instance.court_case_id).values_list('court_id', flat=True)
+    invalidate_court_fragments(court_ids, ['stats', 'orders'])
+
+
+# Who may see which court records (see core/scoping.py): officers those of their cases,
+# judges those they are assigned to or whose case they preside over
+from django.db.models import Q
+from core import scoping
+
+scoping.register(
+    CourtCase,
+    officer='case',
+    judge=(lambda user: Q(judge__user=user), 'case'),
+)
+scoping.register(Hearing, officer='court_case', judge=(lambda user: Q(judge__user=user), 'court_case'))
+scoping.register(CourtOrder, officer='court_case', judge=(lambda user: Q(judge__user=user), 'court_case'))
@@ -1,3 +1,177 @@
-from django.test import TestCase
+import os
+import time
+from datetime import date
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from cases.models import Case
+from clients.tests import make_client
+from core.scoping import visible
+from judges.models import Judge
+from reporting.models import HearingDailyRollup
+from users.models import User
+from .documents import store
+from .ingest import DocketIngester, ingest_directory
+from .models import Court, CourtCase, CourtOrder, Hearing, IngestCheckpoint
+
+
+class CourtCaseVisibilityTests(TestCase):
+    """
+    Officers see the court cases of their cases; judges those they are
+    assigned to or whose case they preside over; admins all.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin')
+        cls.officer = User.objects.create_user('officer', user_type='officer')
+        cls.other_officer = User.objects.create_user('other-officer', user_type='officer')
+        cls.judge = User.objects.create_user('judge', user_type='judge')
+        cls.other_judge = User.objects.create_user('other-judge', user_type='judge')
+        court = Court.objects.create(name='Court', court_type='DISTRICT', address='-')
+        judge_profile = Judge.objects.create(user=cls.judge, judge_id='J-1', court=court,
+                                             appointment_date=date(2020, 1, 1))
+
+        client = make_client('C-1', cls.officer, cls.admin)
+        own = Case.objects.create(client=client, officer=cls.officer, presiding_judge=cls.judge,
+                                  case_number='K-1', objectives='-')
+        assigned = Case.objects.create(client=client, officer=cls.other_officer, presiding_judge=cls.other_judge,
+                                       case_number='K-2', objectives='-')
+        others = Case.objects.create(client=client, officer=cls.other_officer, presiding_judge=cls.other_judge,
+                                     case_number='K-3', objectives='-')
+
+        def court_case(case, judge=None):
+            return CourtCase.objects.create(case=case, court=court, judge=judge, case_number=case.case_number,
+                                            filing_date=date(2025, 1, 1))
+
+        cls.own = court_case(own)
+        # Heard by the judge although another judge presides over the case
+        cls.assigned = court_case(assigned, judge=judge_profile)
+        cls.others = court_case(others)
+
+    def test_officer_sees_court_cases_of_own_cases(self):
+        self.assertEqual(set(visible(CourtCase, self.officer)), {self.own})
+        self.assertEqual(set(visible(CourtCase, self.other_officer)), {self.assigned, self.others})
+
+    def test_judge_sees_assigned_and_presided_court_cases(self):
+        self.assertEqual(set(visible(CourtCase, self.judge)), {self.own, self.assigned})
+        self.assertEqual(set(visible(CourtCase, self.other_judge)), {self.assigned, self.others})
+
+    def test_admin_sees_every_court_case(self):
+        self.assertEqual(set(visible(CourtCase, self.admin)), {self.own, self.assigned, self.others})
+
+    def test_order_documents_are_served_only_to_those_who_see_the_order(self):
+        media = TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        with override_settings(MEDIA_ROOT=media.name):
+            document = store(ContentFile(b'%PDF-1.4 order', name='order.pdf'))
+            order = CourtOrder.objects.create(court_case=self.own, order_type='PROBATION',
+                                              order_date=date(2025, 1, 1), effective_date=date(2025, 1, 1),
+                                              judge=Judge.objects.get(), order_text='-', document=document)
+            url = f'/courts/orders/{order.pk}/document/'
+            for user, status in ((self.officer, 200), (self.judge, 200), (self.admin, 200),
+                                 (self.other_officer, 404), (self.other_judge, 404)):
+                with self.subTest(user=user.username):
+                    self.client.force_login(user)
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, status)
+                    if status == 200:
+                        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 order')
+
+
+DOCKET = """record_type,case_number,court,filing_date,hearing_type,hearing_date,judge,location
+CASE,K-1,Court,2025-01-02,,,,
+HEARING,K-1,,,REVIEW,2025-03-03T10:00:00,J-1,Room 1
+CASE,K-2,Court,2025-01-03,,,,
+HEARING,K-2,,,REVIEW,2025-03-04T10:00:00,J-1,Room 2
+"""
+
+
+class DocketIngestTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user('admin', user_type='admin')
+        officer = User.objects.create_user('officer', user_type='officer')
+        court = Court.objects.create(name='Court', court_type='DISTRICT', address='-')
+        Judge.objects.create(user=User.objects.create_user('judge', user_type='judge'), judge_id='J-1',
+                             court=court, appointment_date=date(2020, 1, 1))
+        client = make_client('C-1', officer, admin)
+        for case_number in ('K-1', 'K-2'):
+            Case.objects.create(client=client, officer=officer, case_number=case_number, objectives='-')
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def drop(self, name, content=DOCKET):
+        path = self.directory / name
+        path.write_text(content)
+        settled = time.time() - 60
+        os.utime(path, (settled, settled))
+        return path
+
+    def test_resumes_after_a_crash_without_repeating_records(self):
+        self.drop('docket.csv')
+        write = DocketIngester.write
+        calls = []
+
+        def crash_on_second_batch(ingester, batch, result):
+            calls.append(batch)
+            if len(calls) == 2:
+                raise RuntimeError('worker killed')
+            write(ingester, batch, result)
+
+        with mock.patch.object(DocketIngester, 'write', crash_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                ingest_directory(self.directory, batch_size=2)
+        checkpoint = IngestCheckpoint.objects.get()
+        self.assertEqual((checkpoint.status, checkpoint.records_done), ('RUNNING', 2))
+        # The committed batch's hearing already counts in the reports
+        self.assertEqual(list(HearingDailyRollup.objects.values_list('day', 'count')), [(date(2025, 3, 3), 1)])
+
+        [result] = ingest_directory(self.directory, batch_size=2)
+        self.assertEqual((result.skipped, result.records, result.error_count), (2, 2, 0))
+        self.assertEqual(Hearing.objects.count(), 2)
+        self.assertEqual(sorted(HearingDailyRollup.objects.values_list('count', flat=True)), [1, 1])
+        self.assertEqual(IngestCheckpoint.objects.get().status, 'DONE')
+
+    def test_a_file_seen_before_is_filed_away_without_loading_it_again(self):
+        self.drop('docket.csv')
+        ingest_directory(self.directory)
+        self.drop('copy.csv')
+        self.assertEqual(ingest_directory(self.directory), [])
+        self.assertEqual(Hearing.objects.count(), 2)
+        self.assertEqual(IngestCheckpoint.objects.count(), 1)
+        self.assertEqual(sorted(path.name for path in (self.directory / 'processed').iterdir()),
+                         ['copy.csv', 'docket.csv'])
+
+    def test_a_new_file_with_an_old_name_keeps_both(self):
+        self.drop('docket.csv')
+        ingest_directory(self.directory)
+        self.drop('docket.csv', DOCKET.replace('Room 1', 'Room 3'))
+        ingest_directory(self.directory)
+        self.assertEqual(Hearing.objects.get(court_case__case_number='K-1').location, 'Room 3')
+        names = sorted(path.name for path in (self.directory / 'processed').iterdir())
+        self.assertEqual(len(names), 2)
+        self.assertEqual({(self.directory / 'processed' / name).read_text() for name in names},
+                         {DOCKET, DOCKET.replace('Room 1', 'Room 3')})
+
+    def test_malformed_file_keeps_what_was_read_and_fails(self):
+        self.drop('docket.json', '[{"case_number": "K-1", "court": "Court", "filing_date": "2025-01-02"}, {"case')
+        [result] = ingest_directory(self.directory)
+        self.assertEqual(result.status, 'FAILED')
+        self.assertTrue(CourtCase.objects.filter(case_number='K-1').exists())
+        self.assertTrue((self.directory / 'failed' / 'docket.json').exists())
+
+    def test_programming_errors_are_not_taken_for_bad_files(self):
+        self.drop('docket.csv')
+        with mock.patch.object(DocketIngester, 'parse', side_effect=ValueError('bug')):
+            with self.assertRaises(ValueError):
+                ingest_directory(self.directory)
+        self.assertEqual(IngestCheckpoint.objects.get().status, 'RUNNING')
@@ -9,6 +9,7 @@ urlpatterns = [
     path('courts/', views.court_list, name='court_list'),
     path('courts/create/', views.court_create, name='court_create'),
     path('courts/<int:pk>/', views.court_detail, name='court_detail'),
+    path('courts/<int:pk>/sections/<str:fragment>/', views.court_detail_fragment, name='court_detail_fragment'),
     path('courts/<int:pk>/edit/', views.court_edit, name='court_edit'),
     path('courts/<int:pk>/delete/', views.court_delete, name='court_delete'),
     
@@ -30,6 +31,7 @@ urlpatterns = [
     path('orders/create/', views.court_order_create, name='court_order_create'),
     path('orders/<int:pk>/', views.court_order_detail, name='court_order_detail'),
     path('orders/<int:pk>/edit/', views.court_order_edit, name='court_order_edit'),
+    path('orders/<int:pk>/document/', views.court_order_document, name='court_order_document'),
     
     # Calendar and overview
     path('calendar/', views.court_calendar_overview, name='court_calendar_overview'),
@@ -2,7 +2,7 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q, Count
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 from django.contrib import messages
 from django.core.paginator import Paginator
 from datetime import timedelta, datetime
@@ -10,8 +10,11 @@ import json
 
 from .models import Court, CourtCase, Hearing, CourtOrder
 from .forms import CourtForm, CourtCaseForm, HearingForm, CourtOrderForm
+from .documents import serve
+from .fragments import FRAGMENTS, fragment_data
 from judges.models import Judge
 from cases.models import Case
+from core.scoping import visible
 
 @login_required
 def court_dashboard(request):
@@ -98,37 +101,36 @@ def court_create(request):
 
 @login_required
 def court_detail(request, pk):
-    """Detailed view of a court"""
+    """Detailed view of a court; its sections load separately from court_detail_fragment"""
     court = get_object_or_404(Court, pk=pk)
     
-    # Get assigned judges
-    assigned_judges = Judge.objects.filter(court=court, is_active=True)
-    
-    # Get court cases
-    court_cases = CourtCase.objects.filter(court=court)
-    
-    # Get upcoming hearings
-    upcoming_hearings = Hearing.objects.filter(
-        court_case__court=court,
-        hearing_date__gte=timezone.now()
-    ).order_by('hearing_date')[:10]
-    
-    # Statistics
-    active_cases = court_cases.filter(status='ACTIVE').count()
-    pending_cases = court_cases.filter(status='PENDING').count()
-    closed_cases = court_cases.filter(status='CLOSED').count()
-    
     context = {
         'court': court,
-        'assigned_judges': assigned_judges,
-        'court_cases': court_cases,
-        'upcoming_hearings': upcoming_hearings,
-        'active_cases': active_cases,
-        'pending_cases': pending_cases,
-        'closed_cases': closed_cases,
     }
     return render(request, 'courts/court_detail.html', context)
 
+@login_required
+def court_detail_fragment(request, pk, fragment):
+    """One page of a court detail section as HTML, or as JSON with ?format=json"""
+    if fragment not in FRAGMENTS:
+        raise Http404("No such section.")
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    data = fragment_data(pk, fragment, page)
+    if data is None:
+        raise Http404("No such court.")
+    
+    if request.GET.get('format') == 'json':
+        return JsonResponse(data)
+    context = {
+        'court_id': pk,
+        'fragment': fragment,
+        **data,
+    }
+    return render(request, f'courts/fragments/{fragment}.html', context)
+
 @login_required
 def court_edit(request, pk):
     """Edit court information"""
@@ -434,6 +436,14 @@ def court_order_detail(request, pk):
     }
     return render(request, 'courts/court_order_detail.html', context)
 
+@login_required
+def court_order_document(request, pk):
+    """Download the document attached to a court order the user may see"""
+    court_order = get_object_or_404(visible(CourtOrder, request.user).select_related('document'), pk=pk)
+    if court_order.document is None:
+        raise Http404("This order has no document.")
+    return serve(request, court_order.document, as_attachment='download' in request.GET)
+
 @login_required
 def court_order_edit(request, pk):
     """Edit court order information"""
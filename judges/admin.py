@@ -1,22 +1,29 @@
 from django.contrib import admin
+from core.admin import AutocompleteFilter, LargeTableAdmin
 from .models import Judge, CourtAssignment, JudicialLeave
 
 @admin.register(Judge)
 class JudgeAdmin(admin.ModelAdmin):
     list_display = ['user', 'judge_id', 'court', 'specialization', 'appointment_date', 'is_active']
     list_filter = ['specialization', 'is_active', 'court']
+    list_select_related = ['user', 'court']
     search_fields = ['user__first_name', 'user__last_name', 'judge_id']
+    autocomplete_fields = ['user']
     date_hierarchy = 'appointment_date'
 
 @admin.register(CourtAssignment)
-class CourtAssignmentAdmin(admin.ModelAdmin):
+class CourtAssignmentAdmin(LargeTableAdmin, admin.ModelAdmin):
     list_display = ['judge', 'court', 'assignment_date', 'end_date', 'is_primary', 'assignment_type']
-    list_filter = ['is_primary', 'assignment_type', 'court']
+    list_filter = ['is_primary', 'assignment_type', 'court', ('judge', AutocompleteFilter)]
+    list_select_related = ['judge__user', 'court']
     search_fields = ['judge__user__first_name', 'judge__user__last_name']
+    autocomplete_fields = ['judge']
 
 @admin.register(JudicialLeave)
-class JudicialLeaveAdmin(admin.ModelAdmin):
+class JudicialLeaveAdmin(LargeTableAdmin, admin.ModelAdmin):
     list_display = ['judge', 'start_date', 'end_date', 'leave_type', 'is_approved']
-    list_filter = ['leave_type', 'is_approved']
+    list_filter = ['leave_type', 'is_approved', ('judge', AutocompleteFilter)]
+    list_select_related = ['judge__user']
     search_fields = ['judge__user__first_name', 'judge__user__last_name']
+    autocomplete_fields = ['judge']
     date_hierarchy = 'start_date'
\ No newline at end of file
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def queue_pending_reviews(apps, schema_editor):
+    PlanItem = apps.get_model('cases', 'PlanItem')
+    JudicialReviewItem = apps.get_model('judges', 'JudicialReviewItem')
+    
+    pending = PlanItem.objects.filter(requires_judicial_review=True, is_completed=False).values_list(
+        'id', 'rehabilitation_plan__case_id', 'rehabilitation_plan__case__presiding_judge_id'
+    )
+    JudicialReviewItem.objects.bulk_create(
+        (JudicialReviewItem(plan_item_id=item_id, case_id=case_id, judge_id=judge_id)
+         for item_id, case_id, judge_id in pending.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cases', '0005_case_court_case'),
+        ('judges', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JudicialReviewItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RESOLVED', 'Resolved')], default='PENDING', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('case', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_items', to='cases.case')),
+                ('judge', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='review_items', to=settings.AUTH_USER_MODEL)),
+                ('plan_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='review_item', to='cases.planitem')),
+                ('resolved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resolved_review_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Judicial Review Item',
+                'verbose_name_plural': 'Judicial Review Items',
+                'db_table': 'judicial_review_items',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['judge', 'status'], name='judicial_re_judge_i_9148da_idx'), models.Index(fields=['case', 'status'], name='judicial_re_case_id_b39a5b_idx')],
+            },
+        ),
+        migrations.RunPython(queue_pending_reviews, migrations.RunPython.noop),
+    ]
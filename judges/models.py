@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
+from django.core.cache import cache
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
@@ -168,8 +170,129 @@ class JudicialLeave(models.Model):
         today = timezone.now().date()
         return self.start_date <= today <= self.end_date and self.is_approved
 
+class JudicialReviewItem(models.Model):
+    """Work item for a plan item that needs a judge's review, queued per presiding judge"""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RESOLVED', 'Resolved'),
+    ]
+    
+    plan_item = models.OneToOneField('cases.PlanItem', on_delete=models.CASCADE, related_name='review_item')
+    case = models.ForeignKey('cases.Case', on_delete=models.CASCADE, related_name='review_items')
+    judge = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='review_items'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    created_at = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    resolved_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='resolved_review_items'
+    )
+    
+    class Meta:
+        db_table = 'judicial_review_items'
+        verbose_name = 'Judicial Review Item'
+        verbose_name_plural = 'Judicial Review Items'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['judge', 'status']),
+            models.Index(fields=['case', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"Review of plan item {self.plan_item_id} ({self.get_status_display()})"
+    
+    @staticmethod
+    def depth_cache_key(judge_id):
+        return f'judges:review-queue-depth:{judge_id}'
+    
+    @classmethod
+    def pending_for(cls, judge):
+        """A judge's pending reviews, on plans that still require judicial review"""
+        return cls.objects.filter(
+            judge=judge, status='PENDING', plan_item__rehabilitation_plan__judicial_review_required=True,
+        )
+    
+    @classmethod
+    def queue_depth(cls, judge):
+        """Number of pending review items for a judge, cached until the queue changes"""
+        key = cls.depth_cache_key(judge.pk)
+        depth = cache.get(key)
+        if depth is None:
+            depth = cls.pending_for(judge).count()
+            cache.set(key, depth, None)
+        return depth
+    
+    @classmethod
+    def invalidate_queue_depth(cls, *judge_ids):
+        cache.delete_many([cls.depth_cache_key(judge_id) for judge_id in judge_ids if judge_id])
+    
+    @classmethod
+    def resolve_case(cls, case, resolved_by=None):
+        """
+        Resolve every pending review for a case with set-based updates and clear
+        the review flags on its plans and items. Returns the number resolved.
+        """
+        from cases.models import PlanItem
+        with transaction.atomic():
+            judge_ids = set(cls.objects.filter(case=case, status='PENDING').values_list('judge_id', flat=True))
+            resolved = cls.objects.filter(case=case, status='PENDING').update(
+                status='RESOLVED',
+                resolved_at=timezone.now(),
+                resolved_by=resolved_by,
+            )
+            case.rehabilitation_plans.filter(judicial_review_required=True).update(judicial_review_required=False)
+            PlanItem.objects.filter(
+                rehabilitation_plan__case=case,
+                requires_judicial_review=True,
+            ).update(requires_judicial_review=False)
+            transaction.on_commit(lambda: cls.invalidate_queue_depth(*judge_ids))
+        return resolved
+
+    @classmethod
+    def sync_plan_items(cls, plan_item_ids):
+        """
+        Set-based counterpart of the PlanItem post_save receiver, for items
+        written with bulk_create() or update(): queue, re-open or resolve
+        their review items in a handful of statements.
+        """
+        from cases.models import PlanItem
+        plan_item_ids = list(plan_item_ids)
+        if not plan_item_ids:
+            return
+        needs_review = Q(plan_item__requires_judicial_review=True, plan_item__is_completed=False)
+        with transaction.atomic():
+            items = cls.objects.filter(plan_item_id__in=plan_item_ids)
+            to_resolve = items.filter(status='PENDING').exclude(needs_review)
+            to_reopen = items.filter(needs_review, status='RESOLVED')
+            judge_ids = set(to_resolve.values_list('judge_id', flat=True))
+            judge_ids.update(to_reopen.values_list('judge_id', flat=True))
+            to_resolve.update(status='RESOLVED', resolved_at=timezone.now())
+            to_reopen.update(status='PENDING', resolved_at=None, resolved_by=None)
+
+            missing = PlanItem.objects.filter(
+                pk__in=plan_item_ids,
+                requires_judicial_review=True,
+                is_completed=False,
+                review_item__isnull=True,
+            ).values_list('pk', 'rehabilitation_plan__case_id', 'rehabilitation_plan__case__presiding_judge_id')
+            created = cls.objects.bulk_create([
+                cls(plan_item_id=plan_item_id, case_id=case_id, judge_id=judge_id)
+                for plan_item_id, case_id, judge_id in missing
+            ])
+            judge_ids.update(item.judge_id for item in created)
+            transaction.on_commit(lambda: cls.invalidate_queue_depth(*judge_ids))
+
 # Signal to create judge profile when user is created
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -183,4 +306,63 @@ def create_or_update_judge_profile(sender, instance, created, **kwargs):
     if created:
         # Don't automatically create judge profiles
         # Judges should be created through admin or specific views
-        pass
\ No newline at end of file
+        pass
+
+@receiver(post_save, sender='cases.PlanItem')
+def sync_judicial_review_item(sender, instance, created, **kwargs):
+    """Queue a plan item for review while it requires one and is not completed"""
+    needs_review = instance.requires_judicial_review and not instance.is_completed
+    existing = None
+    if not created:
+        existing = JudicialReviewItem.objects.filter(plan_item=instance).values_list('pk', 'status', 'judge_id').first()
+    
+    if needs_review and existing is None:
+        from cases.models import RehabilitationPlan
+        case_id, judge_id = RehabilitationPlan.objects.filter(pk=instance.rehabilitation_plan_id).values_list(
+            'case_id', 'case__presiding_judge_id'
+        ).get()
+        JudicialReviewItem.objects.create(plan_item=instance, case_id=case_id, judge_id=judge_id)
+        JudicialReviewItem.invalidate_queue_depth(judge_id)
+    elif needs_review and existing[1] != 'PENDING':
+        JudicialReviewItem.objects.filter(pk=existing[0]).update(status='PENDING', resolved_at=None, resolved_by=None)
+        JudicialReviewItem.invalidate_queue_depth(existing[2])
+    elif not needs_review and existing is not None and existing[1] == 'PENDING':
+        JudicialReviewItem.objects.filter(pk=existing[0]).update(status='RESOLVED', resolved_at=timezone.now())
+        JudicialReviewItem.invalidate_queue_depth(existing[2])
+
+@receiver(post_save, sender='cases.Case')
+def follow_presiding_judge(sender, instance, created, **kwargs):
+    """Move a case's pending reviews to its current presiding judge"""
+    if created:
+        return
+    moved = JudicialReviewItem.objects.filter(case=instance, status='PENDING').exclude(judge_id=instance.presiding_judge_id)
+    old_judge_ids = set(moved.values_list('judge_id', flat=True))
+    if old_judge_ids:
+        moved.update(judge_id=instance.presiding_judge_id)
+        JudicialReviewItem.invalidate_queue_depth(instance.presiding_judge_id, *old_judge_ids)
+
+@receiver(post_delete, sender=JudicialReviewItem)
+def forget_deleted_review(sender, instance, **kwargs):
+    """Deleting a review item, directly or with its plan item or case, changes its judge's queue"""
+    JudicialReviewItem.invalidate_queue_depth(instance.judge_id)
+
+@receiver(post_save, sender='cases.RehabilitationPlan')
+def follow_plan_review_flag(sender, instance, created, **kwargs):
+    """Only plans marked for judicial review count towards the queue, so recount when one is saved"""
+    if created:
+        return
+    from cases.models import Case
+    judge_id = Case.objects.filter(pk=instance.case_id).values_list('presiding_judge_id', flat=True).first()
+    JudicialReviewItem.invalidate_queue_depth(judge_id)
+
+@receiver(post_init, sender=Judge)
+def remember_court(sender, instance, **kwargs):
+    instance._loaded_court_id = instance.__dict__.get('court_id')
+
+@receiver(post_save, sender=Judge)
+@receiver(post_delete, sender=Judge)
+def invalidate_court_judge_fragments(sender, instance, **kwargs):
+    """Refresh the judges section of the court detail page for the old and new court"""
+    from courts.fragments import invalidate_court_fragments
+    invalidate_court_fragments([instance.court_id, instance._loaded_court_id], ['stats', 'judges'])
+    instance._loaded_court_id = instance.court_id
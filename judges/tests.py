@@ -0,0 +1,102 @@
+from datetime import date
+
+from django.test import TestCase
+
+from cases.models import Case, PlanItem, RehabilitationPlan
+from clients.tests import make_client
+from users.models import User
+from .models import JudicialReviewItem
+
+
+class ReviewQueueTests(TestCase):
+    """Plan items needing review are queued for the presiding judge, and the cached depth follows every change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user('admin', user_type='admin')
+        officer = User.objects.create_user('officer', user_type='officer')
+        cls.judge = User.objects.create_user('judge', user_type='judge')
+        cls.other_judge = User.objects.create_user('other-judge', user_type='judge')
+        client = make_client('C-1', officer, admin)
+        cls.case = Case.objects.create(client=client, officer=officer, presiding_judge=cls.judge,
+                                       case_number='K-1', objectives='-')
+        cls.plan = RehabilitationPlan.objects.create(case=cls.case, title='Plan', description='-',
+                                                     start_date=date(2025, 1, 1), end_date=date(2025, 6, 1),
+                                                     judicial_review_required=True)
+
+    def item(self, requires_review=True):
+        return PlanItem.objects.create(rehabilitation_plan=self.plan, description='-', due_date=date(2025, 2, 1),
+                                       requires_judicial_review=requires_review)
+
+    def depth(self, judge=None):
+        return JudicialReviewItem.queue_depth(judge or self.judge)
+
+    def test_items_needing_review_are_queued_until_completed(self):
+        self.item(requires_review=False)
+        item = self.item()
+        self.assertEqual(self.depth(), 1)
+        item.is_completed = True
+        item.save()
+        self.assertEqual(self.depth(), 0)
+        self.assertEqual(JudicialReviewItem.objects.get().status, 'RESOLVED')
+        item.is_completed = False
+        item.save()
+        self.assertEqual(self.depth(), 1)
+
+    def test_deleting_an_item_shortens_the_queue(self):
+        item = self.item()
+        self.item()
+        self.assertEqual(self.depth(), 2)
+        item.delete()
+        self.assertEqual(self.depth(), 1)
+
+    def test_only_plans_marked_for_review_count(self):
+        self.item()
+        self.assertEqual(self.depth(), 1)
+        self.plan.judicial_review_required = False
+        self.plan.save()
+        self.assertEqual(self.depth(), 0)
+        self.plan.judicial_review_required = True
+        self.plan.save()
+        self.assertEqual(self.depth(), 1)
+
+    def test_reviews_follow_a_new_presiding_judge(self):
+        self.item()
+        self.assertEqual((self.depth(), self.depth(self.other_judge)), (1, 0))
+        self.case.presiding_judge = self.other_judge
+        self.case.save()
+        self.assertEqual((self.depth(), self.depth(self.other_judge)), (0, 1))
+
+    def test_resolving_a_case_clears_its_queue_and_flags(self):
+        self.item()
+        self.item()
+        self.assertEqual(self.depth(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            resolved = JudicialReviewItem.resolve_case(self.case, resolved_by=self.judge)
+        self.assertEqual(resolved, 2)
+        self.assertEqual(self.depth(), 0)
+        self.assertFalse(PlanItem.objects.filter(requires_judicial_review=True).exists())
+
+    def test_bulk_writes_are_synced_in_one_go(self):
+        items = PlanItem.objects.bulk_create([
+            PlanItem(rehabilitation_plan=self.plan, description='-', due_date=date(2025, 2, 1),
+                     requires_judicial_review=True)
+            for _ in range(3)
+        ])
+        self.assertEqual(self.depth(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            JudicialReviewItem.sync_plan_items(item.pk for item in items)
+        self.assertEqual(self.depth(), 3)
+        PlanItem.objects.filter(pk=items[0].pk).update(is_completed=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            JudicialReviewItem.sync_plan_items([items[0].pk])
+        self.assertEqual(self.depth(), 2)
+
+    def test_review_page_lists_queued_cases(self):
+        self.item()
+        self.client.force_login(self.judge)
+        response = self.client.get('/judges/reviews/')
+        self.assertEqual(list(response.context['review_cases']), [self.case])
+        self.assertEqual((response.context['review_queue_depth'], response.context['review_plan_count']), (1, 1))
+        self.client.force_login(self.other_judge)
+        self.assertEqual(list(self.client.get('/judges/reviews/').context['review_cases']), [])
@@ -1,12 +1,13 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Prefetch
 from django.utils import timezone
 from django.http import JsonResponse
 from django.contrib import messages
 from datetime import timedelta
-from cases.models import Case
+from cases.models import Case, RehabilitationPlan
 from clients.models import Client
+from .models import JudicialReviewItem
   
 
 @login_required
@@ -27,12 +28,11 @@ def judge_dashboard(request):
         next_court_date__gte=timezone.now().date()
     ).order_by('next_court_date')[:5]
     
-    # Cases requiring judicial review
+    # Cases requiring judicial review, read from the review queue
     review_cases = presiding_cases.filter(
-        rehabilitation_plans__judicial_review_required=True,
-        rehabilitation_plans__plan_items__requires_judicial_review=True,
-        rehabilitation_plans__plan_items__is_completed=False
-    ).distinct()
+        pk__in=JudicialReviewItem.pending_for(request.user).values('case_id')
+    )
+    review_queue_depth = JudicialReviewItem.queue_depth(request.user)
     
     # High-profile cases
     high_profile_cases = presiding_cases.filter(is_high_profile=True, status='open')
@@ -43,6 +43,7 @@ def judge_dashboard(request):
         'sentenced_cases': sentenced_cases,
         'upcoming_court_dates': upcoming_court_dates,
         'review_cases': review_cases,
+        'review_queue_depth': review_queue_depth,
         'high_profile_cases': high_profile_cases,
     }
     
@@ -82,7 +83,7 @@ def judge_case_detail(request, pk):
         return redirect('dashboard')
     
     case = get_object_or_404(Case, pk=pk, presiding_judge=request.user)
-    rehabilitation_plans = case.rehabilitation_plans.all()
+    rehabilitation_plans = case.rehabilitation_plans.with_progress()
     
     context = {
         'case': case,
@@ -132,15 +133,19 @@ def judicial_reviews(request):
         messages.error(request, "Access denied. Judges only.")
         return redirect('dashboard')
     
+    pending_reviews = JudicialReviewItem.pending_for(request.user)
     review_cases = Case.objects.filter(
         presiding_judge=request.user,
-        rehabilitation_plans__judicial_review_required=True,
-        rehabilitation_plans__plan_items__requires_judicial_review=True,
-        rehabilitation_plans__plan_items__is_completed=False
-    ).distinct()
+        pk__in=pending_reviews.values('case_id')
+    ).select_related('client', 'officer').prefetch_related(
+        # Ordered so that rehabilitation_plans.first in the template reads the prefetch
+        Prefetch('rehabilitation_plans', queryset=RehabilitationPlan.objects.with_progress().order_by('pk'))
+    )
     
     context = {
         'review_cases': review_cases,
+        'review_queue_depth': JudicialReviewItem.queue_depth(request.user),
+        'review_plan_count': pending_reviews.values('plan_item__rehabilitation_plan_id').distinct().count(),
     }
     
     return render(request, 'judges/judicial_reviews.html', context)
@@ -186,16 +191,10 @@ def complete_review(request):
         
         try:
             case = Case.objects.get(pk=case_id, presiding_judge=request.user)
-            # Update rehabilitation plans to mark review as completed
-            for plan in case.rehabilitation_plans.filter(judicial_review_required=True):
-                plan.judicial_review_required = False
-                plan.save()
-                
-                for item in plan.plan_items.filter(requires_judicial_review=True):
-                    item.requires_judicial_review = False
-                    item.save()
+            # Resolve the case's queued reviews and clear the plan/item flags in bulk
+            resolved = JudicialReviewItem.resolve_case(case, resolved_by=request.user)
             
-            return JsonResponse({'success': True})
+            return JsonResponse({'success': True, 'resolved': resolved})
         except Case.DoesNotExist:
             return JsonResponse({'success': False, 'error': 'Case not found'})
     
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reporting.rollups import refresh_appointment_rollups, refresh_client_rollup, refresh_hearing_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the reporting rollup tables from the raw data (run once after deploying the rollups)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD), default: all history')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD), default: all future')
+
+    def handle(self, *args, **options):
+        try:
+            start = datetime.strptime(options['start'], '%Y-%m-%d').date() if options['start'] else None
+            end = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else None
+        except ValueError:
+            raise CommandError('Dates must be in YYYY-MM-DD format')
+
+        refresh_appointment_rollups(start, end)
+        refresh_hearing_rollups(start, end)
+        refresh_client_rollup()
+        self.stdout.write(self.style.SUCCESS('Rollups rebuilt'))
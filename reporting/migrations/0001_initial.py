@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('courts', '0003_hearing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientDistributionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20)),
+                ('risk_level', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('status', 'risk_level'), name='unique_client_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AppointmentDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('appointment_type', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('officer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['officer', 'day'], name='reporting_a_officer_6ffc07_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'officer', 'appointment_type', 'status'), name='unique_appointment_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HearingDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('hearing_type', models.CharField(max_length=20)),
+                ('is_completed', models.BooleanField()),
+                ('count', models.IntegerField(default=0)),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='courts.court')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['court', 'day'], name='reporting_h_court_i_465a19_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'court', 'hearing_type', 'is_completed'), name='unique_hearing_rollup')],
+            },
+        ),
+    ]
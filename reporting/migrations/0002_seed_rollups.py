@@ -0,0 +1,59 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def seed_rollups(apps, schema_editor):
+    # Historical models only, so later changes to the app code can't break this migration
+    Appointment = apps.get_model('appointments', 'Appointment')
+    Hearing = apps.get_model('courts', 'Hearing')
+    Client = apps.get_model('clients', 'Client')
+    AppointmentDailyRollup = apps.get_model('reporting', 'AppointmentDailyRollup')
+    HearingDailyRollup = apps.get_model('reporting', 'HearingDailyRollup')
+    ClientDistributionRollup = apps.get_model('reporting', 'ClientDistributionRollup')
+
+    appointments = Appointment.objects.annotate(day=TruncDate('scheduled_date')).values(
+        'day', 'officer_id', 'appointment_type', 'status',
+    ).annotate(n=Count('id')).order_by()
+    AppointmentDailyRollup.objects.bulk_create(
+        (AppointmentDailyRollup(day=row['day'], officer_id=row['officer_id'],
+                                appointment_type=row['appointment_type'], status=row['status'],
+                                count=row['n'])
+         for row in appointments.iterator()),
+        batch_size=1000,
+    )
+
+    hearings = Hearing.objects.annotate(day=TruncDate('hearing_date')).values(
+        'day', 'court_case__court_id', 'hearing_type', 'is_completed',
+    ).annotate(n=Count('id')).order_by()
+    HearingDailyRollup.objects.bulk_create(
+        (HearingDailyRollup(day=row['day'], court_id=row['court_case__court_id'],
+                            hearing_type=row['hearing_type'], is_completed=row['is_completed'],
+                            count=row['n'])
+         for row in hearings.iterator()),
+        batch_size=1000,
+    )
+
+    ClientDistributionRollup.objects.bulk_create(
+        ClientDistributionRollup(status=row['status'], risk_level=row['risk_level'], count=row['n'])
+        for row in Client.objects.values('status', 'risk_level').annotate(n=Count('id')).order_by()
+    )
+
+
+def clear_rollups(apps, schema_editor):
+    for name in ('AppointmentDailyRollup', 'HearingDailyRollup', 'ClientDistributionRollup'):
+        apps.get_model('reporting', name).objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0001_initial'),
+        ('appointments', '0002_appointment_indexes'),
+        ('clients', '0005_client_name_indexes'),
+        ('courts', '0005_court_order_documents'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_rollups, clear_rollups),
+    ]
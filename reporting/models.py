@@ -0,0 +1,110 @@
+from django.db import models
+from django.conf import settings
+
+
+class AppointmentDailyRollup(models.Model):
+    """Number of appointments per day, officer, type and status"""
+    day = models.DateField()
+    officer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    appointment_type = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'officer', 'appointment_type', 'status'],
+                name='unique_appointment_rollup',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['officer', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.appointment_type}/{self.status}: {self.count}"
+
+class HearingDailyRollup(models.Model):
+    """Number of hearings per day, court, type and completion"""
+    day = models.DateField()
+    court = models.ForeignKey('courts.Court', on_delete=models.CASCADE, related_name='+')
+    hearing_type = models.CharField(max_length=20)
+    is_completed = models.BooleanField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'court', 'hearing_type', 'is_completed'],
+                name='unique_hearing_rollup',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['court', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.hearing_type}: {self.count}"
+
+class ClientDistributionRollup(models.Model):
+    """Number of clients per status and risk level"""
+    status = models.CharField(max_length=20)
+    risk_level = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['status', 'risk_level'], name='unique_client_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.status}/{self.risk_level}: {self.count}"
+
+
+# Signals to keep the rollups up to date as rows change
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from appointments.models import Appointment
+from appointments.signals import appointments_marked_no_show
+from clients.models import Client
+from courts.models import Hearing
+from . import rollups
+
+@receiver(post_init, sender=Appointment)
+@receiver(post_init, sender=Hearing)
+@receiver(post_init, sender=Client)
+def remember_rollup_key(sender, instance, **kwargs):
+    instance._rollup_key = rollups.rollup_key(instance)
+
+@receiver(pre_save, sender=Appointment)
+@receiver(pre_save, sender=Hearing)
+@receiver(pre_save, sender=Client)
+@receiver(pre_delete, sender=Appointment)
+@receiver(pre_delete, sender=Hearing)
+@receiver(pre_delete, sender=Client)
+def resolve_deferred_rollup_key(sender, instance, **kwargs):
+    # Instances loaded with .only()/.defer() don't know their bucket yet
+    if instance.pk and instance._rollup_key is rollups.UNKNOWN:
+        instance._rollup_key = rollups.stored_rollup_key(sender, instance.pk)
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_save, sender=Hearing)
+@receiver(post_save, sender=Client)
+def update_rollups_on_save(sender, instance, created, **kwargs):
+    new_key = rollups.rollup_key(instance)
+    if new_key is rollups.UNKNOWN:
+        new_key = rollups.stored_rollup_key(sender, instance.pk)
+    old_key = None if created else instance._rollup_key
+    if old_key != new_key:
+        rollups.move(sender, old_key, new_key)
+    instance._rollup_key = new_key
+
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=Hearing)
+@receiver(post_delete, sender=Client)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    rollups.move(sender, instance._rollup_key, None)
+
+@receiver(appointments_marked_no_show)
+def update_rollups_after_no_show(sender, appointments, **kwargs):
+    rollups.apply_no_show_sweep(appointments)
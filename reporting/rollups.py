@@ -0,0 +1,338 @@
+"""
+Daily rollups behind the reports.
+
+Rows are adjusted one at a time by the signal handlers in reporting.models
+and by the set-based jobs that bypass post_save (the no-show sweeper, the
+caseload balancer, risk recalculation). The refresh_* functions rebuild a
+date range from the raw tables, for backfills and as a repair tool.
+
+The report functions take the user the report is for. Rollups carry no
+client or court case, so users whose visibility they cannot express get
+their figures counted from the raw rows they may see instead.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from appointments.models import Appointment
+from clients.models import Client
+from core.scoping import condition_for, visible
+from courts.models import CourtCase, Hearing
+
+UNKNOWN = object()
+
+ROLLUP_FIELDS = {
+    Appointment: ('scheduled_date', 'officer_id', 'appointment_type', 'status'),
+    Hearing: ('hearing_date', 'court_case_id', 'hearing_type', 'is_completed'),
+    Client: ('status', 'risk_level'),
+}
+
+GRANULARITIES = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def _day(value):
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+
+def day_bounds(start_day, end_day):
+    """Aware datetimes covering whole days, end exclusive"""
+    start = timezone.make_aware(datetime.combine(start_day, time.min)) if start_day else None
+    end = timezone.make_aware(datetime.combine(end_day + timedelta(days=1), time.min)) if end_day else None
+    return start, end
+
+
+def rollup_key(instance):
+    """The rollup bucket an instance counts towards, UNKNOWN if its fields were deferred"""
+    fields = ROLLUP_FIELDS[type(instance)]
+    if any(field not in instance.__dict__ for field in fields):
+        return UNKNOWN
+    values = [instance.__dict__[field] for field in fields]
+    if any(value is None for value in values):
+        return None
+    if isinstance(instance, Client):
+        return tuple(values)
+    return (_day(values[0]), *values[1:])
+
+
+def stored_rollup_key(model, pk):
+    """Look up the bucket of a saved row, for instances loaded with deferred fields"""
+    row = model.objects.filter(pk=pk).values_list(*ROLLUP_FIELDS[model]).first()
+    if row is None:
+        return None
+    if model is Client:
+        return tuple(row)
+    return (_day(row[0]), *row[1:])
+
+
+def _bump(model, delta, **key):
+    if model.objects.filter(**key).update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(count=delta, **key)
+    except IntegrityError:
+        # Another writer created the row first
+        model.objects.filter(**key).update(count=F('count') + delta)
+
+
+def _bump_appointment(key, delta):
+    from .models import AppointmentDailyRollup
+    day, officer_id, appointment_type, status = key
+    _bump(AppointmentDailyRollup, delta, day=day, officer_id=officer_id,
+          appointment_type=appointment_type, status=status)
+
+
+def _bump_hearing(key, delta):
+    from .models import HearingDailyRollup
+    day, court_case_id, hearing_type, is_completed = key
+    court_id = CourtCase.objects.filter(pk=court_case_id).values_list('court_id', flat=True).first()
+    if court_id is not None:
+        _bump(HearingDailyRollup, delta, day=day, court_id=court_id,
+              hearing_type=hearing_type, is_completed=is_completed)
+
+
+def _bump_client(key, delta):
+    from .models import ClientDistributionRollup
+    status, risk_level = key
+    _bump(ClientDistributionRollup, delta, status=status, risk_level=risk_level)
+
+
+BUMPERS = {
+    Appointment: _bump_appointment,
+    Hearing: _bump_hearing,
+    Client: _bump_client,
+}
+
+
+def move(model, old_key, new_key):
+    """Move one row's contribution from old_key to new_key (either may be None)"""
+    bump = BUMPERS[model]
+    if old_key is not None:
+        bump(old_key, -1)
+    if new_key is not None:
+        bump(new_key, 1)
+
+
+def apply_no_show_sweep(appointments):
+    """Shift swept appointments from 'scheduled' to 'no_show' in their day's buckets"""
+    groups = Counter(
+        (_day(row['scheduled_date']), row['officer_id'], row['appointment_type'])
+        for row in appointments
+    )
+    for (day, officer_id, appointment_type), n in groups.items():
+        _bump_appointment((day, officer_id, appointment_type, 'scheduled'), -n)
+        _bump_appointment((day, officer_id, appointment_type, 'no_show'), n)
+
+
+def apply_hearing_completion(hearings):
+    """Shift hearings marked completed in bulk from the open to the completed buckets"""
+    from .models import HearingDailyRollup
+    groups = Counter(
+        (_day(row['hearing_date']), row['court_case__court_id'], row['hearing_type'])
+        for row in hearings
+    )
+    for (day, court_id, hearing_type), n in groups.items():
+        _bump(HearingDailyRollup, -n, day=day, court_id=court_id, hearing_type=hearing_type, is_completed=False)
+        _bump(HearingDailyRollup, n, day=day, court_id=court_id, hearing_type=hearing_type, is_completed=True)
+
+
+def apply_client_changes(changes):
+    """changes: iterable of (old_key, new_key) pairs for clients updated in bulk"""
+    deltas = Counter()
+    for old_key, new_key in changes:
+        if old_key != new_key:
+            deltas[old_key] -= 1
+            deltas[new_key] += 1
+    for key, delta in deltas.items():
+        if delta:
+            _bump_client(key, delta)
+
+
+@transaction.atomic
+def refresh_appointment_rollups(start_day=None, end_day=None):
+    """Rebuild appointment rollups for the given days (all days when open ended)"""
+    from .models import AppointmentDailyRollup
+    rollups = AppointmentDailyRollup.objects.all()
+    appointments = Appointment.objects.all()
+    start, end = day_bounds(start_day, end_day)
+    if start_day:
+        rollups = rollups.filter(day__gte=start_day)
+        appointments = appointments.filter(scheduled_date__gte=start)
+    if end_day:
+        rollups = rollups.filter(day__lte=end_day)
+        appointments = appointments.filter(scheduled_date__lt=end)
+    rollups.delete()
+
+    rows = appointments.annotate(day=TruncDate('scheduled_date')).values(
+        'day', 'officer_id', 'appointment_type', 'status',
+    ).annotate(n=Count('id')).order_by()
+    AppointmentDailyRollup.objects.bulk_create(
+        (AppointmentDailyRollup(day=row['day'], officer_id=row['officer_id'],
+                                appointment_type=row['appointment_type'], status=row['status'],
+                                count=row['n'])
+         for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+@transaction.atomic
+def refresh_hearing_rollups(start_day=None, end_day=None):
+    """Rebuild hearing rollups for the given days (all days when open ended)"""
+    from .models import HearingDailyRollup
+    rollups = HearingDailyRollup.objects.all()
+    hearings = Hearing.objects.all()
+    start, end = day_bounds(start_day, end_day)
+    if start_day:
+        rollups = rollups.filter(day__gte=start_day)
+        hearings = hearings.filter(hearing_date__gte=start)
+    if end_day:
+        rollups = rollups.filter(day__lte=end_day)
+        hearings = hearings.filter(hearing_date__lt=end)
+    rollups.delete()
+
+    rows = hearings.annotate(day=TruncDate('hearing_date')).values(
+        'day', 'court_case__court_id', 'hearing_type', 'is_completed',
+    ).annotate(n=Count('id')).order_by()
+    HearingDailyRollup.objects.bulk_create(
+        (HearingDailyRollup(day=row['day'], court_id=row['court_case__court_id'],
+                            hearing_type=row['hearing_type'], is_completed=row['is_completed'],
+                            count=row['n'])
+         for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+@transaction.atomic
+def refresh_client_rollup():
+    from .models import ClientDistributionRollup
+    ClientDistributionRollup.objects.all().delete()
+    ClientDistributionRollup.objects.bulk_create(
+        ClientDistributionRollup(status=row['status'], risk_level=row['risk_level'], count=row['n'])
+        for row in Client.objects.values('status', 'risk_level').annotate(n=Count('id')).order_by()
+    )
+
+
+def _with_percentages(rows, total):
+    for row in rows:
+        row['percentage'] = (row['count'] / total * 100) if total > 0 else 0
+    return rows
+
+
+def _tally(rollups, raw_rows):
+    """
+    The rows to aggregate and the aggregate counting them: the rollups when
+    given, else the raw rows from raw_rows(), with a `day` where dated.
+    """
+    if rollups is not None:
+        return rollups, partial(Sum, 'count', default=0)
+    return raw_rows(), partial(Count, 'id')
+
+
+def _appointments(start_day, end_day, user, officer_id):
+    from .models import AppointmentDailyRollup
+    rollups = AppointmentDailyRollup.objects.filter(day__gte=start_day, day__lte=end_day)
+    if officer_id:
+        rollups = rollups.filter(officer_id=officer_id)
+    if user and condition_for(Appointment, user) is not None:
+        # An officer sees the appointments they hold, which are their rollup rows;
+        # a judge sees those of their clients, which the rollups don't record
+        rollups = rollups.filter(officer=user) if user.user_type == 'officer' else None
+
+    def raw_rows():
+        start, end = day_bounds(start_day, end_day)
+        rows = visible(Appointment, user).filter(scheduled_date__gte=start, scheduled_date__lt=end)
+        if officer_id:
+            rows = rows.filter(officer_id=officer_id)
+        return rows.annotate(day=TruncDate('scheduled_date'))
+
+    return _tally(rollups, raw_rows)
+
+
+def appointment_breakdown(start_day, end_day, officer_id=None, user=None):
+    """Appointment totals by type and by status for a date range, limited to what user may see"""
+    rows, tally = _appointments(start_day, end_day, user, officer_id)
+    by_type = list(rows.values('appointment_type').annotate(count=tally())
+                   .filter(count__gt=0).order_by('appointment_type'))
+    by_status = list(rows.values('status').annotate(count=tally())
+                     .filter(count__gt=0).order_by('status'))
+    total = sum(row['count'] for row in by_status)
+    return {
+        'total': total,
+        'by_type': _with_percentages(by_type, total),
+        'by_status': _with_percentages(by_status, total),
+        'status_counts': {row['status']: row['count'] for row in by_status},
+    }
+
+
+def _trend(rows, tally, granularity, extra):
+    trunc = GRANULARITIES[granularity]
+    period = trunc('day') if trunc else F('day')
+    return list(
+        rows.annotate(period=period).values('period').annotate(
+            total=tally(), **extra,
+        ).order_by('period')
+    )
+
+
+def appointment_trend(start_day, end_day, granularity='day', officer_id=None, user=None):
+    """Appointments per day, week or month with a column per status"""
+    rows, tally = _appointments(start_day, end_day, user, officer_id)
+    extra = {
+        status: tally(filter=Q(status=status))
+        for status, _ in Appointment.STATUS_CHOICES
+    }
+    return _trend(rows, tally, granularity, extra)
+
+
+def hearing_trend(start_day, end_day, granularity='day', court_id=None, user=None):
+    """Hearings per day, week or month, split into completed and pending"""
+    from .models import HearingDailyRollup
+    rollups = HearingDailyRollup.objects.filter(day__gte=start_day, day__lte=end_day)
+    if court_id:
+        rollups = rollups.filter(court_id=court_id)
+    if user and condition_for(Hearing, user) is not None:
+        # Hearings are scoped by court case, which the rollups don't record
+        rollups = None
+
+    def raw_rows():
+        start, end = day_bounds(start_day, end_day)
+        rows = visible(Hearing, user).filter(hearing_date__gte=start, hearing_date__lt=end)
+        if court_id:
+            rows = rows.filter(court_case__court_id=court_id)
+        return rows.annotate(day=TruncDate('hearing_date'))
+
+    rows, tally = _tally(rollups, raw_rows)
+    extra = {
+        'completed': tally(filter=Q(is_completed=True)),
+        'pending': tally(filter=Q(is_completed=False)),
+    }
+    return _trend(rows, tally, granularity, extra)
+
+
+def client_distribution(user=None):
+    """Client counts by status and by risk level, limited to what user may see"""
+    from .models import ClientDistributionRollup
+    rollups = ClientDistributionRollup.objects.all()
+    if user and condition_for(Client, user) is not None:
+        rollups = None
+    rows, tally = _tally(rollups, lambda: visible(Client, user))
+    by_status = list(rows.values('status').annotate(count=tally())
+                     .filter(count__gt=0).order_by('status'))
+    by_risk = list(rows.values('risk_level').annotate(count=tally())
+                   .filter(count__gt=0).order_by('risk_level'))
+    total = sum(row['count'] for row in by_status)
+    return {
+        'total': total,
+        'by_status': _with_percentages(by_status, total),
+        'by_risk': _with_percentages(by_risk, total),
+        'status_counts': {row['status']: row['count'] for row in by_status},
+    }
@@ -0,0 +1,114 @@
+from datetime import date, datetime
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from appointments.models import Appointment
+from cases.models import Case
+from clients.tests import make_client
+from courts.models import Court, CourtCase, Hearing
+from judges.models import Judge
+from users.models import User
+from .models import AppointmentDailyRollup
+from .rollups import appointment_breakdown, client_distribution, hearing_trend, refresh_appointment_rollups
+
+DAY = date(2025, 3, 3)
+
+
+class ScopedRollupTests(TestCase):
+    """Report totals count only what the user may see, as the detail lists do"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin')
+        cls.officer = User.objects.create_user('officer', user_type='officer')
+        cls.other_officer = User.objects.create_user('other-officer', user_type='officer')
+        cls.judge = User.objects.create_user('judge', user_type='judge')
+        court = Court.objects.create(name='Court', court_type='DISTRICT', address='-')
+        judge_profile = Judge.objects.create(user=cls.judge, judge_id='J-1', court=court,
+                                             appointment_date=date(2020, 1, 1))
+        when = timezone.make_aware(datetime.combine(DAY, datetime.min.time()).replace(hour=10))
+
+        own = make_client('C-1', cls.officer, cls.admin)
+        others = make_client('C-2', cls.other_officer, cls.admin)
+        for client, officer, judge in ((own, cls.officer, cls.judge), (others, cls.other_officer, None)):
+            case = Case.objects.create(client=client, officer=officer, presiding_judge=judge,
+                                       case_number=client.case_number, objectives='-')
+            court_case = CourtCase.objects.create(case=case, court=court, case_number=case.case_number,
+                                                  filing_date=date(2025, 1, 1))
+            Hearing.objects.create(court_case=court_case, hearing_type='REVIEW', hearing_date=when,
+                                   judge=judge_profile, location='Room 1')
+        for client, officer, status in ((own, cls.officer, 'completed'), (own, cls.officer, 'scheduled'),
+                                        (others, cls.other_officer, 'scheduled')):
+            Appointment.objects.create(client=client, officer=officer, appointment_type='checkin',
+                                       status=status, scheduled_date=when, location='Office')
+
+    def test_admin_totals_cover_everything(self):
+        self.assertEqual(appointment_breakdown(DAY, DAY, user=self.admin)['total'], 3)
+        self.assertEqual(client_distribution(self.admin)['total'], 2)
+        self.assertEqual(hearing_trend(DAY, DAY, user=self.admin)[0]['total'], 2)
+
+    def test_officer_totals_cover_their_own_rows(self):
+        breakdown = appointment_breakdown(DAY, DAY, user=self.officer)
+        self.assertEqual(breakdown['status_counts'], {'completed': 1, 'scheduled': 1})
+        others = appointment_breakdown(DAY, DAY, officer_id=self.other_officer.pk, user=self.officer)
+        self.assertEqual(others['total'], 0)
+        self.assertEqual(client_distribution(self.officer)['total'], 1)
+        self.assertEqual(hearing_trend(DAY, DAY, user=self.officer)[0]['pending'], 1)
+
+    def test_judge_totals_cover_their_clients(self):
+        self.assertEqual(appointment_breakdown(DAY, DAY, user=self.judge)['total'], 2)
+        self.assertEqual(client_distribution(self.judge)['status_counts'], {'active': 1})
+        # The judge sits on both hearings, though they preside over one case
+        self.assertEqual(hearing_trend(DAY, DAY, 'week', user=self.judge)[0]['total'], 2)
+
+    def test_rollups_match_a_rebuild(self):
+        live = set(AppointmentDailyRollup.objects.values_list('day', 'officer_id', 'status', 'count'))
+        refresh_appointment_rollups()
+        self.assertEqual(set(AppointmentDailyRollup.objects.values_list('day', 'officer_id', 'status', 'count')),
+                         live)
+
+    def test_report_page_marks_the_chosen_officer(self):
+        self.client.force_login(self.officer)
+        response = self.client.get('/reporting/appointments/', {
+            'start': DAY.isoformat(), 'end': DAY.isoformat(), 'officer': self.officer.pk,
+        })
+        self.assertEqual(response.context['total_appointments'], 2)
+        self.assertContains(response, f'<option value="{self.officer.pk}" selected>')
+
+
+class OfficerWorkloadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', user_type='admin')
+        cls.officer = User.objects.create_user('officer', user_type='officer')
+        cls.other_officer = User.objects.create_user('other-officer', user_type='officer')
+        cls.judge = User.objects.create_user('judge', user_type='judge')
+        cls.staff = User.objects.create_user('staff', user_type='staff')
+        make_client('C-1', cls.officer, cls.admin)
+        make_client('C-2', cls.other_officer, cls.admin)
+
+    def workload(self, user):
+        api = APIClient()
+        api.force_authenticate(user)
+        response = api.get('/api/officers/workload/')
+        self.assertEqual(response.status_code, 200)
+        return {row['id']: row['client_count'] for row in response.data['officers']}
+
+    def test_admin_sees_every_officer(self):
+        self.assertEqual(self.workload(self.admin), {self.officer.pk: 1, self.other_officer.pk: 1})
+
+    def test_officer_sees_only_themselves(self):
+        self.assertEqual(self.workload(self.officer), {self.officer.pk: 1})
+
+    def test_judges_and_staff_see_no_officer(self):
+        self.assertEqual(self.workload(self.judge), {})
+        self.assertEqual(self.workload(self.staff), {})
+
+    def test_report_page_is_limited_the_same_way(self):
+        self.client.force_login(self.officer)
+        response = self.client.get('/reporting/officers/')
+        self.assertEqual([row['id'] for row in response.context['officers']], [self.officer.pk])
+        self.assertEqual(response.context['total_clients'], 1)
@@ -7,7 +7,7 @@ from reportlab.lib import colors
 from django.http import HttpResponse
 from clients.models import Client
 
-def generate_client_pdf_report():
+def generate_client_pdf_report(clients=None):
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = 'attachment; filename="client_report.pdf"'
     
@@ -25,7 +25,8 @@ def generate_client_pdf_report():
     elements.append(Paragraph("<br/><br/>", styles["Normal"]))
     
     # Client data
-    clients = Client.objects.all().select_related('assigned_officer')
+    if clients is None:
+        clients = Client.objects.all().select_related('assigned_officer')
     
     # Table data
     data = [['Case #', 'Name', 'Status', 'Risk Level', 'Officer']]
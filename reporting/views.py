@@ -1,12 +1,17 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse
-from django.db.models import Count, Q
+from django.utils import timezone
 from datetime import datetime, timedelta
 from clients.models import Client
 from cases.models import Case
 from appointments.models import Appointment
 from users.models import User
+from core.scoping import visible
+from .rollups import (
+    GRANULARITIES, appointment_breakdown, appointment_trend, client_distribution, day_bounds,
+)
+from .workload import workload_for
 import csv
 
 @login_required
@@ -15,99 +20,102 @@ def report_list(request):
 
 @login_required
 def client_report(request):
-    # Basic client statistics
-    clients = Client.objects.all().select_related('assigned_officer')
-    total_clients = clients.count()
-    active_clients = clients.filter(status='active').count()
-    completed_clients = clients.filter(status='completed').count()
-    violated_clients = clients.filter(status='violated').count()
+    # Basic client statistics; the listing holds only clients the user may see
+    clients = visible(Client, request.user).select_related('assigned_officer')
+    distribution = client_distribution(request.user)
     
-    # Risk level breakdown
-    risk_levels = Client.objects.values('risk_level').annotate(
-        count=Count('risk_level')
-    )
-    total_risk = sum(level['count'] for level in risk_levels)
-    for level in risk_levels:
-        level['percentage'] = (level['count'] / total_risk * 100) if total_risk > 0 else 0
-    
-    # Status breakdown
-    status_counts = Client.objects.values('status').annotate(
-        count=Count('status')
-    )
-    total_status = sum(status['count'] for status in status_counts)
-    for status in status_counts:
-        status['percentage'] = (status['count'] / total_status * 100) if total_status > 0 else 0
+    # Risk level and status breakdowns come from the rollup table, over the same clients
+    risk_levels = distribution['by_risk']
+    status_counts = distribution['by_status']
     
     context = {
         'clients': clients,
-        'total_clients': total_clients,
-        'active_clients': active_clients,
-        'completed_clients': completed_clients,
-        'violated_clients': violated_clients,
+        'total_clients': distribution['total'],
+        'active_clients': distribution['status_counts'].get('active', 0),
+        'completed_clients': distribution['status_counts'].get('completed', 0),
+        'violated_clients': distribution['status_counts'].get('violated', 0),
         'risk_levels': risk_levels,
         'status_counts': status_counts,
     }
     
     if request.GET.get('format') == 'csv':
-        return generate_client_csv_report()
+        return generate_client_csv_report(clients)
     
     return render(request, 'reporting/client_report.html', context)
 
+def _report_range(request, default_days=30):
+    """Date range and granularity from the query string, last 30 days by default"""
+    today = timezone.localdate()
+    try:
+        end_date = datetime.strptime(request.GET['end'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        end_date = today
+    try:
+        start_date = datetime.strptime(request.GET['start'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        start_date = end_date - timedelta(days=default_days)
+    if start_date > end_date:
+        start_date, end_date = end_date, start_date
+    
+    granularity = request.GET.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        granularity = 'day'
+    return start_date, end_date, granularity
+
+def _id_param(value):
+    """A record id from the query string; anything else filters nothing"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
 @login_required
 def appointment_report(request):
-    # Last 30 days appointments
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    
-    appointments = Appointment.objects.filter(
-        scheduled_date__gte=thirty_days_ago
-    ).order_by('-scheduled_date')
-    
-    # Appointment type breakdown
-    type_breakdown = appointments.values('appointment_type').annotate(
-        count=Count('appointment_type')
-    )
-    total_type = sum(item['count'] for item in type_breakdown)
-    for item in type_breakdown:
-        item['percentage'] = (item['count'] / total_type * 100) if total_type > 0 else 0
-    
-    # Status breakdown
-    status_breakdown = appointments.values('status').annotate(
-        count=Count('status')
-    )
-    total_status = sum(item['count'] for item in status_breakdown)
-    for item in status_breakdown:
-        item['percentage'] = (item['count'] / total_status * 100) if total_status > 0 else 0
-    
-    # Counts for summary
-    completed_count = appointments.filter(status='completed').count()
-    scheduled_count = appointments.filter(status='scheduled').count()
-    missed_count = appointments.filter(status='no_show').count()
+    start_date, end_date, granularity = _report_range(request)
+    officer_id = _id_param(request.GET.get('officer'))
+    
+    # Type and status breakdowns and the trend line are read from the daily rollups,
+    # counting only what the user may see, like the detail table
+    breakdown = appointment_breakdown(start_date, end_date, officer_id=officer_id, user=request.user)
+    trend = appointment_trend(start_date, end_date, granularity, officer_id=officer_id, user=request.user)
+    
+    # Most recent appointments in the period for the detail table
+    period_start, period_end = day_bounds(start_date, end_date)
+    appointments = visible(Appointment, request.user).filter(
+        scheduled_date__gte=period_start,
+        scheduled_date__lt=period_end,
+    ).select_related('client', 'officer').order_by('-scheduled_date')
+    if officer_id:
+        appointments = appointments.filter(officer_id=officer_id)
     
     context = {
-        'appointments': appointments,
-        'type_breakdown': type_breakdown,
-        'status_breakdown': status_breakdown,
-        'period': 'Last 30 Days',
-        'completed_count': completed_count,
-        'scheduled_count': scheduled_count,
-        'missed_count': missed_count,
+        'appointments': appointments[:100],
+        'total_appointments': breakdown['total'],
+        'type_breakdown': breakdown['by_type'],
+        'status_breakdown': breakdown['by_status'],
+        'trend': trend,
+        'period': f"{start_date:%b %d, %Y} - {end_date:%b %d, %Y}",
+        'start_date': start_date,
+        'end_date': end_date,
+        'granularity': granularity,
+        'officer_filter': officer_id,
+        'officers': User.objects.filter(user_type='officer').order_by('first_name', 'last_name'),
+        'completed_count': breakdown['status_counts'].get('completed', 0),
+        'scheduled_count': breakdown['status_counts'].get('scheduled', 0),
+        'missed_count': breakdown['status_counts'].get('no_show', 0),
     }
     
     return render(request, 'reporting/appointment_report.html', context)
 
 @login_required
 def officer_report(request):
-    # Officer workload statistics
-    officers = User.objects.filter(user_type='officer').annotate(
-        client_count=Count('client'),
-        case_count=Count('officer_cases'),
-        appointment_count=Count('appointment')
-    )
+    # Officer workload statistics: every officer's for administrators, their own for officers
+    officers = workload_for(request.user)
     
-    # Overall statistics
-    total_clients = Client.objects.count()
-    active_cases = Case.objects.filter(status='open').count()
-    total_appointments = Appointment.objects.count()
+    # Overall statistics over what the user may see
+    total_clients = visible(Client, request.user).count()
+    active_cases = visible(Case, request.user).filter(status='open').count()
+    total_appointments = visible(Appointment, request.user).count()
     
     context = {
         'officers': officers,
@@ -118,14 +126,15 @@ def officer_report(request):
     
     return render(request, 'reporting/officer_report.html', context)
 
-def generate_client_csv_report():
+def generate_client_csv_report(clients=None):
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="client_report.csv"'
     
     writer = csv.writer(response)
     writer.writerow(['Case Number', 'Name', 'Status', 'Risk Level', 'Assigned Officer', 'Start Date'])
     
-    clients = Client.objects.all().select_related('assigned_officer')
+    if clients is None:
+        clients = Client.objects.all().select_related('assigned_officer')
     for client in clients:
         writer.writerow([
             client.case_number,
@@ -141,4 +150,4 @@ def generate_client_csv_report():
 @login_required
 def client_report_pdf(request):
     from .utils import generate_client_pdf_report
-    return generate_client_pdf_report()
\ No newline at end of file
+    return generate_client_pdf_report(visible(Client, request.user).select_related('assigned_officer'))
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+Per-officer workload figures.
+
+Each figure is its own correlated subquery, so counts from different
+one-to-many relations are never multiplied together by a shared JOIN, and
+the whole report is still a single SQL statement. Results are cached and
+shared by the officer report, the officer list and the API; the report and
+the API show them through workload_for(), which limits them by role.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from appointments.models import Appointment
+from cases.models import Case
+from clients.models import Client
+from core.cache_versions import bump, get_version
+from users.models import User
+
+CACHE_KEY = 'reporting:officer-workload:{version}:{window_days}'
+VERSION_NAME = 'reporting:officer-workload'
+APPOINTMENT_STATUSES = [status for status, _ in Appointment.STATUS_CHOICES]
+
+
+def _count(queryset, officer_field):
+    """Correlated COUNT of queryset rows belonging to the outer officer"""
+    counts = queryset.filter(**{officer_field: OuterRef('pk')}).order_by().values(
+        officer_field
+    ).annotate(n=Count('pk')).values('n')[:1]
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _compute(window_days):
+    now = timezone.now()
+    window_start = now - timedelta(days=window_days)
+    window_end = now + timedelta(days=window_days)
+    recent = Appointment.objects.filter(scheduled_date__gte=window_start, scheduled_date__lt=now)
+
+    annotations = {
+        'client_count': _count(Client.objects.all(), 'assigned_officer'),
+        'active_client_count': _count(Client.objects.filter(status='active'), 'assigned_officer'),
+        'high_risk_client_count': _count(Client.objects.filter(status='active', risk_level='high'), 'assigned_officer'),
+        'case_count': _count(Case.objects.all(), 'officer'),
+        'open_case_count': _count(Case.objects.filter(status='open'), 'officer'),
+        'appointment_count': _count(Appointment.objects.all(), 'officer'),
+        'upcoming_appointment_count': _count(
+            Appointment.objects.filter(status='scheduled', scheduled_date__gte=now, scheduled_date__lt=window_end),
+            'officer',
+        ),
+    }
+    for status in APPOINTMENT_STATUSES:
+        annotations[f'recent_{status}_count'] = _count(recent.filter(status=status), 'officer')
+
+    officers = User.objects.filter(user_type='officer').annotate(**annotations).order_by(
+        'first_name', 'last_name'
+    ).values(
+        'id', 'username', 'first_name', 'last_name', 'department', 'badge_number',
+        'is_active_officer', *annotations,
+    )
+
+    rows = []
+    for officer in officers:
+        officer['full_name'] = f"{officer['first_name']} {officer['last_name']}".strip()
+        officer['recent_by_status'] = {
+            status: officer.pop(f'recent_{status}_count') for status in APPOINTMENT_STATUSES
+        }
+        attended = officer['recent_by_status']['completed'] + officer['recent_by_status']['no_show']
+        officer['no_show_rate'] = (
+            officer['recent_by_status']['no_show'] / attended * 100 if attended else 0
+        )
+        officer['workload_score'] = (
+            officer['client_count'] + officer['case_count'] + officer['appointment_count']
+        )
+        rows.append(officer)
+    return rows
+
+
+def officer_workload(window_days=30):
+    """Workload rows for every officer, ordered by name"""
+    version = get_version(VERSION_NAME)
+    key = CACHE_KEY.format(version=version, window_days=window_days)
+    rows = cache.get(key)
+    if rows is None:
+        rows = _compute(window_days)
+        cache.set(key, rows, getattr(settings, 'WORKLOAD_CACHE_SECONDS', 300))
+    return rows
+
+
+def workload_for(user, window_days=30):
+    """The workload rows user may see: every officer's for administrators, their own for officers"""
+    if user.user_type == 'admin':
+        return officer_workload(window_days)
+    if user.user_type == 'officer':
+        return [row for row in officer_workload(window_days) if row['id'] == user.pk]
+    return []
+
+
+def officer_workload_by_id(window_days=30):
+    return {row['id']: row for row in officer_workload(window_days)}
+
+
+def invalidate_officer_workload():
+    """Drop cached workload for every window, e.g. after caseloads are reassigned"""
+    bump(VERSION_NAME)
@@ -0,0 +1,236 @@
+"""
+Building the search index.
+
+Saving or deleting an indexed record only queues an IndexTask (see the
+signals in search.models); process_queue(), run by the update_search_index
+command, does the slow part: extracting text, including text from PDFs
+attached to court orders, and rewriting that record's postings. Terms are
+lower-cased words with their word positions, which is what phrase queries
+in search.query match against.
+"""
+import logging
+import re
+from dataclasses import dataclass
+from functools import reduce
+from operator import or_
+from typing import Callable
+
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # Without pypdf, court order PDFs are not searched
+    PdfReader = None
+
+from cases.models import Case
+from clients.models import Client
+from courts.models import CourtOrder, Hearing
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+MAX_PDF_CHARS = 1_000_000
+BATCH_SIZE = 200
+
+
+def tokenize(text):
+    return [match.group().lower()[:MAX_TERM_LENGTH] for match in TOKEN_RE.finditer(text)]
+
+
+@dataclass
+class Source:
+    """How to turn one kind of record into searchable text"""
+    queryset: Callable
+    title: Callable
+    text: Callable  # (obj, indexer) -> str
+    case_id: Callable
+    client_id: Callable
+    url: Callable  # object_id -> str
+    label: str
+
+
+def _join(*parts):
+    return '\n\n'.join(part for part in parts if part)
+
+
+SOURCES = {
+    'courts.courtorder': Source(
+        queryset=lambda: CourtOrder.objects.select_related('court_case__case', 'document'),
+        title=lambda order: f"{order.get_order_type_display()} {order.court_case.case_number} ({order.order_date})",
+        text=lambda order, indexer: _join(order.order_text, indexer.document_text(order.document)),
+        case_id=lambda order: order.court_case.case_id,
+        client_id=lambda order: order.court_case.case.client_id,
+        url=lambda pk: reverse('courts:court_order_detail', args=[pk]),
+        label='Court order',
+    ),
+    'courts.hearing': Source(
+        queryset=lambda: Hearing.objects.select_related('court_case__case'),
+        title=lambda hearing: f"{hearing.get_hearing_type_display()} {hearing.court_case.case_number} "
+                              f"({hearing.hearing_date:%Y-%m-%d})",
+        text=lambda hearing, indexer: _join(hearing.notes, hearing.outcome),
+        case_id=lambda hearing: hearing.court_case.case_id,
+        client_id=lambda hearing: hearing.court_case.case.client_id,
+        url=lambda pk: reverse('courts:hearing_detail', args=[pk]),
+        label='Hearing',
+    ),
+    'cases.case': Source(
+        queryset=lambda: Case.objects.select_related('client'),
+        title=lambda case: f"Case {case.case_number or case.pk}: {case.client.full_name}",
+        text=lambda case, indexer: case.court_notes,
+        case_id=lambda case: case.pk,
+        client_id=lambda case: case.client_id,
+        url=lambda pk: reverse('case_detail', args=[pk]),
+        label='Case',
+    ),
+    'clients.client': Source(
+        queryset=lambda: Client.objects.all(),
+        title=lambda client: f"{client.full_name} ({client.case_number})",
+        text=lambda client, indexer: client.notes,
+        case_id=lambda client: None,
+        client_id=lambda client: client.pk,
+        url=lambda pk: reverse('client_detail', args=[pk]),
+        label='Client',
+    ),
+}
+
+
+def enqueue(model, object_ids):
+    """Queue records for the indexer; a record queued again moves to the back of the queue"""
+    from .models import IndexTask
+    content_type = model._meta.label_lower
+    if content_type not in SOURCES:
+        return
+    now = timezone.now()
+    IndexTask.objects.bulk_create(
+        [IndexTask(content_type=content_type, object_id=object_id, queued_at=now) for object_id in object_ids],
+        update_conflicts=True,
+        unique_fields=['content_type', 'object_id'],
+        update_fields=['queued_at'],
+        batch_size=1000,
+    )
+
+
+def enqueue_all():
+    """Queue every indexable record, for a full rebuild"""
+    queued = 0
+    for source in SOURCES.values():
+        model = source.queryset().model
+        ids = []
+        for object_id in model.objects.values_list('pk', flat=True).iterator(chunk_size=5000):
+            ids.append(object_id)
+            if len(ids) == 5000:
+                enqueue(model, ids)
+                queued += len(ids)
+                ids = []
+        enqueue(model, ids)
+        queued += len(ids)
+    return queued
+
+
+class Indexer:
+    def __init__(self):
+        # The same scan is often attached to many orders; extract it once per run
+        self._pdf_text = {}
+
+    def document_text(self, document):
+        if document is None or PdfReader is None:
+            return ''
+        if document.content_type != 'application/pdf' and not document.original_name.lower().endswith('.pdf'):
+            return ''
+        if document.sha256 not in self._pdf_text:
+            self._pdf_text[document.sha256] = self._extract_pdf(document)
+        return self._pdf_text[document.sha256]
+
+    def _extract_pdf(self, document):
+        parts = []
+        length = 0
+        try:
+            with document.file.storage.open(document.file.name, 'rb') as fp:
+                for page in PdfReader(fp).pages:
+                    text = page.extract_text() or ''
+                    parts.append(text)
+                    length += len(text)
+                    if length >= MAX_PDF_CHARS:
+                        break
+        except Exception:
+            # A damaged or encrypted PDF shouldn't stop the rest of the queue
+            logger.warning('Could not extract text from document %s', document.sha256, exc_info=True)
+        return '\n'.join(parts)[:MAX_PDF_CHARS]
+
+    def index(self, content_type, object_ids):
+        """Rewrite the index entries of these records, dropping ones that no longer exist"""
+        from .models import SearchDocument, SearchPosting
+        source = SOURCES[content_type]
+        objects = list(source.queryset().filter(pk__in=object_ids))
+        found = {obj.pk for obj in objects}
+        SearchDocument.objects.filter(
+            content_type=content_type,
+            object_id__in=[object_id for object_id in object_ids if object_id not in found],
+        ).delete()
+        if not objects:
+            return 0
+
+        documents = []
+        for obj in objects:
+            documents.append(SearchDocument(
+                content_type=content_type,
+                object_id=obj.pk,
+                title=source.title(obj)[:255],
+                body=source.text(obj, self) or '',
+                case_id=source.case_id(obj),
+                client_id=source.client_id(obj),
+                indexed_at=timezone.now(),
+            ))
+        SearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['content_type', 'object_id'],
+            update_fields=['title', 'body', 'case', 'client', 'indexed_at'],
+        )
+        document_ids = dict(SearchDocument.objects.filter(
+            content_type=content_type, object_id__in=found,
+        ).values_list('object_id', 'id'))
+
+        SearchPosting.objects.filter(document_id__in=document_ids.values()).delete()
+        postings = []
+        for document in documents:
+            positions = {}
+            for position, term in enumerate(tokenize(f'{document.title}\n{document.body}')):
+                positions.setdefault(term, []).append(position)
+            postings.extend(
+                SearchPosting(
+                    term=term,
+                    document_id=document_ids[document.object_id],
+                    positions=' '.join(map(str, term_positions)),
+                )
+                for term, term_positions in positions.items()
+            )
+        SearchPosting.objects.bulk_create(postings, batch_size=1000)
+        return len(objects)
+
+
+def process_queue(batch_size=BATCH_SIZE, indexer=None):
+    """Index queued records until the queue is empty. Returns the number processed."""
+    from .models import IndexTask
+    indexer = indexer or Indexer()
+    processed = 0
+    while True:
+        tasks = list(IndexTask.objects.order_by('queued_at')[:batch_size])
+        if not tasks:
+            return processed
+        by_type = {}
+        for task in tasks:
+            by_type.setdefault(task.content_type, []).append(task.object_id)
+        with transaction.atomic():
+            for content_type, object_ids in by_type.items():
+                if content_type in SOURCES:
+                    indexer.index(content_type, object_ids)
+            # A record changed again while we worked has a newer queued_at and stays queued
+            IndexTask.objects.filter(
+                reduce(or_, (Q(pk=task.pk, queued_at=task.queued_at) for task in tasks))
+            ).delete()
+        processed += len(tasks)
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from search.index import BATCH_SIZE, Indexer, enqueue_all, process_queue
+
+
+class Command(BaseCommand):
+    help = 'Index court orders, hearings and notes queued for search since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Queue every record first, rebuilding the whole index')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep indexing new changes instead of exiting once the queue is empty')
+        parser.add_argument('--interval', type=int, default=10,
+                            help='Seconds between passes when running with --loop')
+
+    def handle(self, *args, **options):
+        if options['full']:
+            self.stdout.write(f'Queued {enqueue_all()} records')
+
+        while True:
+            processed = process_queue(batch_size=options['batch_size'], indexer=Indexer())
+            if processed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'Indexed {processed} records'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
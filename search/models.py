@@ -0,0 +1,83 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """The indexed text of one record, e.g. a court order with its PDF, and what it belongs to"""
+    content_type = models.CharField(max_length=50)  # e.g. 'courts.courtorder'
+    object_id = models.PositiveIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    # Who may see it is worked out from these at query time, so reassignments need no reindex
+    case = models.ForeignKey('cases.Case', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    client = models.ForeignKey('clients.Client', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type}:{self.object_id} {self.title}"
+
+
+class SearchPosting(models.Model):
+    """Inverted index entry: where a term occurs in a document, as word positions"""
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    positions = models.TextField()  # Space separated word offsets, ascending
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'document'], name='unique_search_posting'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} in {self.document_id}"
+
+    def position_list(self):
+        return [int(position) for position in self.positions.split()]
+
+
+class IndexTask(models.Model):
+    """A record that changed and needs (re)indexing or removal by the background indexer"""
+    content_type = models.CharField(max_length=50)
+    object_id = models.PositiveIntegerField()
+    queued_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'object_id'], name='unique_index_task'),
+        ]
+        indexes = [
+            models.Index(fields=['queued_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type}:{self.object_id}"
+
+
+# Signals to queue changed records for the indexer
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from cases.models import Case
+from clients.models import Client
+from courts.models import CourtOrder, Hearing
+from . import index
+
+@receiver(post_save, sender=CourtOrder)
+@receiver(post_save, sender=Hearing)
+@receiver(post_save, sender=Case)
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=CourtOrder)
+@receiver(post_delete, sender=Hearing)
+@receiver(post_delete, sender=Case)
+@receiver(post_delete, sender=Client)
+def queue_for_indexing(sender, instance, **kwargs):
+    index.enqueue(sender, [instance.pk])
+
+
+# Documents are visible with the case or client they belong to (see core/scoping.py)
+from core import scoping
+
+scoping.register(SearchDocument, officer=('case', 'client'), judge=('case', 'client'))
@@ -0,0 +1,127 @@
+"""
+Phrase and keyword search over the index built by search.index.
+
+A query is a mix of bare words and "quoted phrases"; a document matches
+when it contains every word and every phrase (words adjacent and in
+order). Only documents the user may see are considered: officers see what
+belongs to their cases and clients, judges what belongs to cases they
+preside over, staff and administrators everything.
+"""
+import re
+
+from django.db.models import Count
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from core.scoping import visible
+from .index import SOURCES, TOKEN_RE, tokenize
+from .models import SearchDocument, SearchPosting
+
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+MAX_CANDIDATES = 2000
+SNIPPET_WORDS = 15
+
+
+def parse_query(query):
+    """List of phrases, each a list of terms; a bare word is a one-term phrase"""
+    phrases = []
+    for quoted, word in QUERY_RE.findall(query or ''):
+        terms = tokenize(quoted or word)
+        if terms:
+            phrases.append(terms)
+    return phrases
+
+
+def visible_documents(user):
+    return visible(SearchDocument, user)
+
+
+def _phrase_matches(phrase, positions):
+    """Word positions where the phrase starts"""
+    first, rest = positions[phrase[0]], [set(positions[term]) for term in phrase[1:]]
+    return [start for start in first if all(start + offset in terms for offset, terms in enumerate(rest, 1))]
+
+
+def _snippet(document, matches):
+    """Escaped text around the first match with every matched phrase in <mark>"""
+    tokens = list(TOKEN_RE.finditer(f'{document.title}\n{document.body}'))
+    text = f'{document.title}\n{document.body}'
+    title_words = len(tokenize(document.title))
+    marked = set()
+    for start, length in matches:
+        marked.update(range(start, start + length))
+    body_matches = sorted(start for start, _ in matches if start >= title_words) or [title_words]
+    first = max(body_matches[0] - SNIPPET_WORDS // 2, title_words)
+    last = min(first + SNIPPET_WORDS * 2, len(tokens))
+    if first >= last:
+        return ''
+
+    parts = ['&hellip; ' if first > title_words else '']
+    cursor = tokens[first].start()
+    for position in range(first, last):
+        token = tokens[position]
+        parts.append(escape(text[cursor:token.start()]))
+        word = escape(token.group())
+        parts.append(f'<mark>{word}</mark>' if position in marked else word)
+        cursor = token.end()
+    parts.append(' &hellip;' if last < len(tokens) else escape(text[cursor:]))
+    return mark_safe(''.join(parts))
+
+
+def search(user, query, content_types=None, limit=50):
+    """
+    Best matches for the query as dicts with content_type, object_id, title,
+    snippet (safe HTML), score, type label and url, highest score first,
+    and whether the candidates were truncated: only the MAX_CANDIDATES most
+    recently indexed documents holding every term are ranked.
+    """
+    phrases = parse_query(query)
+    terms = {term for phrase in phrases for term in phrase}
+    if not terms:
+        return [], False
+
+    documents = visible_documents(user)
+    if content_types:
+        documents = documents.filter(content_type__in=content_types)
+    # Documents holding every term; phrase order is checked from positions below
+    candidates = SearchPosting.objects.filter(
+        term__in=terms, document__in=documents.values('pk'),
+    ).values('document_id').annotate(n=Count('term')).filter(n=len(terms)).order_by('-document_id')
+
+    candidate_ids = list(candidates.values_list('document_id', flat=True)[:MAX_CANDIDATES + 1])
+    truncated = len(candidate_ids) > MAX_CANDIDATES
+    positions = {}
+    for document_id, term, term_positions in SearchPosting.objects.filter(
+        document_id__in=candidate_ids[:MAX_CANDIDATES],
+        term__in=terms,
+    ).values_list('document_id', 'term', 'positions'):
+        positions.setdefault(document_id, {})[term] = [int(position) for position in term_positions.split()]
+
+    scored = []
+    for document_id, document_positions in positions.items():
+        matches = []
+        for phrase in phrases:
+            starts = _phrase_matches(phrase, document_positions)
+            if not starts:
+                break
+            matches.extend((start, len(phrase)) for start in starts)
+        else:
+            scored.append((len(matches), document_id, matches))
+    scored.sort(reverse=True)
+    scored = scored[:limit]
+
+    loaded = SearchDocument.objects.in_bulk([document_id for _, document_id, _ in scored])
+    results = []
+    for score, document_id, matches in scored:
+        document = loaded[document_id]
+        source = SOURCES[document.content_type]
+        results.append({
+            'content_type': document.content_type,
+            'object_id': document.object_id,
+            'type': source.label,
+            'title': document.title,
+            'snippet': _snippet(document, matches),
+            'score': score,
+            'url': source.url(document.object_id),
+        })
+    return results, truncated
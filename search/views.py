@@ -0,0 +1,25 @@
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+
+from .index import SOURCES
+from .query import search
+
+
+@login_required
+def search_view(request):
+    query = request.GET.get('q', '').strip()
+    content_type = request.GET.get('type', '')
+    if content_type not in SOURCES:
+        content_type = ''
+    results, truncated = [], False
+    if query:
+        results, truncated = search(request.user, query, content_types=[content_type] if content_type else None)
+
+    context = {
+        'query': query,
+        'content_type': content_type,
+        'types': [(key, source.label) for key, source in SOURCES.items()],
+        'results': results,
+        'truncated': truncated,
+    }
+    return render(request, 'search/search.html', context)
@@ -0,0 +1,12 @@
+// Reloads the changelist when an AutocompleteFilter (core/admin.py) changes.
+'use strict';
+{
+    const $ = django.jQuery;
+
+    $(document).on('change', '.autocomplete-filter select', function() {
+        const filter = this.closest('.autocomplete-filter');
+        window.location.search = this.value
+            ? filter.dataset.filterUrl.replace('__value__', encodeURIComponent(this.value))
+            : filter.dataset.clearUrl;
+    });
+}
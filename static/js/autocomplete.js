@@ -0,0 +1,143 @@
+// Turns <select data-autocomplete-url> (core/autocomplete.py) into a search box.
+// The select stays in the form, hidden, holding just the chosen option.
+(function () {
+    'use strict';
+
+    const DELAY = 200;
+
+    function setup(select) {
+        const wrapper = document.createElement('div');
+        wrapper.className = 'position-relative';
+        const input = document.createElement('input');
+        input.type = 'search';
+        input.className = select.className;
+        input.autocomplete = 'off';
+        input.placeholder = 'Type to search…';
+        input.setAttribute('role', 'combobox');
+        input.setAttribute('aria-expanded', 'false');
+        const list = document.createElement('div');
+        list.className = 'list-group position-absolute w-100 shadow-sm d-none';
+        list.style.zIndex = 1050;
+        list.setAttribute('role', 'listbox');
+
+        const current = select.options[select.selectedIndex];
+        input.value = current && current.value ? current.textContent : '';
+        select.parentNode.insertBefore(wrapper, select);
+        wrapper.appendChild(input);
+        wrapper.appendChild(list);
+        wrapper.appendChild(select);
+        select.hidden = true;
+        if (select.id) {
+            // Keep <label for> pointing at something the user can focus
+            input.id = select.id + '_search';
+            document.querySelectorAll('label[for="' + select.id + '"]').forEach(label => { label.htmlFor = input.id; });
+        }
+
+        let timer = null;
+        let request = 0;
+        let active = -1;
+
+        function close() {
+            list.classList.add('d-none');
+            list.innerHTML = '';
+            input.setAttribute('aria-expanded', 'false');
+            active = -1;
+        }
+
+        function choose(id, text) {
+            select.innerHTML = '';
+            select.add(new Option('---------', ''));
+            if (id !== '') {
+                select.add(new Option(text, id, true, true));
+            }
+            input.value = text;
+            close();
+            select.dispatchEvent(new Event('change', {bubbles: true}));
+        }
+
+        function highlight(index) {
+            const items = list.querySelectorAll('.list-group-item');
+            items.forEach((item, i) => item.classList.toggle('active', i === index));
+            active = index;
+        }
+
+        function search() {
+            const url = new URL(select.dataset.autocompleteUrl, window.location.origin);
+            url.searchParams.set('q', input.value.trim());
+            (select.dataset.forward || '').split(',').filter(Boolean).forEach(name => {
+                const field = select.form && select.form.elements[name];
+                if (field && field.value) {
+                    url.searchParams.set('forward_' + name, field.value);
+                }
+            });
+            const sent = ++request;
+            fetch(url, {headers: {'X-Requested-With': 'XMLHttpRequest'}})
+                .then(response => response.json())
+                .then(data => {
+                    if (sent !== request) {
+                        return;  // A newer search has been sent since
+                    }
+                    list.innerHTML = '';
+                    data.results.forEach(result => {
+                        const item = document.createElement('button');
+                        item.type = 'button';
+                        item.className = 'list-group-item list-group-item-action';
+                        item.textContent = result.text;
+                        item.setAttribute('role', 'option');
+                        item.addEventListener('mousedown', event => {
+                            event.preventDefault();
+                            choose(String(result.id), result.text);
+                        });
+                        list.appendChild(item);
+                    });
+                    if (!data.results.length) {
+                        list.innerHTML = '<div class="list-group-item text-muted">No matches</div>';
+                    }
+                    list.classList.remove('d-none');
+                    input.setAttribute('aria-expanded', 'true');
+                    active = -1;
+                });
+        }
+
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(search, DELAY);
+        });
+        input.addEventListener('focus', () => {
+            if (!input.value) {
+                search();
+            }
+        });
+        input.addEventListener('keydown', event => {
+            const items = list.querySelectorAll('button.list-group-item');
+            if (event.key === 'ArrowDown' && items.length) {
+                event.preventDefault();
+                highlight(Math.min(active + 1, items.length - 1));
+            } else if (event.key === 'ArrowUp' && items.length) {
+                event.preventDefault();
+                highlight(Math.max(active - 1, 0));
+            } else if (event.key === 'Enter' && active >= 0) {
+                event.preventDefault();
+                items[active].dispatchEvent(new Event('mousedown'));
+            } else if (event.key === 'Escape') {
+                close();
+            }
+        });
+        input.addEventListener('blur', () => {
+            close();
+            const selected = select.options[select.selectedIndex];
+            if (!input.value.trim()) {
+                if (selected && selected.value) {
+                    choose('', '');
+                }
+            } else if (selected) {
+                // Typed text that was never picked reverts to the chosen value
+                input.value = selected.value ? selected.textContent : '';
+            }
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('select[data-autocomplete-url]').forEach(setup);
+    });
+})();
@@ -1,9 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from core.admin import LargeTableAdmin
 from .models import User, Profile
 
 @admin.register(User)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(LargeTableAdmin, UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'user_type', 'department', 'is_active_officer', 'is_staff')
     list_filter = ('user_type', 'is_active_officer', 'is_staff', 'is_superuser', 'department')
     fieldsets = UserAdmin.fieldsets + (
@@ -19,4 +20,6 @@ class CustomUserAdmin(UserAdmin):
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'location', 'birth_date')
\ No newline at end of file
+    list_display = ('user', 'location', 'birth_date')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+Resized variants of profile pictures.
+
+Avatars are shown at icon size all over the site, so serving the original
+phone photo is wasteful. Each picture is keyed by the SHA-256 of its
+content (User.profile_picture_hash) and every size in VARIANT_SIZES is
+rendered as WebP and JPEG to profiles/variants/<ab>/<sha>-<size>.<ext> in
+the default storage. Variants are generated in a background thread when a
+picture is uploaded; a variant that is still missing is generated on its
+first request by the profile_picture_variant view, which sits on the same
+URL so the web server can serve existing files from MEDIA_ROOT and pass
+misses to Django.
+"""
+import hashlib
+import io
+import logging
+import re
+import threading
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels; double the CSS size so avatars stay sharp on high-DPI screens
+VARIANT_SIZES = {
+    'icon': 80,
+    'small': 160,
+    'medium': 480,
+}
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+VARIANT_DIR = 'profiles/variants'
+VARIANT_RE = re.compile(r'^(?P<sha>[0-9a-f]{64})-(?P<size>\d+)\.(?P<ext>[a-z]+)$')
+
+# A fixed set of locks shared out by hash, so there is nothing to clean up as pictures come and go
+_locks = [threading.Lock() for _ in range(64)]
+
+
+def hash_file(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def variant_name(sha256, size, ext):
+    return f'{VARIANT_DIR}/{sha256[:2]}/{sha256}-{size}.{ext}'
+
+
+def variant_urls(sha256):
+    """{'icon': {'webp': url, 'jpg': url}, ...} for a picture hash; no storage access"""
+    return {
+        label: {ext: default_storage.url(variant_name(sha256, size, ext)) for ext in FORMATS}
+        for label, size in VARIANT_SIZES.items()
+    }
+
+
+def parse_variant_name(name):
+    """(sha256, size, ext) of a valid variant file name, else None"""
+    match = VARIANT_RE.match(name)
+    if not match or int(match['size']) not in VARIANT_SIZES.values() or match['ext'] not in FORMATS:
+        return None
+    return match['sha'], int(match['size']), match['ext']
+
+
+def _render(image, size, ext):
+    pil_format, _, options = FORMATS[ext]
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.LANCZOS)
+    if pil_format == 'JPEG' and variant.mode != 'RGB':
+        # JPEG has no alpha; flatten transparent pictures onto white
+        background = Image.new('RGB', variant.size, 'white')
+        if variant.mode in ('RGBA', 'LA', 'P'):
+            variant = variant.convert('RGBA')
+            background.paste(variant, mask=variant.getchannel('A'))
+        else:
+            background.paste(variant.convert('RGB'))
+        variant = background
+    buffer = io.BytesIO()
+    variant.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def _lock(sha256):
+    return _locks[int(sha256, 16) % len(_locks)]
+
+
+def generate_variants(sha256, source_name, wanted=None):
+    """
+    Render the missing variants of a picture from its original in storage.
+    wanted limits it to some (size, ext) pairs. Returns the names written.
+    """
+    wanted = wanted or [(size, ext) for size in VARIANT_SIZES.values() for ext in FORMATS]
+    # One render per picture at a time, so a burst of first requests decodes it once
+    with _lock(sha256):
+        missing = [(size, ext) for size, ext in wanted if not default_storage.exists(variant_name(sha256, size, ext))]
+        if not missing:
+            return []
+        with default_storage.open(source_name, 'rb') as fp:
+            image = Image.open(fp)
+            image.draft('RGB', (max(VARIANT_SIZES.values()),) * 2)  # Cheap JPEG downscale while decoding
+            image = ImageOps.exif_transpose(image)
+            image.load()
+        written = []
+        for size, ext in missing:
+            written.append(default_storage.save(variant_name(sha256, size, ext), ContentFile(_render(image, size, ext))))
+        return written
+
+
+def _generate_in_background(sha256, source_name):
+    try:
+        generate_variants(sha256, source_name)
+    except (OSError, UnidentifiedImageError):
+        # The first request for a variant will try again
+        logger.warning('Could not generate variants of %s', source_name, exc_info=True)
+
+
+def schedule_variants(sha256, source_name):
+    """Generate a new picture's variants off the request thread once the upload is committed"""
+    transaction.on_commit(lambda: threading.Thread(
+        target=_generate_in_background, args=(sha256, source_name), daemon=True,
+    ).start())
@@ -0,0 +1,36 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from users.images import VARIANT_DIR, generate_variants, parse_variant_name
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Render the resized variants of every profile picture that is missing some'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true',
+                            help='Also delete variants of pictures no user has any more')
+
+    def handle(self, *args, **options):
+        pictures = dict(
+            User.objects.exclude(profile_picture='').exclude(profile_picture_hash='')
+            .values_list('profile_picture_hash', 'profile_picture')
+        )
+        written = 0
+        for sha256, name in pictures.items():
+            try:
+                written += len(generate_variants(sha256, name))
+            except OSError as exc:
+                self.stdout.write(self.style.WARNING(f'{name}: {exc}'))
+        self.stdout.write(self.style.SUCCESS(f'Generated {written} variants of {len(pictures)} pictures'))
+
+        if options['prune'] and default_storage.exists(VARIANT_DIR):
+            pruned = 0
+            for prefix in default_storage.listdir(VARIANT_DIR)[0]:
+                for file_name in default_storage.listdir(f'{VARIANT_DIR}/{prefix}')[1]:
+                    parsed = parse_variant_name(file_name)
+                    if parsed is None or parsed[0] not in pictures:
+                        default_storage.delete(f'{VARIANT_DIR}/{prefix}/{file_name}')
+                        pruned += 1
+            self.stdout.write(f'Removed {pruned} unused variants')
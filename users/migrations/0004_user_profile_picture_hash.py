@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:47
+
+import hashlib
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def hash_existing_pictures(apps, schema_editor):
+    """Key existing pictures by content; their variants are generated on first request"""
+    User = apps.get_model('users', 'User')
+    
+    for user in User.objects.exclude(profile_picture='').iterator():
+        name = user.profile_picture.name
+        if not default_storage.exists(name):
+            continue
+        digest = hashlib.sha256()
+        with default_storage.open(name, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(64 * 1024), b''):
+                digest.update(chunk)
+        User.objects.filter(pk=user.pk).update(profile_picture_hash=digest.hexdigest())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_court_jurisdiction_alter_user_user_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(hash_existing_pictures, migrations.RunPython.noop),
+    ]
@@ -14,6 +14,7 @@ class User(AbstractUser):
     department = models.CharField(max_length=100, blank=True)
     badge_number = models.CharField(max_length=50, blank=True)
     profile_picture = models.ImageField(upload_to='profiles/', blank=True)
+    profile_picture_hash = models.CharField(max_length=64, blank=True, editable=False)  # Keys the resized variants
     is_active_officer = models.BooleanField(default=True)  # Track if officer is active
     court_jurisdiction = models.CharField(max_length=100, blank=True)  # For judges
     def __str__(self):
@@ -40,6 +41,26 @@ class User(AbstractUser):
     def can_view_court_cases(self):
         """Check if user can view court cases"""
         return self.user_type in ['admin', 'judge', 'officer']
+    def group_names(self):
+        """Names of the user's groups, cached in the shared cache until their membership or a group changes"""
+        if not hasattr(self, '_group_names'):
+            from django.core.cache import cache
+            from core.cache_versions import get_versions
+            versions = get_versions(['auth:groups', f'auth:groups:{self.pk}'])
+            key = f"users:group-names:{self.pk}:{versions['auth:groups']}:{versions[f'auth:groups:{self.pk}']}"
+            names = cache.get(key)
+            if names is None:
+                names = frozenset(self.groups.values_list('name', flat=True))
+                cache.set(key, names, None)
+            self._group_names = names
+        return self._group_names
+    
+    def profile_picture_variants(self):
+        """URLs of the resized picture by size and format, e.g. variants.icon.webp; None without a picture"""
+        from .images import variant_urls
+        if not self.profile_picture or not self.profile_picture_hash:
+            return None
+        return variant_urls(self.profile_picture_hash)
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     bio = models.TextField(max_length=500, blank=True)
@@ -47,4 +68,57 @@ class Profile(models.Model):
     birth_date = models.DateField(null=True, blank=True)
     
     def __str__(self):
-        return f"{self.user.username}'s Profile"
\ No newline at end of file
+        return f"{self.user.username}'s Profile"
+
+
+# Signals to keep the picture hash current and render the variants of new uploads
+from django.contrib.auth.models import Group
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+@receiver(pre_save, sender=User)
+def hash_profile_picture(sender, instance, **kwargs):
+    picture = instance.profile_picture
+    if not picture:
+        instance.profile_picture_hash = ''
+    elif not picture._committed:
+        # A new upload; stored pictures keep the hash they have
+        from .images import hash_file
+        instance.profile_picture_hash = hash_file(picture)
+        instance._new_profile_picture = True
+
+@receiver(post_save, sender=User)
+def schedule_profile_picture_variants(sender, instance, **kwargs):
+    if getattr(instance, '_new_profile_picture', False):
+        from .images import schedule_variants
+        del instance._new_profile_picture
+        schedule_variants(instance.profile_picture_hash, instance.profile_picture.name)
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_group_names(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    from core.cache_versions import bump
+    if reverse:
+        # group.user_set changed; post_clear gives no pk_set, so drop everyone's
+        if pk_set is None:
+            bump('auth:groups')
+        else:
+            bump(*(f'auth:groups:{user_id}' for user_id in pk_set))
+    else:
+        bump(f'auth:groups:{instance.pk}')
+        instance.__dict__.pop('_group_names', None)
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    # Permission sets (core.identity.IdentityBackend) share the group name versions
+    invalidate_group_names(sender, instance, action, reverse, pk_set)
+    if not reverse:
+        instance.__dict__.pop('_perm_cache', None)
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_all_group_names(sender, **kwargs):
+    from core.cache_versions import bump
+    bump('auth:groups')
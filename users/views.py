@@ -1,10 +1,14 @@
 from django.shortcuts import render, redirect
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.models import User
 from .forms import UserRegisterForm, UserUpdateForm, ProfileUpdateForm
 from .models import Profile
+from .images import FORMATS, generate_variants, parse_variant_name, variant_name
+from reporting.workload import officer_workload_by_id
 from django.contrib.auth import get_user_model
 User = get_user_model()
 
@@ -14,8 +18,9 @@ def officer_list(request):
     officers = User.objects.filter(user_type='officer', is_active_officer=True).order_by('first_name', 'last_name')
     
     # Add caseload information for each officer
+    workload = officer_workload_by_id()
     for officer in officers:
-        officer.caseload_count = officer.client_set.count()
+        officer.caseload_count = workload.get(officer.pk, {}).get('client_count', 0)
     
     context = {
         'officers': officers,
@@ -67,4 +72,26 @@ def profile(request):
 @login_required
 def user_list(request):
     users = User.objects.all()
-    return render(request, 'users/user_list.html', {'users': users})
\ No newline at end of file
+    return render(request, 'users/user_list.html', {'users': users})
+
+
+def profile_picture_variant(request, prefix, name):
+    """Serve a resized profile picture, rendering it first if it hasn't been yet"""
+    parsed = parse_variant_name(name)
+    if parsed is None or prefix != name[:2]:
+        raise Http404
+    sha256, size, ext = parsed
+    path = variant_name(sha256, size, ext)
+    if not default_storage.exists(path):
+        owner = User.objects.filter(profile_picture_hash=sha256).exclude(profile_picture='').first()
+        if owner is None:
+            raise Http404
+        try:
+            generate_variants(sha256, owner.profile_picture.name, wanted=[(size, ext)])
+        except OSError:
+            # Original missing or not an image Pillow can read
+            raise Http404
+    response = FileResponse(default_storage.open(path, 'rb'), content_type=FORMATS[ext][1])
+    # The name carries the content hash, so the file never changes
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response